@@ -1,14 +1,86 @@
 import streamlit as st
+from startup import mark, marks, pandas, record_first_paint
 import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
 import random
 import io
+import uuid
+from contextlib import nullcontext
 from datetime import datetime
 
-# 设置matplotlib支持中文
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
-plt.rcParams['axes.unicode_minus'] = False
+from cloud_io import (
+    comprehensive_cloud_to_csv,
+    indicator_clouds_to_csv,
+    parse_expert_scores,
+    parse_weights,
+)
+from cloud_model import (
+    SAMPLING_QMC,
+    SAMPLING_RANDOM,
+    calculate_comprehensive_cloud,
+    GRADE_LEVELS,
+    calculate_indicator_clouds,
+    generate_cloud_drops,
+    grade_level,
+)
+import cloud_plots
+from cloud_nd import DENSITY_BINS, summarize_nd_cloud
+from cloud_plots import default_standard_data, pyplot, standard_cloud_rows
+from consensus import (
+    CONSENSUS_DOWNWEIGHT,
+    CONSENSUS_DROP,
+    CONSENSUS_THRESHOLD,
+    MIN_CONSENSUS_EXPERTS,
+    MIN_KEPT_EXPERTS,
+    expert_consensus,
+)
+from drop_store import DropStore
+from evaluation_store import DEFAULT_PROJECT, get_store, inputs_hash
+from governor import DISK, REFERENCE_PIXELS, WORK, ServerBusy, get_governor
+from jobs import DONE, FAILED, JobLimitExceeded, get_job_manager
+from objective_weights import WEIGHT_CRITIC, WEIGHT_CV, WEIGHT_ENTROPY, objective_weights
+from profiling import profile_rerun, stage
+from reports import REPORT_DOCX, REPORT_NUM_DROPS, REPORT_ZIP, ReportFile
+
+mark("应用模块导入")
+
+# 绘图时使用的最大云滴数量
+PLOT_MAX_DROPS = 20000
+
+# 静态图片的图面像素数：st.pyplot 以 200 dpi 输出，各图约 10×6 至 14×10 英寸
+STATIC_FIGURE_PIXELS = 2400 * 1600
+
+# 页面内导出CSV的最多云滴数量：下载内容需整体读入内存，约 40 MB
+EXPORT_MAX_DROPS = 1_000_000
+
+# 提交后台任务后在本次运行中等待的秒数，小任务可直接显示结果
+JOB_WAIT_SECONDS = 1.0
+
+# 绘图方式：静态图片在服务器端由 matplotlib 渲染，交互式图表把抽稀后的数据交给浏览器绘制
+CHART_BACKENDS = ["静态图片", "交互式图表"]
+
+# 评价等级对应的提示图标
+GRADE_ICONS = {'劣': "🔴", '差': "🟠", '一般': "🟡", '良': "🟢", '优': "🟢"}
+
+# 步骤2的权重输入方式与客观赋权方法
+WEIGHT_INPUT_METHODS = ["等权重", "手动输入权重", "上传权重文件", "客观赋权"]
+OBJECTIVE_WEIGHT_LABELS = {"熵权法": WEIGHT_ENTROPY, "CRITIC法": WEIGHT_CRITIC, "变异系数法": WEIGHT_CV}
+
+# 报告格式：界面选项 -> 格式，以及各格式下载时的MIME类型
+REPORT_FORMATS = {"Word 文档（DOCX）": REPORT_DOCX, "图片与表格（ZIP）": REPORT_ZIP}
+REPORT_MIME_TYPES = {
+    REPORT_DOCX: "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    REPORT_ZIP: "application/zip",
+}
+
+# 正向云采样方式：界面选项 -> 采样方法
+SAMPLING_OPTIONS = {"伪随机": SAMPLING_RANDOM, "准蒙特卡洛（低差异序列）": SAMPLING_QMC}
+
+# 二维云发生器的维数范围与单次最多云滴数
+ND_MAX_DIMS = 4
+ND_MAX_DROPS = 20_000_000
+
+# 专家共识过滤：界面选项 -> 离群专家处理方式
+CONSENSUS_MODES = {"剔除": CONSENSUS_DROP, "降低权重": CONSENSUS_DOWNWEIGHT}
 
 # 页面配置
 st.set_page_config(
@@ -19,12 +91,22 @@ st.set_page_config(
 )
 
 # 初始化session state
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "逆向云发生器"
-if 'forward_cloud_drops' not in st.session_state:
-    st.session_state.forward_cloud_drops = None
-if 'forward_memberships' not in st.session_state:
-    st.session_state.forward_memberships = None
+if 'forward_drop_store' not in st.session_state:
+    st.session_state.forward_drop_store = None
+if 'forward_job' not in st.session_state:
+    st.session_state.forward_job = None
+if 'nd_job' not in st.session_state:
+    st.session_state.nd_job = None
+if 'nd_result' not in st.session_state:
+    st.session_state.nd_result = None  # 多维云统计结果与对应的参数
+if 'report_job' not in st.session_state:
+    st.session_state.report_job = None
+if 'report_file' not in st.session_state:
+    st.session_state.report_file = None  # 已生成的报告文件句柄（ReportFile），文件保存在临时目录
 if 'expert_scores' not in st.session_state:
     st.session_state.expert_scores = None
 if 'indicator_weights' not in st.session_state:
@@ -33,6 +115,14 @@ if 'indicator_clouds' not in st.session_state:
     st.session_state.indicator_clouds = None
 if 'comprehensive_cloud' not in st.session_state:
     st.session_state.comprehensive_cloud = None
+if 'project_name' not in st.session_state:
+    st.session_state.project_name = DEFAULT_PROJECT
+if 'evaluation_hash' not in st.session_state:
+    st.session_state.evaluation_hash = None  # 当前指标评价云对应的输入哈希
+if 'evaluation_id' not in st.session_state:
+    st.session_state.evaluation_id = None  # 当前综合评价在评价库中的编号
+if 'consensus_result' not in st.session_state:
+    st.session_state.consensus_result = None  # 专家共识过滤结果
 
 # 记忆功能 - 逆向云发生器数据
 if 'reverse_data_text' not in st.session_state:
@@ -55,312 +145,86 @@ if 'forward_num_drops' not in st.session_state:
     st.session_state.forward_num_drops = 1000
 if 'forward_preset' not in st.session_state:
     st.session_state.forward_preset = '自定义'
+if 'forward_sampling' not in st.session_state:
+    st.session_state.forward_sampling = "伪随机"
+if 'forward_compact' not in st.session_state:
+    st.session_state.forward_compact = False
 if 'standard_clouds_data' not in st.session_state:
-    st.session_state.standard_clouds_data = pd.DataFrame({
-        '云名称': ['劣', '差', '一般', '良', '优', '综合评价云'],
-        'Ex': [12.5, 37.5, 62.5, 82.5, 95.0, np.nan],
-        'En': [4.17, 4.17, 4.17, 2.5, 1.67, np.nan],
-        'He': [0.5, 0.5, 0.5, 0.5, 0.5, np.nan],
-        '云滴数量': [1200, 1200, 1200, 1200, 1200, 1200],
-        '颜色': ['red', 'blue', 'yellow', 'gray', 'orange', 'green'],
-        '绘图符号': ['o', '*', '*', '*', 'o', 's']
-    })
+    st.session_state.standard_clouds_data = None  # 首次使用时创建，见 standard_clouds_data()
 
-def generate_cloud_drops(ex, en, he, num_drops=1000):
-    """生成云滴"""
-    cloud_drops = []
-    memberships = []
-    
-    for _ in range(num_drops):
-        # 生成正态随机数
-        en_prime = np.random.normal(en, he)
-        x = np.random.normal(ex, abs(en_prime))
-        
-        # 计算隶属度
-        membership = np.exp(-0.5 * ((x - ex) / en) ** 2)
-        
-        cloud_drops.append(x)
-        memberships.append(membership)
-    
-    return np.array(cloud_drops), np.array(memberships)
+def standard_clouds_data():
+    """评价标准云配置表，首次使用时创建默认配置"""
+    if st.session_state.standard_clouds_data is None:
+        st.session_state.standard_clouds_data = default_standard_data()
+    return st.session_state.standard_clouds_data
 
-def calculate_reverse_cloud_params(data):
-    """计算逆向云模型参数"""
-    data = np.array(data)
-    n = len(data)
-    
-    # 计算期望值 Ex
-    ex = np.mean(data)
-    
-    # 计算一阶样本绝对中心矩
-    s1 = np.mean(np.abs(data - ex))
-    
-    # 计算样本方差
-    s2 = np.var(data, ddof=1)
-    
-    # 计算熵 En
-    en = np.sqrt(np.pi / 2) * s1
-    
-    # 计算超熵 He
-    he = np.sqrt(abs(s2 - en**2))
-    
-    return ex, en, he
+def plots():
+    """当前绘图方式对应的绘图函数，函数名与参数与 cloud_plots 相同"""
+    if st.session_state.get('chart_backend') != "交互式图表":
+        return cloud_plots
+    import cloud_charts
+    return cloud_charts.for_viewport(st.session_state.get('chart_width', cloud_charts.CHART_WIDTH))
 
-def calculate_indicator_clouds(expert_scores, weights):
-    """计算指标评价云"""
-    indicator_clouds = []
-    
-    for i, scores in enumerate(expert_scores.T):  # 按指标遍历
-        # 计算该指标的云模型参数
-        ex, en, he = calculate_reverse_cloud_params(scores)
-        indicator_clouds.append({
-            '指标': f'指标{i+1}',
-            'Ex': ex,
-            'En': en,
-            'He': he,
-            '权重': weights[i] if i < len(weights) else 0
-        })
-    
-    return indicator_clouds
-
-def calculate_comprehensive_cloud(indicator_clouds):
-    """计算综合评价云"""
-    # 提取参数和权重
-    exs = np.array([cloud['Ex'] for cloud in indicator_clouds])
-    ens = np.array([cloud['En'] for cloud in indicator_clouds])
-    hes = np.array([cloud['He'] for cloud in indicator_clouds])
-    weights = np.array([cloud['权重'] for cloud in indicator_clouds])
-    
-    # 权重归一化
-    weights = weights / np.sum(weights)
-    
-    # 计算综合云参数
-    ex_comp = np.sum(weights * exs)
-    en_comp = np.sqrt(np.sum(weights * (ens**2 + (exs - ex_comp)**2)))
-    he_comp = np.sqrt(np.sum(weights * hes**2))
-    
-    return ex_comp, en_comp, he_comp
+def show_figure(fig):
+    """显示 matplotlib 图或交互式图表"""
+    import cloud_charts
+    if cloud_charts.is_chart(fig):
+        with stage("st.altair_chart序列化"):
+            st.altair_chart(fig, use_container_width=False)
+    else:
+        with stage("st.pyplot序列化"):
+            st.pyplot(fig)
+        pyplot().close(fig)
 
-def plot_scatter(cloud_drops, memberships, title="云滴散点图", xlabel="云滴值", ylabel="隶属度"):
-    """绘制散点图"""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    scatter = ax.scatter(cloud_drops, memberships, alpha=0.6, c=memberships, cmap='viridis')
-    ax.set_xlabel(xlabel)
-    ax.set_ylabel(ylabel)
-    ax.set_title(title)
-    ax.grid(True, alpha=0.3)
-    plt.colorbar(scatter, ax=ax, label='隶属度')
-    return fig
+def render_scale():
+    """当前绘图方式下的渲染尺寸系数：图面像素数相对 REFERENCE_PIXELS 的倍数"""
+    if st.session_state.get('chart_backend') != "交互式图表":
+        return STATIC_FIGURE_PIXELS / REFERENCE_PIXELS
+    import cloud_charts
+    width = st.session_state.get('chart_width', cloud_charts.CHART_WIDTH)
+    return width * (width * 9 // 16) / REFERENCE_PIXELS
 
-def plot_histogram(cloud_drops, memberships, title="云滴分布直方图", xlabel="云滴值", ylabel="频数"):
-    """绘制直方图"""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    n, bins, patches = ax.hist(cloud_drops, bins=50, alpha=0.7, edgecolor='black')
-    
-    # 根据隶属度着色
-    bin_centers = (bins[:-1] + bins[1:]) / 2
-    for i, (patch, center) in enumerate(zip(patches, bin_centers)):
-        # 找到最接近的云滴点来确定颜色
-        closest_idx = np.argmin(np.abs(cloud_drops - center))
-        color_intensity = memberships[closest_idx]
-        patch.set_facecolor(plt.cm.viridis(color_intensity))
+def render_with_budget(requested, draw):
+    """在资源预算内绘图并显示，开销为 云滴数 × 渲染尺寸系数；负载高时按授权降级，服务器繁忙时提示稍后重试"""
+    try:
+        with get_governor().admit(st.session_state.session_id, requested, render_scale()) as grant:
+            show_figure(draw(grant))
+    except ServerBusy as e:
+        st.warning(str(e))
+        return None
     
-    ax.set_xlabel(xlabel)
-    ax.set_ylabel(ylabel)
-    ax.set_title(title)
-    ax.grid(True, alpha=0.3)
-    return fig
+    if grant.downgraded:
+        st.caption(f"⚠️ 当前负载较高，绘制的云滴已由 {grant.requested} 个降为 {grant.points} 个")
+    return grant
 
-def plot_cloud_visualization(ex, en, he, cloud_drops, memberships, title="云模型可视化", xlabel="云滴值", ylabel="隶属度"):
-    """绘制云模型可视化图"""
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    # 绘制实际云滴
-    ax.scatter(cloud_drops, memberships, alpha=0.6, c='blue', s=20, label='实际云滴')
-    
-    # 绘制理论云模型曲线
-    x_theory = np.linspace(cloud_drops.min(), cloud_drops.max(), 1000)
-    y_theory = np.exp(-0.5 * ((x_theory - ex) / en) ** 2)
-    ax.plot(x_theory, y_theory, 'r-', linewidth=2, label='理论云模型')
-    
-    # 标记特征点
-    ax.axvline(x=ex, color='green', linestyle='--', alpha=0.7, label=f'Ex = {ex:.2f}')
-    ax.axvline(x=ex-en, color='orange', linestyle='--', alpha=0.7, label=f'Ex-En = {ex-en:.2f}')
-    ax.axvline(x=ex+en, color='orange', linestyle='--', alpha=0.7, label=f'Ex+En = {ex+en:.2f}')
-    
-    ax.set_xlabel(xlabel)
-    ax.set_ylabel(ylabel)
-    ax.set_title(title)
-    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    ax.grid(True, alpha=0.3)
-    plt.tight_layout()
-    return fig
-
-def plot_combined_visualization(ex, en, he, cloud_drops, memberships, title="组合可视化图", xlabel="云滴值", ylabel="隶属度/频数"):
-    """绘制组合图"""
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
-    
-    # 上图：散点图
-    scatter = ax1.scatter(cloud_drops, memberships, alpha=0.6, c=memberships, cmap='viridis')
-    ax1.set_ylabel('隶属度')
-    ax1.set_title(f'{title} - 散点图')
-    ax1.grid(True, alpha=0.3)
-    plt.colorbar(scatter, ax=ax1)
-    
-    # 下图：直方图
-    n, bins, patches = ax2.hist(cloud_drops, bins=50, alpha=0.7, edgecolor='black')
-    bin_centers = (bins[:-1] + bins[1:]) / 2
-    for i, (patch, center) in enumerate(zip(patches, bin_centers)):
-        closest_idx = np.argmin(np.abs(cloud_drops - center))
-        color_intensity = memberships[closest_idx]
-        patch.set_facecolor(plt.cm.viridis(color_intensity))
-    
-    ax2.set_xlabel(xlabel)
-    ax2.set_ylabel('频数')
-    ax2.set_title(f'{title} - 直方图')
-    ax2.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    return fig
-
-def plot_standard_clouds(standard_data, title="评价标准云图", xlabel="评分值", ylabel="隶属度"):
-    """绘制评价标准云图"""
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    for _, row in standard_data.iterrows():
-        ex, en, he = row['Ex'], row['En'], row['He']
-        
-        # 检查数据有效性，如果Ex、En、He任一为空或无效，则跳过该行
-        if pd.isna(ex) or pd.isna(en) or pd.isna(he) or ex == 0 or en == 0:
-            continue
-            
-        # 处理云滴数量，防止NaN值
-        try:
-            num_drops = int(row['云滴数量']) if pd.notna(row['云滴数量']) else 1200
-        except (ValueError, TypeError):
-            num_drops = 1200  # 默认值
-            
-        color = row['颜色'] if pd.notna(row['颜色']) else 'blue'
-        marker = row['绘图符号'] if pd.notna(row['绘图符号']) else 'o'
-        name = row['云名称'] if pd.notna(row['云名称']) else '未命名'
-        
-        # 生成云滴
-        drops, memberships = generate_cloud_drops(ex, en, he, num_drops)
-        
-        # 绘制散点
-        ax.scatter(drops, memberships, alpha=0.6, c=color, marker=marker, s=20, label=name)
-        
-        # 绘制理论曲线
-        x_theory = np.linspace(drops.min(), drops.max(), 200)
-        y_theory = np.exp(-0.5 * ((x_theory - ex) / en) ** 2)
-        ax.plot(x_theory, y_theory, color=color, linewidth=2, alpha=0.8)
-    
-    ax.set_xlabel(xlabel)
-    ax.set_ylabel(ylabel)
-    ax.set_title(title)
-    ax.legend()
-    ax.grid(True, alpha=0.3)
-    return fig
-
-def plot_comprehensive_with_standards(comprehensive_cloud, standard_data, num_drops=1000, title="综合评价云与标准云对比图", xlabel="评分值", ylabel="隶属度"):
-    """绘制综合评价云与标准评价云对比图"""
-    fig, ax = plt.subplots(figsize=(14, 10))
-    
-    # 绘制标准评价云
-    for _, row in standard_data.iterrows():
-        ex, en, he = row['Ex'], row['En'], row['He']
-        
-        # 检查数据有效性，如果Ex、En、He任一为空或无效，则跳过该行
-        if pd.isna(ex) or pd.isna(en) or pd.isna(he) or ex == 0 or en == 0:
-            continue
-            
-        # 处理云滴数量，防止NaN值
-        try:
-            std_num_drops = int(row['云滴数量']) if pd.notna(row['云滴数量']) else 1200
-        except (ValueError, TypeError):
-            std_num_drops = 1200  # 默认值
-            
-        color = row['颜色'] if pd.notna(row['颜色']) else 'blue'
-        marker = row['绘图符号'] if pd.notna(row['绘图符号']) else 'o'
-        name = row['云名称'] if pd.notna(row['云名称']) else '未命名'
-        
-        # 生成标准云滴
-        drops, memberships = generate_cloud_drops(ex, en, he, std_num_drops)
-        
-        # 绘制标准云散点
-        ax.scatter(drops, memberships, alpha=0.4, c=color, marker=marker, s=15, label=f'标准-{name}')
-        
-        # 绘制标准云理论曲线
-        x_theory = np.linspace(0, 100, 200)
-        y_theory = np.exp(-0.5 * ((x_theory - ex) / en) ** 2)
-        ax.plot(x_theory, y_theory, color=color, linewidth=1.5, alpha=0.6, linestyle='--')
-    
-    # 绘制综合评价云
-    comp_ex = comprehensive_cloud['Ex']
-    comp_en = comprehensive_cloud['En']
-    comp_he = comprehensive_cloud['He']
-    
-    # 生成综合评价云滴
-    comp_drops, comp_memberships = generate_cloud_drops(comp_ex, comp_en, comp_he, num_drops)
-    
-    # 绘制综合评价云散点（突出显示）
-    ax.scatter(comp_drops, comp_memberships, alpha=0.8, c='black', marker='D', s=30, label='综合评价云', edgecolors='white', linewidth=0.5)
-    
-    # 绘制综合评价云理论曲线（突出显示）
-    x_theory_comp = np.linspace(0, 100, 200)
-    y_theory_comp = np.exp(-0.5 * ((x_theory_comp - comp_ex) / comp_en) ** 2)
-    ax.plot(x_theory_comp, y_theory_comp, color='black', linewidth=3, alpha=0.9, label='综合评价云理论曲线')
-    
-    # 标记综合评价云的特征点
-    ax.axvline(x=comp_ex, color='red', linestyle='-', alpha=0.8, linewidth=2, label=f'综合Ex = {comp_ex:.2f}')
-    ax.axvline(x=comp_ex-comp_en, color='orange', linestyle=':', alpha=0.7, linewidth=1.5)
-    ax.axvline(x=comp_ex+comp_en, color='orange', linestyle=':', alpha=0.7, linewidth=1.5)
-    
-    ax.set_xlabel(xlabel)
-    ax.set_ylabel(ylabel)
-    ax.set_title(title)
-    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    ax.grid(True, alpha=0.3)
-    ax.set_xlim(0, 100)
-    ax.set_ylim(0, 1.1)
-    
-    plt.tight_layout()
-    return fig
+def standard_drops_total(standard_data, extra=0):
+    """标准云图需要绘制的云滴总数"""
+    return sum(row['云滴数量'] for row in standard_cloud_rows(standard_data)) + extra
 
 def plot_comprehensive_with_standards_button():
     """处理标准对比图按钮的绘制逻辑"""
     if st.session_state.comprehensive_cloud is not None:
         num_drops = st.number_input("云滴数量", value=1000, min_value=100, max_value=5000, step=100, key="std_compare_drops")
-        fig = plot_comprehensive_with_standards(
-            st.session_state.comprehensive_cloud, 
-            st.session_state.standard_clouds_data, 
-            num_drops,
-            "综合评价云与标准云对比图", 
-            "评价值", 
-            "隶属度"
+        render_with_budget(
+            standard_drops_total(standard_clouds_data(), num_drops),
+            lambda grant: plots().plot_comprehensive_with_standards(
+                st.session_state.comprehensive_cloud, 
+                standard_clouds_data(), 
+                num_drops,
+                "综合评价云与标准云对比图", 
+                "评价值", 
+                "隶属度",
+                max_points=grant.points
+            )
         )
-        st.pyplot(fig)
         
         # 添加评价结果分析
         st.markdown("**评价结果分析：**")
         comp_ex = st.session_state.comprehensive_cloud['Ex']
         
         # 判断综合评价结果属于哪个等级
-        if comp_ex < 25:
-            level = "劣"
-            color = "🔴"
-        elif comp_ex < 50:
-            level = "差"
-            color = "🟠"
-        elif comp_ex < 75:
-            level = "一般"
-            color = "🟡"
-        elif comp_ex < 90:
-            level = "良"
-            color = "🟢"
-        else:
-            level = "优"
-            color = "🟢"
+        level = grade_level(comp_ex)
+        color = GRADE_ICONS[level]
         
         st.info(f"{color} 综合评价结果：**{level}** (评分值: {comp_ex:.2f})")
     else:
@@ -385,17 +249,141 @@ def main():
             st.session_state.current_page = "正向云发生器"
             st.rerun()
         
+        # 多维云发生器按钮
+        if st.button("🧭 多维云发生器", use_container_width=True,
+                    type="primary" if st.session_state.current_page == "多维云发生器" else "secondary"):
+            st.session_state.current_page = "多维云发生器"
+            st.rerun()
+        
+        # 评价记录按钮
+        if st.button("📚 评价记录", use_container_width=True,
+                    type="primary" if st.session_state.current_page == "评价记录" else "secondary"):
+            st.session_state.current_page = "评价记录"
+            st.rerun()
+        
+        st.divider()
+        st.radio("绘图方式", CHART_BACKENDS, key="chart_backend", horizontal=True,
+                 help="交互式图表在浏览器中绘制，可缩放平移，服务器只发送按图表宽度抽稀后的数据")
+        if st.session_state.chart_backend == "交互式图表":
+            st.slider("图表宽度（像素）", 400, 1600, 800, step=100, key="chart_width")
+        
         st.divider()
+        if st.toggle("⏱️ 性能分析", key="profiling_enabled", help="记录每次重跑各阶段的耗时，写入 logs/timings.jsonl"):
+            st.checkbox("统计内存（较慢）", key="profiling_memory")
+            st.checkbox("保存cProfile", key="profiling_cprofile", help="每次重跑保存一个 .prof 文件到 profiles 目录")
+        
+        load = get_governor().load()
+        st.caption(f"服务器负载：{load['负载率']:.0%}（活跃会话 {load['活跃会话']}，已降级 {load['已降级']} 次，"
+                   f"已拒绝 {load['已拒绝']} 次）",
+                   help="，".join(f"{name} {item['负载率']:.0%}" for name, item in load['资源'].items()))
         st.caption("云模型综合评价 v1.0.0")
     
+    # 开启性能分析时记录本次重跑各阶段耗时
+    if st.session_state.get('profiling_enabled', False):
+        profiling = profile_rerun(
+            label=st.session_state.current_page,
+            session_id=st.session_state.session_id,
+            track_memory=st.session_state.get('profiling_memory', False),
+            use_cprofile=st.session_state.get('profiling_cprofile', False)
+        )
+    else:
+        profiling = nullcontext()
+    
     # 根据当前页面显示对应内容
-    if st.session_state.current_page == "正向云发生器":
-        forward_cloud_generator()
+    with profiling as profiler:
+        if st.session_state.current_page == "正向云发生器":
+            forward_cloud_generator()
+        elif st.session_state.current_page == "多维云发生器":
+            multi_dimensional_cloud()
+        elif st.session_state.current_page == "评价记录":
+            evaluation_history()
+        else:
+            reverse_cloud_generator()
+    
+    if profiler is not None:
+        show_profiling_panel(profiler)
+
+def show_profiling_panel(profiler):
+    """在侧边栏显示本次重跑各阶段的耗时与内存"""
+    with st.sidebar:
+        st.subheader("⏱️ 本次重跑耗时")
+        st.metric("总耗时", f"{profiler.total_seconds * 1000:.1f} ms")
+        
+        summary = profiler.summary()
+        if summary:
+            pd = pandas()
+            df = pd.DataFrame(summary)
+            df['耗时(ms)'] = df.pop('耗时') * 1000
+            df['占比'] = (df['耗时(ms)'] / (profiler.total_seconds * 1000)).map(lambda x: f"{x:.0%}")
+            peak = df.pop('峰值内存')
+            if peak.notna().any():
+                df['峰值内存(MB)'] = peak.astype(float) / 2**20
+            st.dataframe(df, hide_index=True, use_container_width=True)
+        
+        startup_marks = marks()
+        if startup_marks:
+            st.caption("本进程冷启动：" + "，".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup_marks.items()))
+        
+        if profiler.profile_path:
+            st.caption(f"cProfile 已保存：{profiler.profile_path}")
+            with st.expander("cProfile 摘要"):
+                st.code(profiler.profile_report(), language=None)
+
+def track_job(state_key, name):
+    """跟踪会话中的后台任务：运行中显示进度，结束后取回
+
+    返回已完成任务的结果；任务未结束、失败或被取消时返回 None 并给出提示。
+    """
+    job = st.session_state[state_key]
+    if job is None:
+        return None
+    if job.active:
+        job_progress(state_key)
+        return None
+    
+    st.session_state[state_key] = None
+    if job.status == DONE:
+        return job.result
+    if job.status == FAILED:
+        st.error(f"{name}失败：{job.error}")
     else:
-        reverse_cloud_generator()
+        st.info(f"{name}已取消")
+    return None
+
+@st.fragment(run_every=0.5)
+def job_progress(state_key):
+    """显示后台任务进度，任务结束后刷新整个页面
+
+    只在任务运行时调用，空闲页面不会注册定时重跑。
+    """
+    job = st.session_state[state_key]
+    if job is None or not job.active:
+        st.rerun()
+    
+    st.progress(job.progress, text=f"{job.description}…{job.progress:.0%}")
+    if st.button("⏹️ 取消生成", key=f"cancel_{state_key}"):
+        job.cancel()
+
+def generate_drop_store(session_id, ex, en, he, num_drops, method, compact, progress):
+    """后台任务：在计算与磁盘预算内生成云滴，磁盘占用随返回的云滴存储一起释放
+
+    会话已有的云滴存储在新结果取回前仍计入磁盘预算。
+    """
+    governor = get_governor()
+    disk = governor.reserve(DISK, session_id, DropStore.required_bytes(num_drops, compact))
+    try:
+        with governor.reserve(WORK, session_id, num_drops):
+            drop_store = DropStore.generate(ex, en, he, num_drops, method=method, compact=compact, progress=progress)
+    except BaseException:
+        disk.release()
+        raise
+    drop_store.hold(disk)
+    return drop_store
 
 def forward_cloud_generator():
     """正向云发生器界面"""
+    pd = pandas()
+
     st.header("🔄 正向云发生器")
     st.markdown("从云模型参数生成云滴")
     
@@ -407,13 +395,13 @@ def forward_cloud_generator():
     with col_copy_std:
         if st.button("📋 复制配置", key="copy_standard_table", help="复制标准云配置到剪贴板"):
             # 生成可复制的文本格式
-            csv_text = st.session_state.standard_clouds_data.to_csv(index=False, sep='\t')
+            csv_text = standard_clouds_data().to_csv(index=False, sep='\t')
             st.code(csv_text, language=None)
             st.success("数据已生成，请手动复制上方文本框中的内容")
     
     # 使用data_editor来编辑标准云数据
     edited_data = st.data_editor(
-        st.session_state.standard_clouds_data,
+        standard_clouds_data(),
         use_container_width=True,
         num_rows="dynamic",
         column_config={
@@ -477,7 +465,8 @@ def forward_cloud_generator():
             en = st.number_input("熵 En", value=float(st.session_state.forward_en), step=0.01)
             he = st.number_input("超熵 He", value=float(st.session_state.forward_he), step=0.01)
         
-        num_drops = st.number_input("云滴数量", value=st.session_state.forward_num_drops, min_value=100, max_value=10000, step=100, format="%d")
+        num_drops = st.number_input("云滴数量", value=st.session_state.forward_num_drops, min_value=100, max_value=100_000_000, step=100, format="%d",
+                                    help="云滴按块写入磁盘，支持大规模生成")
         
         # 保存参数到session state
         st.session_state.forward_ex = ex
@@ -485,70 +474,109 @@ def forward_cloud_generator():
         st.session_state.forward_he = he
         st.session_state.forward_num_drops = num_drops
         
+        sampling = st.selectbox(
+            "采样方式",
+            list(SAMPLING_OPTIONS),
+            index=list(SAMPLING_OPTIONS).index(st.session_state.forward_sampling),
+            help="准蒙特卡洛采样使用置乱Halton序列，较少云滴即可得到稳定的统计量"
+        )
+        st.session_state.forward_sampling = sampling
+        
+        compact = st.checkbox(
+            "紧凑存储",
+            value=st.session_state.forward_compact,
+            help="云滴以float32保存，隶属度按需由Ex、En计算，存储占用约为原来的1/4"
+        )
+        st.session_state.forward_compact = compact
+        
         enhanced_mode = st.checkbox("增强模式（计算隶属度）", value=True)
         
+        st.caption(f"需要约 {DropStore.required_bytes(num_drops, compact) / 2**20:,.0f} MB 磁盘空间，"
+                   f"每个会话最多 {get_governor().budgets[DISK][1] / 2**20:,.0f} MB（含当前结果）")
+        
         # 生成按钮
         if st.button("🎯 生成云滴", type="primary"):
             if num_drops > 0:
-                cloud_drops, memberships = generate_cloud_drops(ex, en, he, num_drops)
-                st.session_state.forward_cloud_drops = cloud_drops
-                st.session_state.forward_memberships = memberships
-                st.success(f"成功生成 {num_drops} 个云滴！")
+                session_id = st.session_state.session_id
+                job_key = ("正向云滴", session_id, ex, en, he, num_drops, sampling, compact)
+                try:
+                    job = get_job_manager().submit(
+                        session_id, job_key, generate_drop_store,
+                        session_id, ex, en, he, num_drops, SAMPLING_OPTIONS[sampling], compact,
+                        description=f"生成 {num_drops} 个云滴"
+                    )
+                    st.session_state.forward_job = job
+                    job.wait(JOB_WAIT_SECONDS)
+                except JobLimitExceeded as e:
+                    st.warning(str(e))
             else:
                 st.error("云滴数量必须大于0")
         
+        drop_store = track_job('forward_job', "云滴生成")
+        if drop_store is not None:
+            if st.session_state.forward_drop_store is not None:
+                st.session_state.forward_drop_store.delete()
+            st.session_state.forward_drop_store = drop_store
+            st.success(f"成功生成 {len(drop_store)} 个云滴！")
+        
         # 操作按钮
         st.subheader("📋 操作")
         col_btn1, col_btn2 = st.columns(2)
         
         with col_btn1:
             if st.button("📤 导出数据"):
-                if st.session_state.forward_cloud_drops is not None:
-                    df = pd.DataFrame({
-                        '云滴值': st.session_state.forward_cloud_drops,
-                        '隶属度': st.session_state.forward_memberships
-                    })
-                    csv = df.to_csv(index=False)
-                    st.download_button(
-                        label="下载CSV文件",
-                        data=csv,
-                        file_name=f"cloud_drops_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
+                if st.session_state.forward_drop_store is not None:
+                    drop_store = st.session_state.forward_drop_store
+                    csv_path = drop_store.write_csv(max_drops=EXPORT_MAX_DROPS)
+                    if len(drop_store) > EXPORT_MAX_DROPS:
+                        st.caption(f"云滴较多，只导出前 {EXPORT_MAX_DROPS:,} 个（云滴独立同分布，前 n 个即为代表性样本）")
+                    with open(csv_path, 'rb') as csv_file:
+                        st.download_button(
+                            label="下载CSV文件",
+                            data=csv_file,
+                            file_name=f"cloud_drops_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                            mime="text/csv"
+                        )
                 else:
                     st.warning("请先生成云滴数据")
         
         with col_btn2:
             if st.button("🗑️ 清空结果"):
-                st.session_state.forward_cloud_drops = None
-                st.session_state.forward_memberships = None
+                if st.session_state.forward_job is not None:
+                    st.session_state.forward_job.cancel()
+                    st.session_state.forward_job = None
+                if st.session_state.forward_drop_store is not None:
+                    st.session_state.forward_drop_store.delete()
+                st.session_state.forward_drop_store = None
                 st.success("结果已清空")
     
     with col2:
         st.subheader("📈 结果显示")
         
-        if st.session_state.forward_cloud_drops is not None:
+        if st.session_state.forward_drop_store is not None:
             # 统计信息
-            cloud_drops = st.session_state.forward_cloud_drops
-            memberships = st.session_state.forward_memberships
+            drop_store = st.session_state.forward_drop_store
+            stats = drop_store.stats()
             
             st.markdown("**统计信息：**")
             stats_col1, stats_col2, stats_col3, stats_col4 = st.columns(4)
             
             with stats_col1:
-                st.metric("云滴数量", len(cloud_drops))
+                st.metric("云滴数量", stats['云滴数量'])
             with stats_col2:
-                st.metric("平均值", f"{np.mean(cloud_drops):.2f}")
+                st.metric("平均值", f"{stats['平均值']:.2f}")
             with stats_col3:
-                st.metric("标准差", f"{np.std(cloud_drops):.2f}")
+                st.metric("标准差", f"{stats['标准差']:.2f}")
             with stats_col4:
-                st.metric("平均隶属度", f"{np.mean(memberships):.3f}")
+                st.metric("平均隶属度", f"{stats['平均隶属度']:.3f}")
+            st.caption("分位数：" + "，".join(f"P{q * 100:g}={v:.2f}" for q, v in stats['分位数'].items()))
             
             # 数据表格（前100个）
             st.markdown("**云滴数据（前100个）：**")
+            cloud_drops, memberships = drop_store.head(100)
             display_data = pd.DataFrame({
-                '云滴值': cloud_drops[:100],
-                '隶属度': memberships[:100]
+                '云滴值': cloud_drops,
+                '隶属度': memberships
             })
             
             # 添加复制按钮
@@ -566,7 +594,7 @@ def forward_cloud_generator():
             st.info("请先生成云滴数据以查看结果")
     
     # 可视化部分
-    if st.session_state.forward_cloud_drops is not None:
+    if st.session_state.forward_drop_store is not None:
         st.subheader("📊 数据可视化")
         
         # 图表标签自定义
@@ -581,21 +609,29 @@ def forward_cloud_generator():
             ["散点图", "直方图", "云模型图", "组合图"]
         )
         
-        cloud_drops = st.session_state.forward_cloud_drops
-        memberships = st.session_state.forward_memberships
+        # 散点类图表最多绘制前 PLOT_MAX_DROPS 个云滴，直方图使用生成时统计的全部云滴
+        drop_store = st.session_state.forward_drop_store
+        requested = min(len(drop_store), PLOT_MAX_DROPS)
         
         if viz_option == "散点图":
-            fig = plot_scatter(cloud_drops, memberships, custom_title, custom_xlabel, custom_ylabel)
-            st.pyplot(fig)
+            def draw(grant):
+                # 超出预算时改为密度图
+                if grant.downgraded:
+                    counts, edges = drop_store.stats()['细分直方图']
+                    return plots().plot_density(counts, edges, drop_store.ex, drop_store.en, custom_title, custom_xlabel, custom_ylabel)
+                return plots().plot_scatter(*drop_store.head(grant.points), custom_title, custom_xlabel, custom_ylabel)
+            render_with_budget(requested, draw)
         elif viz_option == "直方图":
-            fig = plot_histogram(cloud_drops, memberships, custom_title, custom_xlabel, "频数")
-            st.pyplot(fig)
+            counts, edges = drop_store.histogram()
+            show_figure(plots().plot_histogram_counts(counts, edges, drop_store.ex, drop_store.en, custom_title, custom_xlabel, "频数"))
         elif viz_option == "云模型图":
-            fig = plot_cloud_visualization(ex, en, he, cloud_drops, memberships, custom_title, custom_xlabel, custom_ylabel)
-            st.pyplot(fig)
+            render_with_budget(requested, lambda grant: plots().plot_cloud_visualization(
+                ex, en, he, *drop_store.head(grant.points), custom_title, custom_xlabel, custom_ylabel
+            ))
         elif viz_option == "组合图":
-            fig = plot_combined_visualization(ex, en, he, cloud_drops, memberships, custom_title, custom_xlabel, custom_ylabel)
-            st.pyplot(fig)
+            render_with_budget(requested, lambda grant: plots().plot_combined_visualization(
+                ex, en, he, *drop_store.head(grant.points), custom_title, custom_xlabel, custom_ylabel
+            ))
     
     # 评价标准云图
     st.subheader("🌟 评价标准云图")
@@ -605,8 +641,12 @@ def forward_cloud_generator():
         std_ylabel = st.text_input("标准云图Y轴标签", value="隶属度")
     
     if st.button("📊 绘制评价标准云图"):
-        fig = plot_standard_clouds(st.session_state.standard_clouds_data, std_title, std_xlabel, std_ylabel)
-        st.pyplot(fig)
+        render_with_budget(
+            standard_drops_total(standard_clouds_data()),
+            lambda grant: plots().plot_standard_clouds(
+                standard_clouds_data(), std_title, std_xlabel, std_ylabel, max_points=grant.points
+            )
+        )
 
 def reverse_cloud_generator():
     """逆向云发生器界面 - 综合评价云生成"""
@@ -643,15 +683,7 @@ def reverse_cloud_generator():
             
             if data_text:
                 try:
-                    lines = [line.strip() for line in data_text.split('\n') if line.strip()]
-                    # 处理制表符分隔的数据（从Excel复制的数据通常是制表符分隔）
-                    processed_lines = []
-                    for line in lines:
-                        if '\t' in line:  # 制表符分隔
-                            processed_lines.append([float(x.strip()) for x in line.split('\t') if x.strip()])
-                        else:  # 逗号分隔
-                            processed_lines.append([float(x.strip()) for x in line.split(',') if x.strip()])
-                    expert_scores = np.array(processed_lines)
+                    expert_scores = parse_expert_scores(data_text)
                 except ValueError:
                     st.error("请输入有效的数值，支持逗号或制表符分隔")
         
@@ -664,10 +696,12 @@ def reverse_cloud_generator():
             
             if uploaded_file is not None:
                 try:
-                    if uploaded_file.name.endswith('.csv'):
-                        df = pd.read_csv(uploaded_file, header=None)  # 不使用第一行作为列名
-                    else:
-                        df = pd.read_excel(uploaded_file, header=None)  # 不使用第一行作为列名
+                    pd = pandas()
+                    with stage("文件读取"):
+                        if uploaded_file.name.endswith('.csv'):
+                            df = pd.read_csv(uploaded_file, header=None)  # 不使用第一行作为列名
+                        else:
+                            df = pd.read_excel(uploaded_file, header=None)  # 不使用第一行作为列名
                     expert_scores = df.values
                     st.success(f"成功读取文件：{uploaded_file.name}")
                 except Exception as e:
@@ -686,6 +720,8 @@ def reverse_cloud_generator():
     
     with col2:
         if expert_scores is not None:
+            pd = pandas()
+            
             # 标题和复制按钮
             preview_title_col, preview_copy_col = st.columns([3, 1])
             with preview_title_col:
@@ -725,8 +761,8 @@ def reverse_cloud_generator():
         
         weight_input_method = st.radio(
             "权重输入方式",
-            ["等权重", "手动输入权重", "上传权重文件"],
-            index=["等权重", "手动输入权重", "上传权重文件"].index(st.session_state.reverse_weight_method)
+            WEIGHT_INPUT_METHODS,
+            index=WEIGHT_INPUT_METHODS.index(st.session_state.reverse_weight_method)
         )
         st.session_state.reverse_weight_method = weight_input_method
         
@@ -749,16 +785,7 @@ def reverse_cloud_generator():
              
              if weight_text:
                  try:
-                     # 处理多种分隔符格式
-                     weight_text = weight_text.strip()
-                     if '\n' in weight_text:  # 换行分隔
-                         weights = [float(x.strip()) for x in weight_text.split('\n') if x.strip()]
-                     elif '\t' in weight_text:  # 制表符分隔（从Excel复制）
-                         weights = [float(x.strip()) for x in weight_text.split('\t') if x.strip()]
-                     else:  # 逗号分隔
-                         weights = [float(x.strip()) for x in weight_text.split(',') if x.strip()]
-                     
-                     weights = np.array(weights)
+                     weights = parse_weights(weight_text)
                      
                      if len(weights) != num_indicators:
                          st.error(f"权重数量({len(weights)})与指标数量({num_indicators})不匹配")
@@ -786,6 +813,18 @@ def reverse_cloud_generator():
                  weights = np.array(weights)
                  if np.sum(weights) > 0:
                      weights = weights / np.sum(weights)  # 归一化
+        elif weight_input_method == "客观赋权":
+            objective_method = st.radio("客观赋权方法", list(OBJECTIVE_WEIGHT_LABELS), horizontal=True,
+                                        key="objective_weight_method",
+                                        help="熵权法：专家打分越分散的指标权重越大；CRITIC：兼顾指标的区分度与指标间的相关性；"
+                                             "变异系数法：权重与打分的标准差/均值成正比")
+            try:
+                with stage("客观赋权"):
+                    weights = objective_weights(expert_scores, OBJECTIVE_WEIGHT_LABELS[objective_method])
+                st.info(f"已按{objective_method}由专家打分计算各指标权重")
+            except ValueError as e:
+                st.error(str(e))
+                weights = np.ones(num_indicators) / num_indicators
         else:  # 上传权重文件
             weight_file = st.file_uploader(
                 "上传权重文件（CSV或Excel）",
@@ -796,10 +835,12 @@ def reverse_cloud_generator():
             
             if weight_file is not None:
                 try:
-                    if weight_file.name.endswith('.csv'):
-                        weight_df = pd.read_csv(weight_file, header=None)
-                    else:
-                        weight_df = pd.read_excel(weight_file, header=None)
+                    pd = pandas()
+                    with stage("文件读取"):
+                        if weight_file.name.endswith('.csv'):
+                            weight_df = pd.read_csv(weight_file, header=None)
+                        else:
+                            weight_df = pd.read_excel(weight_file, header=None)
                     
                     # 尝试从第一行或第一列读取权重
                     if weight_df.shape[0] == 1:  # 一行数据
@@ -839,17 +880,63 @@ def reverse_cloud_generator():
     
     # 步骤3：生成指标评价云
     st.subheader("☁️ 步骤3：生成指标评价云")
+    st.text_input("项目名称", key="project_name", help="评价结果按项目保存到评价库，可在“评价记录”中查询和对比")
+    
+    with st.expander("👥 专家共识过滤", expanded=False):
+        consensus_enabled = st.checkbox("启用专家共识过滤", value=False, key="consensus_enabled",
+                                        help="按各专家打分相对群体中位数的稳健z分数识别离群专家")
+        consensus_mode = st.radio("离群专家处理方式", list(CONSENSUS_MODES), horizontal=True,
+                                  key="consensus_mode", disabled=not consensus_enabled)
+        consensus_threshold = st.slider("偏离度阈值", 1.5, 6.0, CONSENSUS_THRESHOLD, step=0.1, key="consensus_threshold",
+                                        disabled=not consensus_enabled,
+                                        help=f"正常专家的偏离度在1附近；少于{MIN_CONSENSUS_EXPERTS}位专家时不做过滤")
     
     if st.button("🎯 生成指标评价云", type="primary"):
         if expert_scores is not None and len(weights) > 0:
-            indicator_clouds = calculate_indicator_clouds(expert_scores, weights)
-            st.session_state.indicator_clouds = indicator_clouds
-            st.success("指标评价云生成完成！")
+            expert_weights = None
+            options = None
+            st.session_state.consensus_result = None
+            if consensus_enabled:
+                mode = CONSENSUS_MODES[consensus_mode]
+                with stage("专家共识过滤"):
+                    consensus = expert_consensus(expert_scores, consensus_threshold, mode)
+                st.session_state.consensus_result = consensus
+                expert_weights = consensus['专家权重']
+                options = {'共识': mode, '阈值': consensus_threshold}
+            # 输入与评价库中的记录完全相同时直接载入
+            input_hash = inputs_hash(expert_scores, weights, options)
+            with stage("评价库查询"):
+                record = get_store().find(input_hash, st.session_state.project_name)
+            if record is not None:
+                st.session_state.indicator_clouds = record['指标云']
+                st.success(f"输入与评价库中的记录 #{record['编号']}（{record['项目']}，{record['时间']}）相同，已直接载入")
+            else:
+                st.session_state.indicator_clouds = calculate_indicator_clouds(expert_scores, weights, expert_weights)
+                st.success("指标评价云生成完成！")
+            st.session_state.evaluation_hash = input_hash
+            st.session_state.evaluation_id = None
         else:
             st.error("请先输入专家打分数据和权重")
     
+    # 显示专家共识过滤结果
+    consensus = st.session_state.consensus_result
+    if consensus is not None:
+        affected = consensus['受影响专家']
+        if consensus['已回退']:
+            st.warning(f"按当前阈值剔除后保留的专家不足 {MIN_KEPT_EXPERTS} 位，无法估计指标云，已改为全部专家等权；"
+                       "请调高偏离度阈值或改用降低权重")
+        elif affected:
+            pd = pandas()
+            st.warning(f"共 {len(consensus['专家权重'])} 位专家，其中 {len(affected)} 位偏离群体共识，已剔除或降低权重")
+            st.dataframe(pd.DataFrame(affected).head(1000), use_container_width=True, hide_index=True)
+        elif len(consensus['专家权重']) < MIN_CONSENSUS_EXPERTS:
+            st.info(f"专家少于 {MIN_CONSENSUS_EXPERTS} 位，未做共识过滤")
+        else:
+            st.info("所有专家的打分均与群体共识一致")
+    
     # 显示指标评价云结果
     if st.session_state.indicator_clouds is not None:
+        pd = pandas()
         st.markdown("**指标评价云参数：**")
         indicator_df = pd.DataFrame(st.session_state.indicator_clouds)
         
@@ -877,6 +964,23 @@ def reverse_cloud_generator():
                 'He': he_comp
             }
             st.success("综合评价云生成完成！")
+            
+            # 保存到评价库，同一项目中相同输入只保存一次
+            if st.session_state.evaluation_hash is not None:
+                try:
+                    with stage("评价库保存"):
+                        evaluation_id, created = get_store().save(
+                            st.session_state.project_name or DEFAULT_PROJECT,
+                            st.session_state.evaluation_hash,
+                            len(st.session_state.expert_scores),
+                            st.session_state.indicator_clouds,
+                            st.session_state.comprehensive_cloud
+                        )
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.evaluation_id = evaluation_id
+                    st.caption(f"{'已保存到' if created else '已存在于'}评价库：记录 #{evaluation_id}")
         else:
             st.error("请先生成指标评价云")
     
@@ -913,7 +1017,7 @@ def reverse_cloud_generator():
             st.markdown("<br>", unsafe_allow_html=True)  # 添加间距对齐
             if st.button("➕ 导入到标准云配置", key="add_to_standard", help="将当前综合评价云参数导入到标准云配置表格的最后一行"):
                 # 直接更新最后一行（综合评价云行）的数据
-                last_index = len(st.session_state.standard_clouds_data) - 1
+                last_index = len(standard_clouds_data()) - 1
                 st.session_state.standard_clouds_data.loc[last_index, '云名称'] = cloud_name if cloud_name.strip() else "综合评价云"
                 st.session_state.standard_clouds_data.loc[last_index, 'Ex'] = comp_cloud['Ex']
                 st.session_state.standard_clouds_data.loc[last_index, 'En'] = comp_cloud['En']
@@ -945,41 +1049,33 @@ def reverse_cloud_generator():
         
         with viz_cols[0]:
             if st.button("📊 散点图", use_container_width=True):
-                cloud_drops, memberships = generate_cloud_drops(
-                    comp_cloud['Ex'], comp_cloud['En'], comp_cloud['He'], num_drops
-                )
-                fig = plot_scatter(cloud_drops, memberships, f"{viz_title}散点图", viz_xlabel, viz_ylabel)
-                st.pyplot(fig)
+                render_with_budget(num_drops, lambda grant: plots().plot_scatter(
+                    *generate_cloud_drops(comp_cloud['Ex'], comp_cloud['En'], comp_cloud['He'], grant.points),
+                    f"{viz_title}散点图", viz_xlabel, viz_ylabel
+                ))
         
         with viz_cols[1]:
             if st.button("📈 直方图", use_container_width=True):
-                cloud_drops, memberships = generate_cloud_drops(
-                    comp_cloud['Ex'], comp_cloud['En'], comp_cloud['He'], num_drops
-                )
-                fig = plot_histogram(cloud_drops, memberships, f"{viz_title}分布图", viz_xlabel, "频数")
-                st.pyplot(fig)
+                render_with_budget(num_drops, lambda grant: plots().plot_histogram(
+                    *generate_cloud_drops(comp_cloud['Ex'], comp_cloud['En'], comp_cloud['He'], grant.points),
+                    f"{viz_title}分布图", viz_xlabel, "频数"
+                ))
         
         with viz_cols[2]:
             if st.button("☁️ 云模型图", use_container_width=True):
-                cloud_drops, memberships = generate_cloud_drops(
-                    comp_cloud['Ex'], comp_cloud['En'], comp_cloud['He'], num_drops
-                )
-                fig = plot_cloud_visualization(
+                render_with_budget(num_drops, lambda grant: plots().plot_cloud_visualization(
                     comp_cloud['Ex'], comp_cloud['En'], comp_cloud['He'],
-                    cloud_drops, memberships, f"{viz_title}模型", viz_xlabel, viz_ylabel
-                )
-                st.pyplot(fig)
+                    *generate_cloud_drops(comp_cloud['Ex'], comp_cloud['En'], comp_cloud['He'], grant.points),
+                    f"{viz_title}模型", viz_xlabel, viz_ylabel
+                ))
         
         with viz_cols[3]:
             if st.button("🔄 组合图", use_container_width=True):
-                cloud_drops, memberships = generate_cloud_drops(
-                    comp_cloud['Ex'], comp_cloud['En'], comp_cloud['He'], num_drops
-                )
-                fig = plot_combined_visualization(
+                render_with_budget(num_drops, lambda grant: plots().plot_combined_visualization(
                     comp_cloud['Ex'], comp_cloud['En'], comp_cloud['He'],
-                    cloud_drops, memberships, f"{viz_title}组合图", viz_xlabel, viz_ylabel
-                )
-                st.pyplot(fig)
+                    *generate_cloud_drops(comp_cloud['Ex'], comp_cloud['En'], comp_cloud['He'], grant.points),
+                    f"{viz_title}组合图", viz_xlabel, viz_ylabel
+                ))
         
         with viz_cols[4]:
             if st.button("⚖️ 标准对比图", use_container_width=True):
@@ -991,36 +1087,26 @@ def reverse_cloud_generator():
                 
                 if st.session_state.comprehensive_cloud is not None:
                     num_drops = st.number_input("云滴数量", value=1000, min_value=100, max_value=5000, step=100, key="comp_drops")
-                    fig = plot_comprehensive_with_standards(
-                        st.session_state.comprehensive_cloud, 
-                        st.session_state.standard_clouds_data, 
-                        num_drops,
-                        comp_title, 
-                        comp_xlabel, 
-                        comp_ylabel
+                    render_with_budget(
+                        standard_drops_total(standard_clouds_data(), num_drops),
+                        lambda grant: plots().plot_comprehensive_with_standards(
+                            st.session_state.comprehensive_cloud, 
+                            standard_clouds_data(), 
+                            num_drops,
+                            comp_title, 
+                            comp_xlabel, 
+                            comp_ylabel,
+                            max_points=grant.points
+                        )
                     )
-                    st.pyplot(fig)
                     
                     # 添加评价结果分析
                     st.markdown("**评价结果分析：**")
                     comp_ex = st.session_state.comprehensive_cloud['Ex']
                     
                     # 判断综合评价结果属于哪个等级
-                    if comp_ex < 25:
-                        level = "劣"
-                        color = "🔴"
-                    elif comp_ex < 50:
-                        level = "差"
-                        color = "🟠"
-                    elif comp_ex < 75:
-                        level = "一般"
-                        color = "🟡"
-                    elif comp_ex < 90:
-                        level = "良"
-                        color = "🟢"
-                    else:
-                        level = "优"
-                        color = "🟢"
+                    level = grade_level(comp_ex)
+                    color = GRADE_ICONS[level]
                     
                     st.info(f"{color} 综合评价结果：**{level}** (评分值: {comp_ex:.2f})")
                 else:
@@ -1033,8 +1119,7 @@ def reverse_cloud_generator():
     with col_btn1:
         if st.button("📤 导出指标云"):
             if st.session_state.indicator_clouds is not None:
-                df = pd.DataFrame(st.session_state.indicator_clouds)
-                csv = df.to_csv(index=False)
+                csv = indicator_clouds_to_csv(st.session_state.indicator_clouds)
                 st.download_button(
                     label="下载指标云CSV",
                     data=csv,
@@ -1047,8 +1132,7 @@ def reverse_cloud_generator():
     with col_btn2:
         if st.button("📤 导出综合云"):
             if st.session_state.comprehensive_cloud is not None:
-                df = pd.DataFrame([st.session_state.comprehensive_cloud])
-                csv = df.to_csv(index=False)
+                csv = comprehensive_cloud_to_csv(st.session_state.comprehensive_cloud)
                 st.download_button(
                     label="下载综合云CSV",
                     data=csv,
@@ -1064,6 +1148,9 @@ def reverse_cloud_generator():
             st.session_state.indicator_weights = None
             st.session_state.indicator_clouds = None
             st.session_state.comprehensive_cloud = None
+            st.session_state.evaluation_hash = None
+            st.session_state.evaluation_id = None
+            st.session_state.consensus_result = None
             st.session_state.reverse_data_text = ""
             st.session_state.reverse_weight_text = ""
             st.success("所有数据已清空")
@@ -1089,5 +1176,233 @@ def reverse_cloud_generator():
             st.success("参数已导入到正向云发生器！正在跳转...")
             st.rerun()
 
+def evaluation_history():
+    """评价记录：按项目、等级与日期查询评价库，对比多次评价"""
+    pd = pandas()
+    
+    st.header("📚 评价记录")
+    st.markdown("每次生成综合评价云时自动保存，输入相同的评价只保存一次")
+    
+    store = get_store()
+    projects = store.projects()
+    if not projects:
+        st.info("评价库中还没有记录，请先在逆向云发生器中生成综合评价云")
+        return
+    
+    # 筛选条件
+    filter_col1, filter_col2, filter_col3 = st.columns(3)
+    with filter_col1:
+        project = st.selectbox("项目", ["全部项目"] + list(projects),
+                               format_func=lambda name: name if name == "全部项目" else f"{name}（{projects[name]}）")
+    with filter_col2:
+        grades = st.multiselect("等级", list(GRADE_LEVELS))
+    with filter_col3:
+        date_range = st.date_input("日期范围", value=(), help="不选择时显示全部日期")
+    
+    since = until = None
+    if len(date_range) == 2:
+        since, until = date_range
+    elif len(date_range) == 1:
+        since = date_range[0]
+    
+    with stage("评价库查询"):
+        records = store.list(None if project == "全部项目" else project, grades, since, until)
+    if not records:
+        st.info("没有符合条件的评价记录")
+        return
+    
+    df = pd.DataFrame(records).drop(columns=['输入哈希'])
+    stat_col1, stat_col2, stat_col3 = st.columns(3)
+    with stat_col1:
+        st.metric("记录数", len(df))
+    with stat_col2:
+        st.metric("平均 Ex", f"{df['Ex'].mean():.2f}")
+    with stat_col3:
+        st.metric("最常见等级", df['等级'].mode().iloc[0])
+    st.dataframe(df, hide_index=True, use_container_width=True)
+    
+    # 对比多次评价
+    st.subheader("⚖️ 评价对比")
+    selected = st.multiselect("选择要对比的记录", df['编号'].tolist(), max_selections=10,
+                              format_func=lambda i: f"#{i}")
+    if selected:
+        compared = store.get(selected)
+        st.dataframe(
+            pd.DataFrame([{'编号': r['编号'], '项目': r['项目'], '时间': r['时间'], 'Ex': r['Ex'], 'En': r['En'],
+                           'He': r['He'], '等级': r['等级']} for r in compared]),
+            hide_index=True, use_container_width=True
+        )
+        st.markdown("**各指标 Ex 对比：**")
+        st.dataframe(
+            pd.DataFrame({f"#{r['编号']}": {c['指标']: c['Ex'] for c in r['指标云']} for r in compared}),
+            use_container_width=True
+        )
+    
+    report_builder(records)
+
+def generate_nd_summary(session_id, params, num_drops, method, bins, progress):
+    """后台任务：在计算预算内按块生成多维云滴并统计，返回统计结果与对应的参数"""
+    with get_governor().reserve(WORK, session_id, num_drops * len(params['Ex'])):
+        summary = summarize_nd_cloud(params['Ex'], params['En'], params['He'], num_drops, method, bins=bins,
+                                     progress=progress)
+    return {**summary, '参数': params, '云滴数': num_drops}
+
+def multi_dimensional_cloud():
+    """多维云发生器：各维独立的 (Ex, En, He)，按联合隶属度评价，任选两维绘制密度图"""
+    pd = pandas()
+
+    st.header("🧭 多维云发生器")
+    st.markdown("适用于风险可能性 × 影响程度等多维评价：各维分别给出 Ex、En、He，云滴的隶属度为各维隶属度之积")
+    
+    num_dims = st.number_input("维数", min_value=2, max_value=ND_MAX_DIMS, value=2, step=1, key="nd_dims")
+    defaults = pd.DataFrame({
+        '维度': ['可能性', '影响程度', '维度3', '维度4'][:num_dims],
+        'Ex': [50.0, 60.0, 50.0, 50.0][:num_dims],
+        'En': [10.0, 8.0, 10.0, 10.0][:num_dims],
+        'He': [1.0, 0.8, 1.0, 1.0][:num_dims],
+    })
+    params_df = st.data_editor(
+        defaults, key=f"nd_params_{num_dims}", hide_index=True, use_container_width=True,
+        column_config={
+            "En": st.column_config.NumberColumn("En", min_value=0.001, step=0.01),
+            "He": st.column_config.NumberColumn("He", min_value=0.0, step=0.01),
+        }
+    )
+    
+    col_drops, col_sampling, col_bins = st.columns(3)
+    with col_drops:
+        num_drops = st.number_input("云滴数量", value=1_000_000, min_value=1000, max_value=ND_MAX_DROPS, step=100_000,
+                                    format="%d", key="nd_num_drops", help="云滴按块生成并累积统计，不占用与云滴数量成正比的内存")
+    with col_sampling:
+        sampling = st.selectbox("采样方式", list(SAMPLING_OPTIONS), key="nd_sampling")
+    with col_bins:
+        bins = st.slider("密度图分箱数", 40, 300, DENSITY_BINS, step=20, key="nd_bins")
+    
+    if st.button("🎯 生成多维云", type="primary", disabled=st.session_state.nd_job is not None):
+        params = {column: params_df[column].astype(float).tolist() for column in ('Ex', 'En', 'He')}
+        params['维度'] = params_df['维度'].astype(str).tolist()
+        if params_df[['Ex', 'En', 'He']].isna().any().any() or min(params['En']) <= 0:
+            st.error("请为每一维填写 Ex、En、He，且 En 必须大于0")
+        else:
+            session_id = st.session_state.session_id
+            job_key = ("多维云", session_id, repr(params), num_drops, sampling, bins)
+            try:
+                job = get_job_manager().submit(
+                    session_id, job_key, generate_nd_summary, session_id, params, num_drops, SAMPLING_OPTIONS[sampling], bins,
+                    description=f"生成 {num_drops} 个{num_dims}维云滴"
+                )
+                st.session_state.nd_job = job
+                job.wait(JOB_WAIT_SECONDS)
+            except JobLimitExceeded as e:
+                st.warning(str(e))
+    
+    nd_result = track_job('nd_job', "多维云生成")
+    if nd_result is not None:
+        st.session_state.nd_result = nd_result
+    
+    result = st.session_state.nd_result
+    if result is None:
+        return
+    
+    params = result['参数']
+    names = params['维度']
+    ex_hat, en_hat, he_hat = result['逆向估计']
+    st.subheader("📊 逆向估计")
+    st.caption(f"由全部 {result['云滴数']:,} 个云滴逐维估计，平均联合隶属度 {result['平均隶属度']:.4f}")
+    st.dataframe(pd.DataFrame({
+        '维度': names,
+        'Ex（设定）': params['Ex'], 'Ex（估计）': ex_hat,
+        'En（设定）': params['En'], 'En（估计）': en_hat,
+        'He（设定）': params['He'], 'He（估计）': he_hat,
+    }), hide_index=True, use_container_width=True)
+    
+    st.subheader("🗺️ 二维密度图")
+    dims = list(range(len(names)))
+    col_x, col_y = st.columns(2)
+    with col_x:
+        x_dim = st.selectbox("横轴", dims, index=0, format_func=lambda d: names[d], key="nd_x_dim")
+    with col_y:
+        y_choices = [d for d in dims if d != x_dim]
+        y_dim = st.selectbox("纵轴", y_choices, index=0, format_func=lambda d: names[d], key=f"nd_y_dim_{x_dim}")
+    if len(names) > 2:
+        st.caption("密度为全部云滴在所选两维上的投影；等值线为这两维的联合隶属度")
+    
+    # 生成时已统计每对维度的直方图，交换横纵轴时转置
+    pair = (min(x_dim, y_dim), max(x_dim, y_dim))
+    density = result['密度'][pair] if x_dim < y_dim else result['密度'][pair].T
+    shown = [x_dim, y_dim]
+    show_figure(plots().plot_cloud_2d_density(
+        density, [result['范围'][d] for d in shown], np.array(params['Ex'])[shown], np.array(params['En'])[shown],
+        f"{names[x_dim]} × {names[y_dim]} 云滴密度", names[x_dim], names[y_dim]
+    ))
+    
+    drops, memberships = result['样本']
+    sample_df = pd.DataFrame(drops, columns=names).assign(联合隶属度=memberships)
+    st.download_button(
+        f"下载前 {len(sample_df)} 个云滴（CSV）",
+        data=sample_df.to_csv(index=False).encode('utf-8-sig'),
+        file_name=f"nd_cloud_drops_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+
+def generate_report_file(session_id, evaluation_ids, fmt, standard_data, progress):
+    """后台任务：在计算预算内读取评价记录并生成报告到临时文件，返回 ReportFile
+
+    报告文件按实际大小计入会话的磁盘预算，超出时删除文件并报错。
+    """
+    governor = get_governor()
+    cost = len(evaluation_ids) * standard_drops_total(standard_data, REPORT_NUM_DROPS)
+    file_name = f"评价报告_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    with governor.reserve(WORK, session_id, cost):
+        evaluations = get_store().get(evaluation_ids)
+        report_file = ReportFile.build(evaluations, standard_data, file_name, fmt, progress=progress)
+    try:
+        report_file.hold(governor.reserve(DISK, session_id, report_file.size))
+    except ServerBusy:
+        report_file.delete()
+        raise
+    return report_file
+
+def report_builder(records):
+    """把选中的评价记录导出为 DOCX 报告或图片ZIP"""
+    st.subheader("📄 生成报告")
+    scope = st.radio("报告范围", ["选中的记录", "当前筛选的全部记录"], horizontal=True, key="report_scope")
+    if scope == "选中的记录":
+        evaluation_ids = st.multiselect("选择记录", [r['编号'] for r in records], format_func=lambda i: f"#{i}",
+                                        key="report_ids")
+    else:
+        evaluation_ids = [r['编号'] for r in records]
+    report_format = st.radio("报告格式", list(REPORT_FORMATS), horizontal=True, key="report_format")
+    st.caption("每次评价包含指标评价云表、综合评价云参数与等级、综合评价云与标准云对比图；对比图在多个进程中并行渲染")
+    
+    if st.button("📄 生成报告", disabled=not evaluation_ids or st.session_state.report_job is not None):
+        session_id = st.session_state.session_id
+        fmt = REPORT_FORMATS[report_format]
+        job_key = ("评价报告", session_id, tuple(evaluation_ids), fmt)
+        try:
+            job = get_job_manager().submit(
+                session_id, job_key, generate_report_file, session_id, list(evaluation_ids), fmt, standard_clouds_data().copy(),
+                description=f"生成 {len(evaluation_ids)} 次评价的报告"
+            )
+            st.session_state.report_job = job
+            if st.session_state.report_file is not None:
+                st.session_state.report_file.delete()
+                st.session_state.report_file = None
+            job.wait(JOB_WAIT_SECONDS)
+        except JobLimitExceeded as e:
+            st.warning(str(e))
+    
+    report_file = track_job('report_job', "报告生成")
+    if report_file is not None:
+        st.session_state.report_file = report_file
+    report_file = st.session_state.report_file
+    if report_file is not None:
+        # 报告只在点击后读入本次运行，重跑时不再占用内存
+        if st.button(f"📥 下载 {report_file.file_name}（{report_file.size / 2**20:.1f} MiB）", key="prepare_report"):
+            with report_file.open() as f:
+                st.download_button("⬇️ 保存到本地", data=f, file_name=report_file.file_name,
+                                   mime=REPORT_MIME_TYPES[report_file.fmt])
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+    record_first_paint()
\ No newline at end of file
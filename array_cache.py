@@ -0,0 +1,139 @@
+"""跨进程共享的只读数组缓存
+
+条目以参数摘要为文件名保存为共享目录（默认内存文件系统 /dev/shm）下的 .npy 文件，
+各进程以只读内存映射打开，多个 Streamlit 或服务进程共用同一份物理内存。
+写入先落到临时文件再原子替换，并发写入同一键时结果相同、后写者覆盖。
+共享目录与进程内映射表均按字节数限额，超出时淘汰最久未使用的条目；
+已被其它进程映射的文件删除后仍可读，直到映射关闭。
+"""
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+# 共享缓存目录，可用环境变量 CLOUD_SHARED_CACHE_DIR 指定
+SHARED_CACHE_DIR = os.environ.get("CLOUD_SHARED_CACHE_DIR") or os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "cloud-cache")
+
+
+class SharedArrayCache:
+    """以参数为键缓存同长度的一组一维数组，返回只读视图
+
+    max_bytes 同时限制共享目录中该缓存的总大小和本进程持有的映射总大小。
+    """
+
+    def __init__(self, name, max_bytes, directory=None):
+        self.name = name
+        self.max_bytes = int(max_bytes)
+        self.directory = os.path.join(directory or SHARED_CACHE_DIR, name)
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._nbytes = 0
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+        return os.path.join(self.directory, digest + ".npy")
+
+    def get(self, key, compute):
+        """返回 key 对应的数组元组，未命中时调用 compute() 生成并发布到共享目录"""
+        path = self._path(key)
+        with self._lock:
+            if path in self._entries:
+                self._entries.move_to_end(path)
+                return self._entries[path]
+
+        stacked = self._load(path)
+        if stacked is None:
+            stacked = np.stack([np.asarray(array, dtype=float) for array in compute()])
+            stacked.setflags(write=False)
+            if stacked.nbytes > self.max_bytes:
+                return tuple(stacked)
+            # 发布后改用共享映射，释放本进程的私有副本
+            mapped = self._load(path) if self._publish(path, stacked) else None
+            if mapped is not None:
+                stacked = mapped
+
+        arrays = tuple(stacked)
+        with self._lock:
+            if path not in self._entries:
+                self._entries[path] = arrays
+                self._nbytes += stacked.nbytes
+                while self._nbytes > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._nbytes -= sum(array.nbytes for array in evicted)
+            return self._entries[path]
+
+    @staticmethod
+    def _load(path):
+        try:
+            stacked = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return stacked
+
+    def _publish(self, path, stacked):
+        """写入临时文件后原子替换，再按字节限额淘汰共享目录中最久未使用的文件，成功时返回 True"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, stacked)
+                os.replace(tmp_path, path)
+            except BaseException:
+                # 写满或替换失败时删除临时文件，淘汰只处理已发布的条目，不会回收它
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+            self._evict_shared(keep=path)
+        except OSError:
+            # 共享目录不可写时退化为进程内缓存
+            return False
+        return True
+
+    def _evict_shared(self, keep):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def nbytes(self):
+        """本进程持有的映射总字节数"""
+        with self._lock:
+            return self._nbytes
+
+    def cache_clear(self):
+        """清空本进程的映射表和共享目录中的条目"""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
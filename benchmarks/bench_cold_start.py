@@ -0,0 +1,77 @@
+"""应用冷启动与首次渲染耗时
+
+每次在新的解释器进程中用 Streamlit AppTest 运行一次 app-v2.py，分别统计：
+导入 streamlit 的耗时、应用模块导入完成与首次渲染完成（均从进程启动起算），
+以及从导入 streamlit 到 AppTest 运行结束的耗时。--eager 先导入 pandas 与 matplotlib.pyplot，
+模拟延迟导入之前的启动开销作为对照。
+
+    python benchmarks/bench_cold_start.py --runs 5
+    python benchmarks/bench_cold_start.py --runs 5 --eager
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+streamlit_s = time.perf_counter() - start
+if {eager}:
+    import pandas, matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+total_s = time.perf_counter() - start
+import startup
+print(json.dumps({{
+    "streamlit_s": streamlit_s,
+    "marks_s": startup.marks(),
+    "total_s": total_s,
+    "pandas_loaded": "pandas" in sys.modules,
+    "pyplot_loaded": "matplotlib.pyplot" in sys.modules,
+    "exception": bool(at.exception),
+}}))
+"""
+
+
+def run_once(eager):
+    """在新进程中冷启动一次，返回测量结果"""
+    code = _CHILD.format(eager=eager, app=os.path.join(ROOT, "app-v2.py"))
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=ROOT, CLOUD_TIMING_LOG=os.path.join(tmp, "timings.jsonl"))
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="冷启动次数")
+    parser.add_argument("--eager", action="store_true", help="预先导入 pandas 与 matplotlib.pyplot 作为对照")
+    args = parser.parse_args()
+
+    runs = [run_once(args.eager) for _ in range(args.runs)]
+    if any(r["exception"] for r in runs):
+        sys.exit("应用首次运行出现异常")
+
+    def median_ms(values):
+        return statistics.median(values) * 1000
+
+    print(f"冷启动 {args.runs} 次{'（预先导入 pandas / pyplot）' if args.eager else ''}，中位耗时：")
+    print(f"  导入 streamlit     {median_ms([r['streamlit_s'] for r in runs]):>8.0f} ms")
+    for name in runs[0]["marks_s"]:
+        print(f"  {name:<14} {median_ms([r['marks_s'][name] for r in runs]):>8.0f} ms  (从进程启动起算)")
+    print(f"  导入至运行结束     {median_ms([r['total_s'] for r in runs]):>8.0f} ms")
+    print(f"  首屏加载 pandas: {runs[0]['pandas_loaded']}，matplotlib.pyplot: {runs[0]['pyplot_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+"""应用多会话负载测试：启动本机 streamlit 服务，以 websocket 客户端并发回放脚本化的用户会话
+
+每个虚拟用户是一个独立的浏览器会话，向服务发送与前端相同的 BackMsg：切换正向/逆向云发生器页面、
+上传专家打分文件、修改参数、点击生成与绘图按钮。后台任务的进度片段按 run_every 间隔自动重跑，
+客户端同样按间隔重跑片段，直到任务结束。统计每次重跑（发出请求到收到 script_finished）的延迟分位数、
+吞吐量，以及服务进程的常驻内存（RSS）与每个并发会话占用的内存。
+
+    python benchmarks/bench_load.py --sessions 20 --concurrency 10
+    python benchmarks/bench_load.py --scenario forward --drops 1000000 --output load.json
+    python benchmarks/bench_load.py --url http://127.0.0.1:8501   # 测试已在运行的服务（不统计内存）
+
+各步骤按场景加前缀（正向:、逆向:）分别统计。有会话出错时以非0状态退出。
+
+AppTest 不能在同一进程中并发运行（每次运行都会替换全局的 Runtime 实例），因此并发会话连接真实的服务。
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.proto.Common_pb2 import FileUploaderState, UploadedFileInfo
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from tornado.netutil import bind_sockets
+from tornado.websocket import websocket_connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app-v2.py")
+
+# 一次重跑结束的状态；FINISHED_EARLY_FOR_RERUN 表示紧接着还有一次重跑（如片段中调用 st.rerun）
+FINISHED = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+            ForwardMsg.FINISHED_WITH_COMPILE_ERROR}
+
+# 等待后台任务结束与单次重跑的超时（秒）
+JOB_TIMEOUT = 600
+RERUN_TIMEOUT = 300
+
+# 分位数
+PERCENTILES = (50, 90, 95, 99)
+
+
+class AppSession:
+    """一个虚拟用户：websocket 连接、当前页面上的元素与用户设置过的控件值"""
+
+    def __init__(self, base_url, user, rng):
+        self.base_url = base_url
+        self.user = user
+        self.rng = rng  # 思考时间与上传数据
+        self.session_id = None
+        self.elements = {}  # 元素路径 -> (元素类型, 元素proto)
+        self.widget_states = {}  # 控件ID -> 用户设置的 WidgetState，之后的重跑一直带上
+        self.fragments = {}  # 自动重跑的片段ID -> 间隔（秒）
+        self.latencies = []  # [(步骤, 秒)]
+        self.errors = []
+        self._ws = None
+
+    async def connect(self):
+        url = self.base_url.replace("http", "ws", 1) + "/_stcore/stream"
+        self._ws = await websocket_connect(url, subprotocols=["streamlit"], max_message_size=1 << 30)
+        await self.rerun("打开页面")
+
+    def close(self):
+        if self._ws is not None:
+            self._ws.close()
+            self._ws = None
+
+    async def _send(self, back_msg):
+        await self._ws.write_message(back_msg.SerializeToString(), binary=True)
+
+    async def _receive(self, wanted):
+        """处理服务器消息，直到收到 wanted 类型的消息（script_finished 只认 FINISHED 中的状态）"""
+        while True:
+            raw = await self._ws.read_message()
+            if raw is None:
+                raise ConnectionError("服务器关闭了连接")
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                # 每次完整重跑开始时发送，页面元素随后重新生成
+                self.session_id = msg.new_session.initialize.session_id
+                self.elements.clear()
+                self.fragments.clear()
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                element_type = element.WhichOneof("type")
+                self.elements[tuple(msg.metadata.delta_path)] = (element_type, getattr(element, element_type))
+                if element_type == "exception":
+                    self.errors.append(f"{element.exception.type}: {element.exception.message}")
+            elif kind == "auto_rerun":
+                self.fragments[msg.auto_rerun.fragment_id] = msg.auto_rerun.interval
+            if kind == wanted and (kind != "script_finished" or msg.script_finished in FINISHED):
+                return msg
+
+    def find(self, label, element_type=None):
+        """按标签查找页面上的元素，主区域在前、侧边栏在后"""
+        for path in sorted(self.elements):
+            found_type, element = self.elements[path]
+            if getattr(element, "label", None) == label and element_type in (None, found_type):
+                return found_type, element
+        raise LookupError(f"{self.user}：页面上没有“{label}”")
+
+    def has(self, label):
+        return any(getattr(element, "label", None) == label for _, element in self.elements.values())
+
+    async def rerun(self, step, triggers=(), fragment_id=""):
+        """发送一次重跑并等待结束，记录延迟"""
+        state = ClientState(fragment_id=fragment_id, is_auto_rerun=bool(fragment_id))
+        ids = {getattr(element, "id", None) for _, element in self.elements.values()}
+        # 已不在页面上的控件不再发送，与前端一致
+        self.widget_states = {widget_id: s for widget_id, s in self.widget_states.items() if widget_id in ids}
+        state.widget_states.widgets.extend(list(self.widget_states.values()) + list(triggers))
+        back_msg = BackMsg()
+        back_msg.rerun_script.CopyFrom(state)
+
+        start = time.perf_counter()
+        await self._send(back_msg)
+        await asyncio.wait_for(self._receive("script_finished"), RERUN_TIMEOUT)
+        self.latencies.append((step, time.perf_counter() - start))
+
+    async def click(self, label, step):
+        _, button = self.find(label, "button")
+        await self.rerun(step, [WidgetState(id=button.id, trigger_value=True)])
+
+    async def set_value(self, label, value, step):
+        """设置控件的值并重跑；选择类控件按选项文字设置"""
+        element_type, element = self.find(label)
+        state = WidgetState(id=element.id)
+        if element_type == "radio":
+            state.int_value = list(element.options).index(value)
+        elif element_type == "selectbox":
+            state.string_value = value
+        elif element_type == "number_input":
+            state.double_value = value
+        elif element_type in ("text_area", "text_input"):
+            state.string_value = value
+        elif element_type == "checkbox":
+            state.bool_value = value
+        else:
+            raise TypeError(f"不支持设置 {element_type} 控件")
+        self.widget_states[element.id] = state
+        await self.rerun(step)
+
+    async def upload(self, label, file_name, data, step):
+        """与前端相同的上传流程：申请上传地址、PUT 文件、以文件信息作为控件值重跑"""
+        _, uploader = self.find(label, "file_uploader")
+        request = BackMsg()
+        request.file_urls_request.request_id = uuid.uuid4().hex
+        request.file_urls_request.session_id = self.session_id
+        request.file_urls_request.file_names.append(file_name)
+
+        start = time.perf_counter()
+        await self._send(request)
+        response = await asyncio.wait_for(self._receive("file_urls_response"), RERUN_TIMEOUT)
+        file_urls = response.file_urls_response.file_urls[0]
+        boundary = uuid.uuid4().hex
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{file_name}\"\r\n"
+                f"Content-Type: text/csv\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+        await AsyncHTTPClient().fetch(self.base_url + file_urls.upload_url, method="PUT", body=body,
+                                      headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        self.latencies.append((f"{step}(传输)", time.perf_counter() - start))
+
+        state = WidgetState(id=uploader.id)
+        state.file_uploader_state_value.CopyFrom(FileUploaderState(uploaded_file_info=[
+            UploadedFileInfo(file_id=file_urls.file_id, name=file_name, size=len(data), file_urls=file_urls)
+        ]))
+        self.widget_states[uploader.id] = state
+        await self.rerun(step)
+
+    async def wait_until_gone(self, label, step):
+        """按片段的 run_every 间隔重跑进度片段，直到 label（如取消按钮）从页面上消失"""
+        deadline = time.monotonic() + JOB_TIMEOUT
+        while self.has(label):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{self.user}：等待“{label}”消失超时")
+            if not self.fragments:
+                await asyncio.sleep(0.5)
+                await self.rerun(step)
+                continue
+            fragment_id, interval = next(iter(self.fragments.items()))
+            await asyncio.sleep(interval)
+            await self.rerun(step, fragment_id=fragment_id)
+
+
+def scores_csv(num_experts, num_indicators, seed):
+    """随机的专家打分CSV，每个用户不同，避免评价库按输入哈希直接命中"""
+    scores = np.random.default_rng(seed).uniform(60, 100, size=(num_experts, num_indicators)).round(1)
+    return "\n".join(",".join(f"{v:g}" for v in row) for row in scores).encode()
+
+
+async def forward_scenario(session, args, think, prefix="正向:"):
+    await think()
+    await session.click("🔄 正向云发生器", prefix + "切换页面")
+    await think()
+    await session.set_value("云滴数量", float(args.drops), prefix + "修改参数")
+    await think()
+    await session.click("🎯 生成云滴", prefix + "生成云滴")
+    await session.wait_until_gone("⏹️ 取消生成", prefix + "任务进度")
+    for option in ("直方图", "云模型图", "散点图"):
+        await think()
+        await session.set_value("选择可视化类型", option, prefix + f"图表:{option}")
+    await think()
+    await session.click("📊 绘制评价标准云图", prefix + "图表:标准云")
+
+
+async def reverse_scenario(session, args, think, prefix="逆向:"):
+    await think()
+    await session.click("🔙 逆向云发生器", prefix + "切换页面")
+    await think()
+    await session.set_value("选择输入方式", "文件上传", prefix + "选择输入方式")
+    await think()
+    data = scores_csv(args.experts, args.indicators, seed=session.rng.integers(2**32))
+    await session.upload("选择文件（CSV或Excel）", "scores.csv", data, prefix + "上传文件")
+    await think()
+    await session.click("🎯 生成指标评价云", prefix + "生成指标云")
+    await think()
+    await session.click("🎯 生成综合评价云", prefix + "生成综合云")
+    for label in ("📊 散点图", "⚖️ 标准对比图"):
+        await think()
+        await session.click(label, prefix + f"图表:{label.split(' ', 1)[1]}")
+
+
+async def mixed_scenario(session, args, think):
+    await forward_scenario(session, args, think)
+    await reverse_scenario(session, args, think)
+
+
+SCENARIOS = {
+    "forward": forward_scenario,
+    "reverse": reverse_scenario,
+    "mixed": mixed_scenario,
+}
+
+
+def rss_bytes(pid, field="VmRSS"):
+    """进程的常驻内存（VmRSS）或峰值常驻内存（VmHWM），读取 /proc"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    raise KeyError(field)
+
+
+def start_server(tmp):
+    """在空闲端口上启动 streamlit 服务子进程，评价库、计时日志与云滴临时文件放在 tmp 中，返回 (进程, 地址)"""
+    sock = bind_sockets(0, "127.0.0.1")[0]
+    port = sock.getsockname()[1]
+    sock.close()
+    env = dict(os.environ, PYTHONPATH=ROOT, TMPDIR=tmp,
+               CLOUD_EVALUATION_DB=os.path.join(tmp, "evaluations.db"),
+               CLOUD_TIMING_LOG=os.path.join(tmp, "timings.jsonl"))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP, "--server.port", str(port), "--server.address", "127.0.0.1",
+         "--server.headless", "true", "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false",
+         # 负载测试客户端不携带 XSRF cookie
+         "--server.enableXsrfProtection", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(base_url, timeout=60):
+    client = AsyncHTTPClient()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await client.fetch(f"{base_url}/_stcore/health")
+        except (OSError, HTTPClientError):
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def sample_memory(pid, samples, interval=0.2):
+    """定期记录服务进程的 RSS，直到任务被取消"""
+    while True:
+        samples.append(rss_bytes(pid))
+        await asyncio.sleep(interval)
+
+
+async def run_user(base_url, user, scenario, args, rng):
+    session = AppSession(base_url, user, rng)
+
+    async def think():
+        if args.think > 0:
+            await asyncio.sleep(rng.exponential(args.think))
+
+    start = time.perf_counter()
+    try:
+        await session.connect()
+        for _ in range(args.iterations):
+            await scenario(session, args, think)
+    except Exception as e:  # 记录失败并继续其他会话
+        session.errors.append(f"{type(e).__name__}: {e}")
+    finally:
+        session.close()
+    return session, time.perf_counter() - start
+
+
+async def run(args, base_url, pid):
+    await wait_ready(base_url)
+    scenario = SCENARIOS[args.scenario]
+
+    # 预热会话：导入 pandas、matplotlib 与各模块，之后的内存增长才反映会话本身
+    warmup, _ = await run_user(base_url, "预热", scenario, argparse.Namespace(**{**vars(args), "think": 0,
+                                                                                "iterations": 1}),
+                               np.random.default_rng(0))
+    if warmup.errors:
+        sys.exit(f"预热会话失败：{warmup.errors[0]}")
+    baseline = rss_bytes(pid) if pid else None
+
+    samples = []
+    sampler = asyncio.ensure_future(sample_memory(pid, samples)) if pid else None
+    semaphore = asyncio.Semaphore(args.concurrency)
+    rng = np.random.default_rng(args.seed)
+    seeds = rng.integers(0, 2**32, size=args.sessions)
+
+    async def limited(i):
+        async with semaphore:
+            return await run_user(base_url, f"用户{i + 1}", scenario, args, np.random.default_rng(seeds[i]))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(limited(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    if sampler:
+        sampler.cancel()
+        samples.append(rss_bytes(pid))
+    return results, elapsed, baseline, samples
+
+
+def _percentiles(values):
+    values_ms = np.asarray(values) * 1000
+    stats = {f"p{p}": float(np.percentile(values_ms, p)) for p in PERCENTILES}
+    stats.update({"次数": len(values_ms), "平均": float(values_ms.mean()), "最大": float(values_ms.max())})
+    return stats
+
+
+def summarize(results, elapsed, baseline, samples, args):
+    latencies = [latency for session, _ in results for latency in session.latencies]
+    by_step = {}
+    for step, seconds in latencies:
+        by_step.setdefault(step, []).append(seconds)
+    reruns = sum(1 for step, _ in latencies if not step.endswith("(传输)"))
+    summary = {
+        "场景": args.scenario,
+        "会话数": args.sessions,
+        "并发": args.concurrency,
+        "耗时s": elapsed,
+        "重跑次数": reruns,
+        "吞吐量_重跑每秒": reruns / elapsed,
+        "吞吐量_会话每分钟": len(results) * 60 / elapsed,
+        "会话时长s_中位数": statistics.median(duration for _, duration in results),
+        "延迟ms": _percentiles([seconds for _, seconds in latencies]),
+        "各步骤延迟ms": {step: _percentiles(values) for step, values in by_step.items()},
+        "错误": [f"{session.user}：{error}" for session, _ in results for error in session.errors],
+    }
+    if baseline is not None:
+        peak = max(samples)
+        summary["内存MiB"] = {
+            "基线": baseline / 2**20,
+            "峰值": peak / 2**20,
+            "结束": samples[-1] / 2**20,
+            "每并发会话": (peak - baseline) / min(args.concurrency, args.sessions) / 2**20,
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"场景 {summary['场景']}：{summary['会话数']} 个会话，并发 {summary['并发']}，耗时 {summary['耗时s']:.1f} s")
+    print(f"  吞吐量 {summary['吞吐量_重跑每秒']:.1f} 次重跑/秒，{summary['吞吐量_会话每分钟']:.1f} 个会话/分钟，"
+          f"会话时长中位数 {summary['会话时长s_中位数']:.1f} s")
+    header = " ".join(f"{f'p{p}':>8}" for p in PERCENTILES)
+    print(f"\n  {'步骤':<18} {'次数':>6} {header} {'最大':>8}  (ms)")
+    rows = [("全部重跑", summary["延迟ms"])] + sorted(summary["各步骤延迟ms"].items())
+    for step, stats in rows:
+        values = " ".join(f"{stats[f'p{p}']:>8.0f}" for p in PERCENTILES)
+        print(f"  {step:<18} {stats['次数']:>6} {values} {stats['最大']:>8.0f}")
+    if "内存MiB" in summary:
+        memory = summary["内存MiB"]
+        print(f"\n  服务进程内存：基线 {memory['基线']:.0f} MiB，峰值 {memory['峰值']:.0f} MiB，"
+              f"结束 {memory['结束']:.0f} MiB，每并发会话约 {memory['每并发会话']:.1f} MiB")
+    if summary["错误"]:
+        print(f"\n  {len(summary['错误'])} 个错误，例如：")
+        for error in summary["错误"][:5]:
+            print(f"    {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=list(SCENARIOS), default="mixed",
+                        help="forward：正向云发生器；reverse：逆向云发生器（含文件上传）；mixed：两者依次")
+    parser.add_argument("--sessions", type=int, default=10, help="虚拟用户总数")
+    parser.add_argument("--concurrency", type=int, default=5, help="同时在线的虚拟用户数")
+    parser.add_argument("--iterations", type=int, default=1, help="每个用户重复场景的次数")
+    parser.add_argument("--think", type=float, default=0.5, help="两次操作之间的平均思考时间（秒，指数分布），0 为不停顿")
+    parser.add_argument("--drops", type=int, default=100_000, help="正向云生成的云滴数量")
+    parser.add_argument("--experts", type=int, default=30, help="上传的打分文件中的专家数")
+    parser.add_argument("--indicators", type=int, default=8, help="上传的打分文件中的指标数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="测试已在运行的服务，例如 http://127.0.0.1:8501（不统计内存）")
+    parser.add_argument("--output", help="结果JSON路径")
+    args = parser.parse_args()
+
+    if args.url:
+        results = asyncio.run(run(args, args.url.rstrip("/"), None))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            process, base_url = start_server(tmp)
+            try:
+                results = asyncio.run(run(args, base_url, process.pid))
+            finally:
+                process.terminate()
+                process.wait()
+
+    summary = summarize(*results, args)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+    if summary["错误"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""准蒙特卡洛与伪随机云滴生成的收敛性对比
+
+对每个云滴数量重复生成若干次，统计平均值、标准差和平均隶属度相对理论值的均方根误差。
+
+    python benchmarks/bench_qmc_convergence.py --reps 200
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cloud_model import SAMPLING_QMC, SAMPLING_RANDOM, generate_cloud_drops  # noqa: E402
+
+DROP_COUNTS = [100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+def theoretical_stats(ex, en, he):
+    """理论平均值、标准差和平均隶属度"""
+    # E[μ | En'] = 1 / sqrt(1 + En'^2 / En^2)，对 En' ~ N(En, He^2) 用Gauss-Hermite积分
+    nodes, weights = np.polynomial.hermite_e.hermegauss(80)
+    en_prime = en + he * nodes
+    mean_membership = np.sum(weights / np.sqrt(1 + (en_prime / en) ** 2)) / np.sum(weights)
+    return ex, np.sqrt(en**2 + he**2), mean_membership
+
+
+def run(ex, en, he, reps, seed):
+    """返回 {method: [(num_drops, rmse_mean, rmse_std, rmse_membership), ...]}"""
+    true_mean, true_std, true_membership = theoretical_stats(ex, en, he)
+    seeds = np.random.SeedSequence(seed)
+    results = {}
+
+    for method in (SAMPLING_RANDOM, SAMPLING_QMC):
+        rows = []
+        for num_drops in DROP_COUNTS:
+            errors = np.empty((reps, 3))
+            for r, child in enumerate(seeds.spawn(reps)):
+                drops, memberships = generate_cloud_drops(ex, en, he, num_drops, method=method, seed=child)
+                errors[r] = (np.mean(drops) - true_mean,
+                             np.std(drops) - true_std,
+                             np.mean(memberships) - true_membership)
+            rmse = np.sqrt(np.mean(errors**2, axis=0))
+            rows.append((num_drops, *rmse))
+        results[method] = rows
+
+    return results
+
+
+def drops_to_match(rows, target):
+    """达到目标误差所需的最少云滴数量（每项统计量均不超过目标）"""
+    for num_drops, *rmse in rows:
+        if all(e <= t for e, t in zip(rmse, target)):
+            return num_drops
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ex", type=float, default=50.0)
+    parser.add_argument("--en", type=float, default=8.33)
+    parser.add_argument("--he", type=float, default=0.5)
+    parser.add_argument("--reps", type=int, default=200, help="每个云滴数量的重复次数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run(args.ex, args.en, args.he, args.reps, args.seed)
+
+    print(f"Ex={args.ex} En={args.en} He={args.he} reps={args.reps}")
+    print(f"{'method':>8} {'drops':>7} {'rmse_mean':>10} {'rmse_std':>10} {'rmse_mu':>10}")
+    for method, rows in results.items():
+        for num_drops, e_mean, e_std, e_mu in rows:
+            print(f"{method:>8} {num_drops:>7d} {e_mean:>10.4f} {e_std:>10.4f} {e_mu:>10.5f}")
+
+    # 以伪随机采样1000个云滴的误差为基准
+    baseline = next(rmse for n, *rmse in results[SAMPLING_RANDOM] if n == 1000)
+    needed = drops_to_match(results[SAMPLING_QMC], baseline)
+    print(f"\nqmc 达到 random@1000 误差所需云滴数量: {needed}")
+
+
+if __name__ == "__main__":
+    main()
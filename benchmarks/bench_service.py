@@ -0,0 +1,111 @@
+"""评价HTTP服务吞吐量：在子进程中启动本机服务，并发发送逆向云请求
+
+同时校验返回结果与 calculate_indicator_clouds 一致。--max-batch 1 关闭微批作为对照，
+--url 可改为测试已在运行的服务。
+
+    python benchmarks/bench_service.py --requests 5000 --concurrency 200
+    python benchmarks/bench_service.py --requests 5000 --concurrency 200 --max-batch 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from tornado.netutil import bind_sockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cloud_model import calculate_indicator_clouds  # noqa: E402
+from service import BATCH_DELAY, MAX_BATCH_SIZE  # noqa: E402
+
+
+def start_server(args):
+    """在空闲端口上启动服务子进程，返回 (进程, 地址)"""
+    sock = bind_sockets(0, "127.0.0.1")[0]
+    port = sock.getsockname()[1]
+    sock.close()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "service.py"), "--port", str(port),
+                                "--max-batch", str(args.max_batch), "--batch-delay-ms", str(args.batch_delay_ms)],
+                               stdout=subprocess.DEVNULL)
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(client, base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await client.fetch(f"{base_url}/health")
+        except (OSError, HTTPClientError):
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def run(args, base_url):
+    url = f"{base_url}/reverse"
+
+    rng = np.random.default_rng(0)
+    bodies = [rng.uniform(60, 100, size=(args.experts, args.indicators)).round(1) for _ in range(args.requests)]
+    client = AsyncHTTPClient(max_clients=args.concurrency)
+    await wait_ready(client, base_url)
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.fetch(url, method="POST", body=json.dumps({'scores': bodies[i].tolist()}))
+            latencies.append(time.perf_counter() - start)
+            if i % 97 == 0:
+                expected = calculate_indicator_clouds(bodies[i], np.ones(args.indicators))
+                got = json.loads(response.body)['指标云']
+                assert np.allclose([c['Ex'] for c in got], [c['Ex'] for c in expected])
+                assert np.allclose([c['He'] for c in got], [c['He'] for c in expected])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    stats = json.loads((await client.fetch(f"{base_url}/health")).body)['微批']['reverse']
+    client.close()
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"{args.requests} 个请求（{args.experts}×{args.indicators}），并发 {args.concurrency}，{base_url}")
+    print(f"  吞吐量 {args.requests / elapsed:,.0f} 请求/秒，总耗时 {elapsed:.2f} s")
+    print(f"  延迟 p50 {statistics.median(latencies_ms):.1f} ms，p99 {np.percentile(latencies_ms, 99):.1f} ms")
+    print(f"  微批（服务启动以来）：{stats['批次数']} 批，平均 {stats['平均批大小']:.1f} 个请求/批")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--experts", type=int, default=10)
+    parser.add_argument("--indicators", type=int, default=8)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE, help="启动的服务的单批最大请求数")
+    parser.add_argument("--batch-delay-ms", type=float, default=BATCH_DELAY * 1000, help="启动的服务的聚合等待时间")
+    parser.add_argument("--url", help="测试已在运行的服务，例如 http://127.0.0.1:8600")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run(args, args.url.rstrip("/")))
+        return
+    process, base_url = start_server(args)
+    try:
+        asyncio.run(run(args, base_url))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
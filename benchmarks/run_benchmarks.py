@@ -0,0 +1,356 @@
+"""云模型评价系统性能基准
+
+覆盖云滴生成、外存写入、逆向云计算、多维云统计、综合云合成、文本解析、CSV导出与绘图渲染，
+结果保存为JSON，可与其他提交的结果对比以发现性能回归。
+
+    python benchmarks/run_benchmarks.py --quick
+    python benchmarks/run_benchmarks.py --output new.json --compare old.json
+"""
+import argparse
+import atexit
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import matplotlib
+
+matplotlib.use("Agg")
+# 未安装中文字体的机器上会大量输出缺字警告，不影响计时
+warnings.filterwarnings("ignore", message=r"Glyph \d+")
+warnings.filterwarnings("ignore", message="Tight layout")
+logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
+
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 冷启动基准会清空标准云缓存，改用私有的临时目录，不影响同一主机上运行中的应用共享的缓存
+SHARED_CACHE_DIR = tempfile.mkdtemp(prefix="cloud-bench-cache-")
+os.environ["CLOUD_SHARED_CACHE_DIR"] = SHARED_CACHE_DIR
+atexit.register(shutil.rmtree, SHARED_CACHE_DIR, ignore_errors=True)
+
+import cloud_charts  # noqa: E402
+from cloud_io import indicator_clouds_to_csv, parse_expert_scores  # noqa: E402
+from cloud_model import (  # noqa: E402
+    SAMPLING_QMC,
+    SAMPLING_RANDOM,
+    calculate_comprehensive_cloud,
+    calculate_indicator_clouds,
+    clear_standard_cloud_cache,
+    generate_cloud_drops,
+)
+from cloud_nd import summarize_nd_cloud  # noqa: E402
+from cloud_plots import plot_comprehensive_with_standards, plot_scatter, plot_standard_clouds  # noqa: E402
+from consensus import CONSENSUS_DOWNWEIGHT, expert_consensus  # noqa: E402
+from drop_store import DropStore  # noqa: E402
+from evaluation_store import EvaluationStore, inputs_hash  # noqa: E402
+from objective_weights import OBJECTIVE_WEIGHT_METHODS, batch_objective_weights, objective_weights  # noqa: E402
+
+# 单项基准累计运行时间下限（秒）与重复次数上限
+MIN_TIME = 0.2
+MAX_REPEATS = 20
+
+
+def _drop_sizes(quick):
+    return [10**3, 10**4, 10**5] if quick else [10**3, 10**4, 10**5, 10**6, 10**7]
+
+
+def _matrix_shapes(quick):
+    shapes = [(5, 4), (30, 10), (100, 50)]
+    return shapes if quick else shapes + [(1000, 100), (10000, 100), (100000, 20)]
+
+
+def _score_matrix(num_experts, num_indicators, seed=0):
+    return np.random.default_rng(seed).uniform(60, 100, size=(num_experts, num_indicators)).round(1)
+
+
+def _standard_data(num_clouds, num_drops=1200):
+    ex = np.linspace(5, 95, num_clouds)
+    return pd.DataFrame({
+        '云名称': [f'标准{i+1}' for i in range(num_clouds)],
+        'Ex': ex,
+        'En': np.full(num_clouds, 100 / num_clouds / 3),
+        'He': np.full(num_clouds, 0.5),
+        '云滴数量': np.full(num_clouds, num_drops),
+        '颜色': ['blue'] * num_clouds,
+        '绘图符号': ['o'] * num_clouds,
+    })
+
+
+def _render(fig):
+    """与 st.pyplot 相同，渲染为PNG"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _chart_spec(chart):
+    """与 st.altair_chart 相同，序列化为 Vega-Lite 规范（Streamlit 不限制数据行数）"""
+    with cloud_charts.altair().data_transformers.disable_max_rows():
+        return json.dumps(chart.to_dict())
+
+
+def _uncached(fn):
+    """每次运行前清空标准云缓存，测量冷启动开销"""
+    def run():
+        clear_standard_cloud_cache()
+        return fn()
+    return run
+
+
+def suite_generation(quick):
+    for num_drops in _drop_sizes(quick):
+        for method in (SAMPLING_RANDOM, SAMPLING_QMC):
+            yield "generate_cloud_drops", {"num_drops": num_drops, "method": method}, \
+                lambda n=num_drops, m=method: generate_cloud_drops(50, 8.33, 0.5, n, method=m, seed=0)
+
+
+def suite_drop_store(quick):
+    for num_drops in _drop_sizes(quick)[1:]:
+        for compact in (False, True):
+            yield "DropStore.generate", {"num_drops": num_drops, "compact": compact}, \
+                lambda n=num_drops, c=compact: DropStore.generate(50, 8.33, 0.5, n, seed=0, compact=c).delete()
+
+    for num_drops in ([10**4, 10**5] if quick else [10**4, 10**5, 10**6]):
+        store = DropStore.generate(50, 8.33, 0.5, num_drops, seed=0, compact=True)
+        yield "DropStore.write_csv", {"num_drops": num_drops}, store.write_csv
+
+
+def suite_reverse(quick):
+    for num_experts, num_indicators in _matrix_shapes(quick):
+        scores = _score_matrix(num_experts, num_indicators)
+        weights = np.full(num_indicators, 1 / num_indicators)
+        yield "calculate_indicator_clouds", {"experts": num_experts, "indicators": num_indicators}, \
+            lambda s=scores, w=weights: calculate_indicator_clouds(s, w)
+
+
+def suite_consensus(quick):
+    shapes = [(1000, 100), (10000, 100)] if quick else [(1000, 100), (10000, 100), (10000, 1000), (100000, 1000)]
+    for num_experts, num_indicators in shapes:
+        scores = _score_matrix(num_experts, num_indicators)
+        weights = np.full(num_indicators, 1 / num_indicators)
+        yield "expert_consensus", {"experts": num_experts, "indicators": num_indicators}, \
+            lambda s=scores: expert_consensus(s, mode=CONSENSUS_DOWNWEIGHT)
+        expert_weights = expert_consensus(scores, mode=CONSENSUS_DOWNWEIGHT)['专家权重']
+        yield "calculate_indicator_clouds", {"experts": num_experts, "indicators": num_indicators, "expert_weights": True}, \
+            lambda s=scores, w=weights, e=expert_weights: calculate_indicator_clouds(s, w, e)
+
+
+def suite_weights(quick):
+    shapes = [(30, 10), (10000, 100)] if quick else [(30, 10), (10000, 100), (100000, 1000)]
+    matrices = [_score_matrix(30, 10, seed) for seed in range(1000 if quick else 10000)]
+    for method in OBJECTIVE_WEIGHT_METHODS:
+        for num_experts, num_indicators in shapes:
+            yield "objective_weights", {"method": method, "experts": num_experts, "indicators": num_indicators}, \
+                lambda s=_score_matrix(num_experts, num_indicators), m=method: objective_weights(s, m)
+        yield "batch_objective_weights", {"method": method, "matrices": len(matrices)}, \
+            lambda m=method: batch_objective_weights(matrices, m)
+
+
+def suite_nd(quick):
+    for num_drops in _drop_sizes(quick)[1:]:
+        for method in (SAMPLING_RANDOM, SAMPLING_QMC):
+            yield "summarize_nd_cloud", {"num_drops": num_drops, "dims": 2, "method": method}, \
+                lambda n=num_drops, m=method: summarize_nd_cloud([50, 60], [10, 8], [1, 0.8], n, method=m, seed=0)
+
+
+def suite_comprehensive(quick):
+    for num_indicators in ([4, 100] if quick else [4, 100, 1000, 10000]):
+        rng = np.random.default_rng(0)
+        indicator_clouds = [
+            {'指标': f'指标{i+1}', 'Ex': ex, 'En': en, 'He': he, '权重': w}
+            for i, (ex, en, he, w) in enumerate(rng.uniform([60, 1, 0.1, 0.1], [100, 5, 1, 1], size=(num_indicators, 4)))
+        ]
+        yield "calculate_comprehensive_cloud", {"indicators": num_indicators}, \
+            lambda c=indicator_clouds: calculate_comprehensive_cloud(c)
+
+
+def suite_parsing(quick):
+    for num_experts, num_indicators in _matrix_shapes(quick):
+        text = "\n".join(",".join(map(str, row)) for row in _score_matrix(num_experts, num_indicators))
+        yield "parse_expert_scores", {"experts": num_experts, "indicators": num_indicators}, \
+            lambda t=text: parse_expert_scores(t)
+
+
+def suite_export(quick):
+    for num_indicators in ([4, 100] if quick else [4, 100, 1000, 10000]):
+        indicator_clouds = calculate_indicator_clouds(_score_matrix(30, num_indicators), np.ones(num_indicators))
+        yield "indicator_clouds_to_csv", {"indicators": num_indicators}, \
+            lambda c=indicator_clouds: indicator_clouds_to_csv(c)
+
+
+def suite_rendering(quick):
+    for num_drops in ([10**3, 10**4] if quick else [10**3, 10**4, 10**5]):
+        drops, memberships = generate_cloud_drops(50, 8.33, 0.5, num_drops, seed=0)
+        yield "plot_scatter", {"num_drops": num_drops}, \
+            lambda d=drops, m=memberships: _render(plot_scatter(d, m))
+        yield "chart_scatter", {"num_drops": num_drops}, \
+            lambda d=drops, m=memberships: _chart_spec(cloud_charts.plot_scatter(d, m))
+
+    for num_clouds in ([5, 20] if quick else [5, 20, 50]):
+        data = _standard_data(num_clouds)
+        yield "plot_standard_clouds", {"clouds": num_clouds}, \
+            _uncached(lambda d=data: _render(plot_standard_clouds(d)))
+        yield "plot_comprehensive_with_standards", {"clouds": num_clouds}, \
+            _uncached(lambda d=data: _render(plot_comprehensive_with_standards({'Ex': 80.0, 'En': 3.0, 'He': 0.3}, d)))
+        yield "chart_standard_clouds", {"clouds": num_clouds}, \
+            _uncached(lambda d=data: _chart_spec(cloud_charts.plot_standard_clouds(d)))
+        yield "chart_comprehensive_with_standards", {"clouds": num_clouds}, \
+            _uncached(lambda d=data: _chart_spec(cloud_charts.plot_comprehensive_with_standards({'Ex': 80.0, 'En': 3.0, 'He': 0.3}, d)))
+
+
+def suite_store(quick):
+    store = EvaluationStore(os.path.join(tempfile.mkdtemp(prefix="bench_store_"), "evaluations.db"))
+    scores = _score_matrix(30, 10)
+    indicator_clouds = calculate_indicator_clouds(scores, np.ones(10))
+    ex, en, he = calculate_comprehensive_cloud(indicator_clouds)
+    comprehensive_cloud = {'Ex': ex, 'En': en, 'He': he}
+    num_records = 1000 if quick else 10000
+    for i in range(num_records):
+        store.save(f"项目{i % 10}", f"{i:064x}", 30, indicator_clouds, comprehensive_cloud)
+
+    yield "inputs_hash", {"experts": 1000, "indicators": 100}, \
+        lambda s=_score_matrix(1000, 100): inputs_hash(s, np.ones(100))
+    yield "EvaluationStore.save", {"records": num_records}, \
+        lambda: store.save("项目0", f"{0:064x}", 30, indicator_clouds, comprehensive_cloud)
+    yield "EvaluationStore.find", {"records": num_records}, lambda: store.find(f"{num_records // 2:064x}")
+    yield "EvaluationStore.list", {"records": num_records, "filter": "all"}, lambda: store.list()
+    yield "EvaluationStore.list", {"records": num_records, "filter": "project"}, lambda: store.list("项目3")
+    yield "EvaluationStore.get", {"records": num_records, "ids": 10}, lambda: store.get(range(1, 11))
+
+
+SUITES = {
+    "generation": suite_generation,
+    "drop_store": suite_drop_store,
+    "reverse": suite_reverse,
+    "consensus": suite_consensus,
+    "weights": suite_weights,
+    "nd": suite_nd,
+    "comprehensive": suite_comprehensive,
+    "parsing": suite_parsing,
+    "export": suite_export,
+    "rendering": suite_rendering,
+    "store": suite_store,
+}
+
+
+def measure(fn):
+    """运行一次估计耗时，再按 MIN_TIME 决定重复次数，返回各次耗时"""
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    repeats = int(min(MAX_REPEATS, max(1, MIN_TIME / max(first, 1e-9))))
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(suites, quick):
+    results = []
+    for suite in suites:
+        for name, params, fn in SUITES[suite](quick):
+            times = measure(fn)
+            result = {
+                "suite": suite,
+                "name": name,
+                "params": params,
+                "repeats": len(times),
+                "min_s": min(times),
+                "median_s": statistics.median(times),
+            }
+            results.append(result)
+            print(f"{name:<36} {json.dumps(params, ensure_ascii=False):<44} "
+                  f"median {result['median_s'] * 1e3:>10.3f} ms  (n={len(times)})", flush=True)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def _result_key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(baseline, current, threshold):
+    """逐项对比中位耗时，返回回归项数量"""
+    base = {_result_key(r): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\n对比基准 {baseline['meta'].get('commit')} -> {current['meta'].get('commit')}")
+    for result in current["results"]:
+        old = base.get(_result_key(result))
+        if old is None:
+            continue
+        ratio = result["median_s"] / old["median_s"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- 回归"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  (提升)"
+        print(f"{result['name']:<36} {json.dumps(result['params'], ensure_ascii=False):<44} x{ratio:>6.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", action="append", choices=list(SUITES), help="只运行指定的基准组，可重复")
+    parser.add_argument("--quick", action="store_true", help="缩小参数范围，快速运行")
+    parser.add_argument("--output", help="结果JSON路径，默认 benchmarks/results/benchmark_<commit>.json")
+    parser.add_argument("--compare", help="与之对比的基准结果JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为回归的相对变慢比例")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在回归时以非零状态退出")
+    args = parser.parse_args()
+
+    report = run(args.suite or list(SUITES), args.quick)
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"benchmark_{report['meta']['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
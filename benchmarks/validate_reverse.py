@@ -0,0 +1,179 @@
+"""正向/逆向云往返验证：在参数网格上生成云滴再逆向估计，统计 Ex、En、He 的偏差与均方根误差
+
+对 En × He/En × 云滴数量 的整个网格一次性向量化生成与估计：每个网格点重复 --reps 次，
+较小的云滴数量取同一批云滴的前 n 个。同时对比两种估计：
+    standard    逆向云算法（reverse_cloud_params，即 calculate_reverse_cloud_params）
+    membership  带确定度的逆向云（membership_reverse_cloud_params），确定度按各云滴自己的真实 En' 计算。
+                实际数据中 En' 不可观测，这只是确定度完全准确时的 oracle 上界，不是可用的替代算法
+Ex 误差以 En 为单位，En、He 误差为相对真值的百分比。结果可保存为JSON，--compare 与基线
+对比：基线的 reps、seed、云滴数量与本次不同，本次的某个条目在基线中不存在，或任一均方根误差
+变差超过 --tolerance 时以非0状态退出，可作为回归检查：
+
+    python benchmarks/validate_reverse.py --output baseline.json
+    python benchmarks/validate_reverse.py --compare baseline.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cloud_model import (  # noqa: E402
+    BLOCK_BYTES,
+    cloud_drops_batch,
+    generate_cloud_drops,
+    membership_reverse_cloud_params,
+    reverse_cloud_params,
+)
+
+EX = 50.0
+EN_VALUES = (1.0, 5.0, 10.0)
+HE_RATIOS = (0.01, 0.05, 0.1, 0.2, 0.3)
+DROP_COUNTS = (100, 1000, 10000)
+
+ESTIMATORS = ("standard", "membership")
+ESTIMATOR_LABELS = {
+    "standard": "standard（逆向云算法）",
+    "membership": "membership（oracle上界：确定度使用真实 En'，实际数据中不可得）",
+}
+METRICS = ("Ex偏差", "ExRMSE", "En偏差%", "EnRMSE%", "He偏差%", "HeRMSE%")
+
+
+def check_generator(seed):
+    """向量化生成与 generate_cloud_drops 使用相同的采样，保证验证的就是应用中的正向云"""
+    drops, _ = generate_cloud_drops(EX, 5.0, 0.5, 1000, seed=seed)
+    batch, _ = cloud_drops_batch(EX, 5.0, 0.5, 1000, seed=seed)
+    if not np.array_equal(drops, batch):
+        raise AssertionError("cloud_drops_batch 与 generate_cloud_drops 的云滴不一致")
+
+
+def _estimate(drops, en_prime, num_drops):
+    """对前 num_drops 个云滴做两种估计，返回 {估计方法: (Ex, En, He)}，各为 (..., reps) 数组"""
+    drops, en_prime = drops[..., :num_drops], en_prime[..., :num_drops]
+    certainties = np.exp(-0.5 * ((drops - EX) / en_prime) ** 2)
+    return {
+        "standard": reverse_cloud_params(drops, axis=-1),
+        "membership": membership_reverse_cloud_params(drops, certainties, axis=-1),
+    }
+
+
+def _metrics(estimates, en, he):
+    """偏差与均方根误差，沿重复次数（最后一维）统计"""
+    ex_hat, en_hat, he_hat = estimates
+    errors = ((ex_hat - EX) / en[:, None], 100 * (en_hat - en[:, None]) / en[:, None],
+              100 * (he_hat - he[:, None]) / he[:, None])
+    columns = []
+    for error in errors:
+        columns += [error.mean(axis=-1), np.sqrt(np.mean(error**2, axis=-1))]
+    return np.stack(columns, axis=-1)
+
+
+def run(en_values, he_ratios, drop_counts, reps, seed):
+    """返回结果行 [{'估计', 'En', 'He/En', '云滴数', 指标...}]"""
+    check_generator(seed)
+    en = np.repeat(en_values, len(he_ratios))
+    ratio = np.tile(he_ratios, len(en_values))
+    he = en * ratio
+    max_drops = max(drop_counts)
+
+    # 按网格点分块，每块一次生成 云滴 与 En' 两个 (网格点, reps, max_drops) 数组
+    points_per_block = max(1, BLOCK_BYTES // (2 * 8 * reps * max_drops))
+    seeds = np.random.SeedSequence(seed).spawn(len(range(0, len(en), points_per_block)))
+    table = {estimator: np.empty((len(en), len(drop_counts), len(METRICS))) for estimator in ESTIMATORS}
+    for block_seed, start in zip(seeds, range(0, len(en), points_per_block)):
+        stop = min(start + points_per_block, len(en))
+        repeated = np.ones((stop - start, reps))
+        drops, en_prime = cloud_drops_batch(EX, en[start:stop, None] * repeated, he[start:stop, None] * repeated,
+                                            max_drops, seed=block_seed)
+        for j, num_drops in enumerate(drop_counts):
+            for estimator, estimates in _estimate(drops, en_prime, num_drops).items():
+                table[estimator][start:stop, j] = _metrics(estimates, en[start:stop], he[start:stop])
+
+    rows = []
+    for estimator in ESTIMATORS:
+        for i in range(len(en)):
+            for j, num_drops in enumerate(drop_counts):
+                row = {'估计': estimator, 'En': float(en[i]), 'He/En': float(ratio[i]), '云滴数': int(num_drops)}
+                row.update(zip(METRICS, (float(v) for v in table[estimator][i, j])))
+                rows.append(row)
+    return rows
+
+
+def print_tables(rows):
+    for estimator in ESTIMATORS:
+        print(f"\n估计方法：{ESTIMATOR_LABELS[estimator]}")
+        print(f"{'En':>6} {'He/En':>6} {'云滴数':>7} " + " ".join(f"{m:>9}" for m in METRICS))
+        for row in rows:
+            if row['估计'] == estimator:
+                print(f"{row['En']:>6g} {row['He/En']:>6g} {row['云滴数']:>7d} "
+                      + " ".join(f"{row[m]:>9.3f}" for m in METRICS))
+
+
+def _row_key(row):
+    return row['估计'], row['En'], row['He/En'], row['云滴数']
+
+
+def _describe(row):
+    return f"{row['估计']} En={row['En']:g} He/En={row['He/En']:g} 云滴数={row['云滴数']}"
+
+
+def compare(baseline, meta, rows, tolerance):
+    """与基线对比，返回问题列表：运行参数不一致、基线中缺少的条目、均方根误差变差超过 tolerance（相对值）的条目"""
+    problems = [f"运行参数与基线不一致：{name} 基线 {baseline['meta'].get(name)}，本次 {value}"
+                for name, value in meta.items() if baseline['meta'].get(name) != value]
+    previous = {_row_key(row): row for row in baseline['results']}
+    for row in rows:
+        old = previous.get(_row_key(row))
+        if old is None:
+            problems.append(f"基线中没有该条目：{_describe(row)}")
+            continue
+        for metric in ("ExRMSE", "EnRMSE%", "HeRMSE%"):
+            if row[metric] > old[metric] * (1 + tolerance) + 1e-9:
+                problems.append(f"变差：{_describe(row)} {metric} {old[metric]:.3f} -> {row[metric]:.3f}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reps", type=int, default=200, help="每个网格点的重复次数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="只用较少的云滴数量与重复次数")
+    parser.add_argument("--output", help="结果JSON路径")
+    parser.add_argument("--compare", help="与此前保存的结果JSON对比")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="允许的均方根误差相对增加量")
+    args = parser.parse_args()
+
+    drop_counts = DROP_COUNTS[:2] if args.quick else DROP_COUNTS
+    reps = min(args.reps, 50) if args.quick else args.reps
+    start = time.perf_counter()
+    rows = run(EN_VALUES, HE_RATIOS, drop_counts, reps, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print_tables(rows)
+    print(f"\n{len(EN_VALUES) * len(HE_RATIOS)} 个参数组合 × {len(drop_counts)} 种云滴数量 × {reps} 次重复，"
+          f"耗时 {elapsed:.2f} s")
+
+    meta = {'reps': reps, 'seed': args.seed, 'drop_counts': list(drop_counts)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({'meta': meta, 'results': rows}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(baseline, meta, rows, args.tolerance)
+        for problem in problems:
+            print(problem)
+        if problems:
+            sys.exit(1)
+        print(f"与基线 {args.compare} 相比没有变差超过 {args.tolerance:.0%} 的误差")
+
+
+if __name__ == "__main__":
+    main()
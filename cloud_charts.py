@@ -0,0 +1,333 @@
+"""云模型交互式图表：用 Vega-Lite（Altair）在浏览器端绘制，函数与 cloud_plots 同名同参
+
+服务器只负责按视口抽稀数据：云滴按 CELL_PX 像素的网格聚合，每个有云滴的格子保留一个代表点，
+发送的点数受视口像素格数限制而与云滴数量无关；理论曲线每个格子一个采样点。
+栅格化在浏览器中完成，图表可缩放、平移，悬停显示数值。
+"""
+import functools
+from types import SimpleNamespace
+
+import numpy as np
+
+from cloud_model import calculate_memberships, generate_cloud_drops, standard_cloud_drops, theory_curve
+from cloud_plots import standard_cloud_rows
+from governor import scale_drop_counts
+from profiling import timed
+from startup import pandas
+
+# 默认视口尺寸（像素）与抽稀网格的格子边长
+CHART_WIDTH = 800
+CHART_HEIGHT = 450
+CELL_PX = 2
+# 发送到浏览器的数值保留的小数位数，远小于一个格子
+DATA_DECIMALS = 4
+
+# matplotlib 绘图符号对应的 Vega-Lite 形状
+MARKER_SHAPES = {
+    'o': 'circle', 's': 'square', '^': 'triangle-up', 'v': 'triangle-down', '<': 'triangle-left',
+    '>': 'triangle-right', 'd': 'diamond', 'D': 'diamond', '+': 'cross', 'x': 'cross', '*': 'cross',
+    'p': 'square', 'h': 'circle', 'H': 'circle',
+}
+
+
+@functools.lru_cache(maxsize=None)
+def altair():
+    """导入 altair，只在第一次绘图时执行"""
+    import altair as alt
+
+    return alt
+
+
+def is_chart(obj):
+    """是否为 Altair 图表（而非 matplotlib 图）"""
+    return type(obj).__module__.split('.')[0] == 'altair'
+
+
+def grid_downsample(x, y, x_range, y_range, width=CHART_WIDTH, height=CHART_HEIGHT, cell_px=CELL_PX):
+    """按视口像素网格抽稀散点，每个有点的格子保留第一个点，返回 (x, y, 每格点数)"""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    nx, ny = max(1, width // cell_px), max(1, height // cell_px)
+    (x0, x1), (y0, y1) = x_range, y_range
+    ix = np.clip(((x - x0) / ((x1 - x0) or 1) * nx).astype(np.int64), 0, nx - 1)
+    iy = np.clip(((y - y0) / ((y1 - y0) or 1) * ny).astype(np.int64), 0, ny - 1)
+    _, first, counts = np.unique(ix * ny + iy, return_index=True, return_counts=True)
+    return x[first], y[first], counts
+
+
+def _drop_frame(drops, memberships, x_range, width, height, **columns):
+    pd = pandas()
+
+    x, y, counts = grid_downsample(drops, memberships, x_range, (0, 1), width, height)
+    return pd.DataFrame({'x': x.round(DATA_DECIMALS), 'y': y.round(DATA_DECIMALS), 'count': counts, **columns})
+
+
+def _curve_frame(ex, en, x_min, x_max, width, **columns):
+    pd = pandas()
+
+    x, y = theory_curve(ex, en, float(x_min), float(x_max), num_points=max(2, width // CELL_PX))
+    return pd.DataFrame({'x': x.round(DATA_DECIMALS), 'y': y.round(DATA_DECIMALS), **columns})
+
+
+def _series_scale(series):
+    """图例：{系列名称: 颜色}"""
+    alt = altair()
+    return alt.Scale(domain=list(series), range=list(series.values()))
+
+
+def _axes(xlabel, ylabel, x_domain=None):
+    alt = altair()
+    x_scale = alt.Scale(domain=list(x_domain)) if x_domain else alt.Scale(zero=False)
+    return alt.X('x:Q', title=xlabel, scale=x_scale), alt.Y('y:Q', title=ylabel)
+
+
+def _tooltip(xlabel, ylabel, *extra):
+    alt = altair()
+    return [alt.Tooltip('x:Q', title=xlabel, format='.3f'), alt.Tooltip('y:Q', title=ylabel, format='.3f'), *extra]
+
+
+def _finish(chart, title, width, height):
+    return chart.properties(title=title, width=width, height=height).interactive()
+
+
+def _histogram_bars(counts, edges, colors, xlabel, ylabel, color_title):
+    pd = pandas()
+
+    alt = altair()
+    data = pd.DataFrame({'x': edges[:-1], 'x2': edges[1:], 'y': counts, 'color': colors})
+    return alt.Chart(data).mark_bar(opacity=0.7, stroke='black', strokeWidth=0.5).encode(
+        x=alt.X('x:Q', title=xlabel, scale=alt.Scale(zero=False)),
+        x2='x2:Q',
+        y=alt.Y('y:Q', title=ylabel),
+        color=alt.Color('color:Q', title=color_title, scale=alt.Scale(scheme='viridis', domain=[0, 1])),
+        tooltip=[alt.Tooltip('x:Q', title='下限', format='.3f'), alt.Tooltip('x2:Q', title='上限', format='.3f'),
+                 alt.Tooltip('y:Q', title=ylabel)],
+    )
+
+
+def _scatter(drops, memberships, xlabel, ylabel, width, height):
+    alt = altair()
+    data = _drop_frame(drops, memberships, (np.min(drops), np.max(drops)), width, height)
+    x, y = _axes(xlabel, ylabel)
+    return alt.Chart(data).mark_circle(opacity=0.6).encode(
+        x=x, y=y,
+        color=alt.Color('y:Q', title='隶属度', scale=alt.Scale(scheme='viridis')),
+        tooltip=_tooltip(xlabel, ylabel, alt.Tooltip('count:Q', title='云滴数')),
+    )
+
+
+def _histogram(drops, memberships, xlabel, ylabel):
+    # 各组按组内云滴的平均隶属度着色
+    counts, edges = np.histogram(drops, bins=50)
+    index = np.clip(np.searchsorted(edges, drops, side='right') - 1, 0, len(counts) - 1)
+    colors = np.bincount(index, weights=memberships, minlength=len(counts)) / np.maximum(counts, 1)
+    return _histogram_bars(counts, edges, colors, xlabel, ylabel, '平均隶属度')
+
+
+@timed("图表:plot_scatter")
+def plot_scatter(cloud_drops, memberships, title="云滴散点图", xlabel="云滴值", ylabel="隶属度",
+                 width=CHART_WIDTH, height=CHART_HEIGHT):
+    """绘制散点图"""
+    return _finish(_scatter(cloud_drops, memberships, xlabel, ylabel, width, height), title, width, height)
+
+
+@timed("图表:plot_histogram")
+def plot_histogram(cloud_drops, memberships, title="云滴分布直方图", xlabel="云滴值", ylabel="频数",
+                   width=CHART_WIDTH, height=CHART_HEIGHT):
+    """绘制直方图，只发送50个分组的频数"""
+    return _finish(_histogram(cloud_drops, memberships, xlabel, ylabel), title, width, height)
+
+
+@timed("图表:plot_histogram_counts")
+def plot_histogram_counts(counts, edges, ex, en, title="云滴分布直方图", xlabel="云滴值", ylabel="频数",
+                          width=CHART_WIDTH, height=CHART_HEIGHT):
+    """根据已分组的频数绘制直方图，用于外存中的大规模云滴"""
+    centers = (edges[:-1] + edges[1:]) / 2
+    chart = _histogram_bars(counts, edges, calculate_memberships(centers, ex, en), xlabel, ylabel, '隶属度')
+    return _finish(chart, title, width, height)
+
+
+@timed("图表:plot_density")
+def plot_density(counts, edges, ex, en, title="云滴密度图", xlabel="云滴值", ylabel="隶属度",
+                 width=CHART_WIDTH, height=CHART_HEIGHT):
+    """按分组频数绘制云滴密度图，发送的数据量与云滴数量无关"""
+    pd = pandas()
+
+    alt = altair()
+    centers = (edges[:-1] + edges[1:]) / 2
+    data = pd.DataFrame({'x': centers, 'y': calculate_memberships(centers, ex, en), 'count': counts})
+    x, y = _axes(xlabel, ylabel)
+    chart = alt.Chart(data).mark_circle(size=30).encode(
+        x=x, y=y,
+        color=alt.Color('count:Q', title='云滴数', scale=alt.Scale(scheme='viridis')),
+        tooltip=_tooltip(xlabel, ylabel, alt.Tooltip('count:Q', title='云滴数')),
+    )
+    return _finish(chart, title, width, height)
+
+
+@timed("图表:plot_cloud_2d_density")
+def plot_cloud_2d_density(density, ranges, ex, en, title="二维云密度图", xlabel="维度1", ylabel="维度2",
+                          width=CHART_WIDTH, height=CHART_HEIGHT):
+    """按二维直方图绘制二维云的密度热力图，只发送有云滴的格子，数据量与云滴数量无关"""
+    pd = pandas()
+
+    from cloud_nd import CONTOUR_LEVELS, membership_contour
+
+    alt = altair()
+    bins = density.shape[0]
+    (x0, x1), (y0, y1) = ranges
+    x_edges, y_edges = np.linspace(x0, x1, bins + 1), np.linspace(y0, y1, bins + 1)
+    iy, ix = np.nonzero(density)
+    cells = pd.DataFrame({'x': x_edges[ix].round(DATA_DECIMALS), 'x2': x_edges[ix + 1].round(DATA_DECIMALS),
+                          'y': y_edges[iy].round(DATA_DECIMALS), 'y2': y_edges[iy + 1].round(DATA_DECIMALS),
+                          'count': density[iy, ix]})
+    contours = pd.concat([
+        pd.DataFrame({'x': x.round(DATA_DECIMALS), 'y': y.round(DATA_DECIMALS), 'order': np.arange(len(x)),
+                      'level': f'隶属度 {level}'})
+        for level, (x, y) in ((level, membership_contour(ex, en, level)) for level in CONTOUR_LEVELS)
+    ])
+    x_axis = alt.X('x:Q', title=xlabel, scale=alt.Scale(domain=[x0, x1]))
+    y_axis = alt.Y('y:Q', title=ylabel, scale=alt.Scale(domain=[y0, y1]))
+    layers = [
+        alt.Chart(cells).mark_rect().encode(
+            x=x_axis, x2='x2:Q', y=y_axis, y2='y2:Q',
+            color=alt.Color('count:Q', title='云滴数', scale=alt.Scale(scheme='viridis')),
+            tooltip=[alt.Tooltip('x:Q', title=xlabel, format='.3f'), alt.Tooltip('y:Q', title=ylabel, format='.3f'),
+                     alt.Tooltip('count:Q', title='云滴数')],
+        ),
+        alt.Chart(contours).mark_line(color='white', strokeDash=[4, 3]).encode(
+            x=x_axis, y=y_axis, order='order:Q', detail='level:N', tooltip='level:N'),
+        alt.Chart(pd.DataFrame({'x': [ex[0]], 'y': [ex[1]]})).mark_point(shape='cross', color='red', size=150).encode(
+            x=x_axis, y=y_axis, tooltip=[alt.Tooltip('x:Q', title=f'Ex {xlabel}'), alt.Tooltip('y:Q', title=f'Ex {ylabel}')]),
+    ]
+    return _finish(alt.layer(*layers), title, width, height)
+
+
+def _cloud_layers(ex, en, cloud_drops, memberships, xlabel, ylabel, width, height):
+    pd = pandas()
+
+    alt = altair()
+    x_min, x_max = np.min(cloud_drops), np.max(cloud_drops)
+    labels = {'实际云滴': 'blue', '理论云模型': 'red', f'Ex = {ex:.2f}': 'green',
+              f'Ex-En = {ex-en:.2f}': 'orange', f'Ex+En = {ex+en:.2f}': 'orange'}
+    names = list(labels)
+    color = alt.Color('series:N', title=None, scale=_series_scale(labels))
+    x, y = _axes(xlabel, ylabel)
+
+    drops = _drop_frame(cloud_drops, memberships, (x_min, x_max), width, height, series=names[0])
+    curve = _curve_frame(ex, en, x_min, x_max, width, series=names[1])
+    rules = pd.DataFrame({'x': [ex, ex - en, ex + en], 'series': names[2:]})
+    return alt.layer(
+        alt.Chart(drops).mark_circle(size=20, opacity=0.6).encode(
+            x=x, y=y, color=color, tooltip=_tooltip(xlabel, ylabel, alt.Tooltip('count:Q', title='云滴数'))),
+        alt.Chart(curve).mark_line(strokeWidth=2).encode(x=x, y=y, color=color),
+        alt.Chart(rules).mark_rule(strokeDash=[6, 4], opacity=0.7).encode(x='x:Q', color=color, tooltip='series:N'),
+    )
+
+
+@timed("图表:plot_cloud_visualization")
+def plot_cloud_visualization(ex, en, he, cloud_drops, memberships, title="云模型可视化", xlabel="云滴值", ylabel="隶属度",
+                             width=CHART_WIDTH, height=CHART_HEIGHT):
+    """绘制云模型可视化图"""
+    chart = _cloud_layers(ex, en, cloud_drops, memberships, xlabel, ylabel, width, height)
+    return _finish(chart, title, width, height)
+
+
+@timed("图表:plot_combined_visualization")
+def plot_combined_visualization(ex, en, he, cloud_drops, memberships, title="组合可视化图", xlabel="云滴值", ylabel="隶属度/频数",
+                                width=CHART_WIDTH, height=CHART_HEIGHT):
+    """绘制组合图：上图散点图，下图直方图"""
+    alt = altair()
+    half = height // 2
+    scatter = _finish(_scatter(cloud_drops, memberships, '', '隶属度', width, half), f'{title} - 散点图', width, half)
+    histogram = _finish(_histogram(cloud_drops, memberships, xlabel, '频数'), f'{title} - 直方图', width, half)
+    return alt.vconcat(scatter, histogram).resolve_scale(color='independent')
+
+
+def _standard_layers(rows, drop_counts, x_range, curve_range, xlabel, ylabel, width, height, opacity, prefix=''):
+    """标准云的散点与理论曲线图层，颜色与符号取自标准云配置；没有有效标准云时返回空列表"""
+    if not rows:
+        return []
+    pd = pandas()
+
+    alt = altair()
+    drops, curves = [], []
+    for row, num_drops in zip(rows, drop_counts):
+        name = prefix + str(row['云名称'])
+        # 生成云滴（跨会话共享缓存），按预算取前缀
+        cloud_drops, memberships = standard_cloud_drops(row['Ex'], row['En'], row['He'], row['云滴数量'])
+        drops.append(_drop_frame(cloud_drops[:num_drops], memberships[:num_drops], x_range, width, height, series=name))
+        x_min, x_max = curve_range or (cloud_drops.min(), cloud_drops.max())
+        curves.append(_curve_frame(row['Ex'], row['En'], x_min, x_max, width, series=name))
+
+    names = [prefix + str(row['云名称']) for row in rows]
+    color = alt.Color('series:N', title=None, scale=alt.Scale(domain=names, range=[row['颜色'] for row in rows]))
+    shape = alt.Shape('series:N', title=None,
+                      scale=alt.Scale(domain=names, range=[MARKER_SHAPES.get(row['绘图符号'], 'circle') for row in rows]))
+    x, y = _axes(xlabel, ylabel, x_range if curve_range else None)
+    return [
+        alt.Chart(pd.concat(drops, ignore_index=True)).mark_point(filled=True, size=20, opacity=opacity).encode(
+            x=x, y=y, color=color, shape=shape,
+            tooltip=[alt.Tooltip('series:N', title='云名称'), *_tooltip(xlabel, ylabel, alt.Tooltip('count:Q', title='云滴数'))]),
+        alt.Chart(pd.concat(curves, ignore_index=True)).mark_line(strokeWidth=1.5, opacity=0.7).encode(
+            x=x, y=y, color=color, detail='series:N'),
+    ]
+
+
+@timed("图表:plot_standard_clouds")
+def plot_standard_clouds(standard_data, title="评价标准云图", xlabel="评分值", ylabel="隶属度", max_points=None,
+                         width=CHART_WIDTH, height=CHART_HEIGHT):
+    """绘制评价标准云图，云滴总数超过 max_points 时按比例抽样"""
+    alt = altair()
+    rows = standard_cloud_rows(standard_data)
+    if not rows:
+        return _finish(alt.Chart().mark_point(), title, width, height)
+    drop_counts = scale_drop_counts([row['云滴数量'] for row in rows], max_points)
+
+    # 所有云共用同一横轴范围抽稀
+    extents = [standard_cloud_drops(row['Ex'], row['En'], row['He'], row['云滴数量']) for row in rows]
+    x_range = (min(drops.min() for drops, _ in extents), max(drops.max() for drops, _ in extents))
+    layers = _standard_layers(rows, drop_counts, x_range, None, xlabel, ylabel, width, height, 0.6)
+    return _finish(alt.layer(*layers), title, width, height)
+
+
+@timed("图表:plot_comprehensive_with_standards")
+def plot_comprehensive_with_standards(comprehensive_cloud, standard_data, num_drops=1000, title="综合评价云与标准云对比图",
+                                      xlabel="评分值", ylabel="隶属度", max_points=None,
+                                      width=CHART_WIDTH, height=CHART_HEIGHT):
+    """绘制综合评价云与标准评价云对比图，云滴总数超过 max_points 时按比例抽样"""
+    pd = pandas()
+
+    alt = altair()
+    rows = standard_cloud_rows(standard_data)
+    *std_drop_counts, num_drops = scale_drop_counts([row['云滴数量'] for row in rows] + [num_drops], max_points)
+    layers = _standard_layers(rows, std_drop_counts, (0, 100), (0, 100), xlabel, ylabel, width, height, 0.4, '标准-')
+
+    # 综合评价云（突出显示）
+    comp_ex, comp_en, comp_he = comprehensive_cloud['Ex'], comprehensive_cloud['En'], comprehensive_cloud['He']
+    comp_drops, comp_memberships = generate_cloud_drops(comp_ex, comp_en, comp_he, num_drops)
+    drops = _drop_frame(comp_drops, comp_memberships, (0, 100), width, height)
+    curve = _curve_frame(comp_ex, comp_en, 0, 100, width)
+    rules = pd.DataFrame({'x': [comp_ex, comp_ex - comp_en, comp_ex + comp_en],
+                          'label': [f'综合Ex = {comp_ex:.2f}', 'Ex-En', 'Ex+En'],
+                          'color': ['red', 'orange', 'orange']})
+    x, y = _axes(xlabel, ylabel, (0, 100))
+    layers += [
+        alt.Chart(drops).mark_point(shape='diamond', filled=True, size=30, color='black', opacity=0.8,
+                                    stroke='white', strokeWidth=0.5).encode(
+            x=x, y=y, tooltip=_tooltip(xlabel, ylabel, alt.Tooltip('count:Q', title='云滴数'))),
+        alt.Chart(curve).mark_line(color='black', strokeWidth=3, opacity=0.9).encode(x=x, y=y),
+        alt.Chart(rules).mark_rule(strokeDash=[4, 3], strokeWidth=1.5).encode(
+            x='x:Q', color=alt.Color('color:N', scale=None), tooltip='label:N'),
+    ]
+    chart = alt.layer(*layers).encode(y=alt.Y('y:Q', title=ylabel, scale=alt.Scale(domain=[0, 1.1])))
+    return _finish(chart, title, width, height)
+
+
+def for_viewport(width=CHART_WIDTH, height=None):
+    """按视口尺寸绑定的绘图函数集合，函数名与 cloud_plots 相同"""
+    height = height or width * 9 // 16
+    functions = (plot_scatter, plot_histogram, plot_histogram_counts, plot_density, plot_cloud_visualization,
+                 plot_combined_visualization, plot_standard_clouds, plot_comprehensive_with_standards,
+                 plot_cloud_2d_density)
+    return SimpleNamespace(**{fn.__name__: functools.partial(fn, width=width, height=height) for fn in functions})
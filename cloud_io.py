@@ -0,0 +1,48 @@
+"""数据输入输出：专家打分与权重文本解析、评价结果CSV导出"""
+import numpy as np
+
+from profiling import timed
+from startup import pandas
+
+
+@timed("文本解析")
+def parse_expert_scores(text):
+    """解析专家打分文本：每行一个专家，逗号或制表符（从Excel复制）分隔
+
+    数值无效或各行长度不一致时抛出 ValueError。
+    """
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    processed_lines = []
+    for line in lines:
+        separator = '\t' if '\t' in line else ','
+        processed_lines.append([float(x.strip()) for x in line.split(separator) if x.strip()])
+    return np.array(processed_lines)
+
+
+@timed("文本解析")
+def parse_weights(text):
+    """解析权重文本：支持逗号、制表符或换行分隔，数值无效时抛出 ValueError"""
+    text = text.strip()
+    if '\n' in text:  # 换行分隔
+        separator = '\n'
+    elif '\t' in text:  # 制表符分隔（从Excel复制）
+        separator = '\t'
+    else:  # 逗号分隔
+        separator = ','
+    return np.array([float(x.strip()) for x in text.split(separator) if x.strip()])
+
+
+@timed("CSV导出")
+def indicator_clouds_to_csv(indicator_clouds):
+    """指标评价云导出为CSV文本"""
+    pd = pandas()
+
+    return pd.DataFrame(indicator_clouds).to_csv(index=False)
+
+
+@timed("CSV导出")
+def comprehensive_cloud_to_csv(comprehensive_cloud):
+    """综合评价云导出为CSV文本"""
+    pd = pandas()
+
+    return pd.DataFrame([comprehensive_cloud]).to_csv(index=False)
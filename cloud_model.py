@@ -0,0 +1,309 @@
+"""云模型核心计算：正向云发生器、逆向云发生器与综合评价云"""
+import hashlib
+
+import numpy as np
+
+from array_cache import SharedArrayCache
+from profiling import timed
+
+# 采样方式
+SAMPLING_RANDOM = "random"
+SAMPLING_QMC = "qmc"
+
+# 标准云与理论曲线缓存的字节数上限，跨会话、跨进程共享
+STANDARD_CLOUD_CACHE_BYTES = 256 * 2**20
+THEORY_CURVE_CACHE_BYTES = 16 * 2**20
+# 单个标准云最多缓存的云滴数量，抽样时取前缀，不同抽样数量共用一份
+STANDARD_CLOUD_MAX_DROPS = 1_000_000
+
+# 大矩阵按列分块计算时每块的最大字节数，限制临时数组的内存占用
+BLOCK_BYTES = 64 * 2**20
+
+# 带确定度的逆向云中参与估计的云滴确定度上限
+MAX_CERTAINTY = 0.99
+
+# 评价等级：评分值低于 GRADE_THRESHOLDS[i] 时属于 GRADE_LEVELS[i]，不低于最后一个阈值为最高等级
+GRADE_LEVELS = ('劣', '差', '一般', '良', '优')
+GRADE_THRESHOLDS = (25, 50, 75, 90)
+
+# Acklam 逆正态分布函数近似系数
+_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+          1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+          6.680131188771972e+01, -1.328068155288572e+01)
+_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+          -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+          3.754408661907416e+00)
+_PPF_LOW = 0.02425
+
+
+def _polyval(coeffs, x):
+    """按Horner法计算多项式"""
+    result = np.zeros_like(x)
+    for c in coeffs:
+        result = result * x + c
+    return result
+
+
+def norm_ppf(u):
+    """标准正态分布的逆累积分布函数（向量化，相对误差约1e-9）"""
+    u = np.clip(np.asarray(u, dtype=float), 1e-15, 1 - 1e-15)
+    z = np.empty_like(u)
+
+    # 中间区域
+    central = (u >= _PPF_LOW) & (u <= 1 - _PPF_LOW)
+    q = u[central] - 0.5
+    r = q * q
+    z[central] = q * _polyval(_PPF_A, r) / (_polyval(_PPF_B, r) * r + 1)
+
+    # 两侧尾部
+    lower = u < _PPF_LOW
+    q = np.sqrt(-2 * np.log(u[lower]))
+    z[lower] = _polyval(_PPF_C, q) / (_polyval(_PPF_D, q) * q + 1)
+    upper = u > 1 - _PPF_LOW
+    q = np.sqrt(-2 * np.log(1 - u[upper]))
+    z[upper] = -_polyval(_PPF_C, q) / (_polyval(_PPF_D, q) * q + 1)
+
+    return z
+
+
+def scrambled_halton(num_points, bases=(2, 3), rng=None, start=0):
+    """生成随机置乱的Halton低差异序列，返回 (num_points, len(bases)) 的 (0, 1) 内均匀点
+
+    同一随机种子下置换固定，start 指定序列起始位置，分块生成的结果与一次生成一致。
+    """
+    rng = np.random.default_rng(rng)
+    index = np.arange(start + 1, start + num_points + 1)
+    points = np.empty((num_points, len(bases)))
+
+    for dim, base in enumerate(bases):
+        # 每一位数字使用独立的随机置换，位数覆盖双精度
+        total_digits = int(np.ceil(53 * np.log(2) / np.log(base)))
+        perms = [rng.permutation(base) for _ in range(total_digits)]
+        scales = float(base) ** -np.arange(1, total_digits + 1)
+
+        used_digits = 1
+        while used_digits < total_digits and base ** used_digits <= start + num_points:
+            used_digits += 1
+
+        digits_left = index.copy()
+        u = np.zeros(num_points)
+        for j in range(used_digits):
+            u += perms[j][digits_left % base] * scales[j]
+            digits_left //= base
+        # 更高位均为0，置换后为常数
+        u += sum(perms[j][0] * scales[j] for j in range(used_digits, total_digits))
+        points[:, dim] = u
+
+    return points
+
+
+@timed("云滴生成")
+def generate_cloud_drops(ex, en, he, num_drops=1000, method=SAMPLING_RANDOM, seed=None, offset=0):
+    """生成云滴
+
+    method 为 "random" 时使用伪随机正态数；为 "qmc" 时使用置乱Halton序列经逆正态变换
+    分别生成 En' 与 x，相同云滴数量下统计量的波动更小。offset 为低差异序列的起始位置，
+    分块生成时使用。
+    """
+    num_drops = int(num_drops)
+
+    if method == SAMPLING_QMC:
+        u = scrambled_halton(num_drops, rng=seed, start=offset)
+        z = norm_ppf(u)
+        en_prime = en + he * z[:, 0]
+        cloud_drops = ex + np.abs(en_prime) * z[:, 1]
+    elif seed is None:
+        en_prime = np.random.normal(en, he, num_drops)
+        cloud_drops = np.random.normal(ex, np.abs(en_prime))
+    else:
+        rng = np.random.default_rng(seed)
+        en_prime = rng.normal(en, he, num_drops)
+        cloud_drops = rng.normal(ex, np.abs(en_prime))
+
+    return cloud_drops, calculate_memberships(cloud_drops, ex, en)
+
+
+def cloud_drops_batch(ex, en, he, num_drops, seed=None):
+    """向量化的伪随机正向云：ex、en、he 可广播为任意形状 S，返回形状为 S + (num_drops,) 的 (云滴, En')
+
+    与 generate_cloud_drops 的伪随机采样相同，标量参数、相同种子时得到相同云滴。
+    """
+    rng = np.random.default_rng(seed)
+    ex, en, he = (np.asarray(p, dtype=float)[..., None] for p in (ex, en, he))
+    shape = np.broadcast_shapes(ex.shape, en.shape, he.shape)[:-1] + (int(num_drops),)
+    en_prime = rng.normal(en, he, shape)
+    return rng.normal(ex, np.abs(en_prime)), en_prime
+
+
+def calculate_memberships(cloud_drops, ex, en):
+    """计算云滴隶属度"""
+    return np.exp(-0.5 * ((cloud_drops - ex) / en) ** 2)
+
+
+def params_seed(*params):
+    """由参数确定的随机种子，相同参数总是得到相同云滴"""
+    digest = hashlib.sha256(repr(tuple(float(p) for p in params)).encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+_standard_clouds = SharedArrayCache("standard-clouds", STANDARD_CLOUD_CACHE_BYTES)
+_theory_curves = SharedArrayCache("theory-curves", THEORY_CURVE_CACHE_BYTES)
+
+
+def standard_cloud_drops(ex, en, he, num_drops):
+    """标准云云滴：种子由参数确定，结果只读并跨进程共享
+
+    最多返回 STANDARD_CLOUD_MAX_DROPS 个。按预算抽样时取返回数组的前缀，
+    这样降级后的数量不会产生新的缓存键。
+    """
+    key = (float(ex), float(en), float(he), int(num_drops))
+    size = min(int(num_drops), STANDARD_CLOUD_MAX_DROPS)
+    return _standard_clouds.get(key, lambda: generate_cloud_drops(*key[:3], size, seed=params_seed(*key)))
+
+
+def theory_curve(ex, en, x_min, x_max, num_points=200):
+    """理论云模型曲线，结果只读并跨进程共享"""
+    key = (float(ex), float(en), float(x_min), float(x_max), int(num_points))
+
+    def compute():
+        x_theory = np.linspace(key[2], key[3], key[4])
+        return x_theory, calculate_memberships(x_theory, ex, en)
+    return _theory_curves.get(key, compute)
+
+
+def clear_standard_cloud_cache():
+    """清空标准云与理论曲线缓存（含共享目录中的条目）"""
+    _standard_clouds.cache_clear()
+    _theory_curves.cache_clear()
+
+
+def calculate_reverse_cloud_params(data):
+    """计算逆向云模型参数"""
+    data = np.array(data)
+    n = len(data)
+
+    # 计算期望值 Ex
+    ex = np.mean(data)
+
+    # 计算一阶样本绝对中心矩
+    s1 = np.mean(np.abs(data - ex))
+
+    # 计算样本方差
+    s2 = np.var(data, ddof=1)
+
+    # 计算熵 En
+    en = np.sqrt(np.pi / 2) * s1
+
+    # 计算超熵 He
+    he = np.sqrt(abs(s2 - en**2))
+
+    return ex, en, he
+
+
+def reverse_cloud_params(data, axis=0, sample_weights=None):
+    """沿 axis 向量化计算逆向云模型参数，返回 (Ex, En, He) 数组
+
+    expert_scores (专家, 指标) 取 axis=0 得到各指标的参数；批量 (请求, 专家, 指标) 取 axis=1。
+    sample_weights 为沿 axis 的样本（专家）权重，方差按可靠性权重做无偏修正，全为1时与不加权相同。
+    """
+    data = np.asarray(data, dtype=float)
+    if sample_weights is None:
+        ex = np.mean(data, axis=axis, keepdims=True)
+        s1 = np.mean(np.abs(data - ex), axis=axis)
+        s2 = np.var(data, axis=axis, ddof=1)
+    else:
+        shape = [1] * data.ndim
+        shape[axis] = -1
+        w = np.asarray(sample_weights, dtype=float).reshape(shape)
+        v1, v2 = np.sum(w), np.sum(w**2)
+        ex = np.sum(w * data, axis=axis, keepdims=True) / v1
+        deviation = data - ex
+        s1 = np.sum(w * np.abs(deviation), axis=axis) / v1
+        s2 = np.sum(w * deviation**2, axis=axis) / (v1 - v2 / v1)
+    en = np.sqrt(np.pi / 2) * s1
+    he = np.sqrt(np.abs(s2 - en**2))
+    return np.squeeze(ex, axis=axis), en, he
+
+
+def membership_reverse_cloud_params(data, certainties, axis=-1, max_certainty=MAX_CERTAINTY):
+    """带确定度的逆向云：沿 axis 由云滴及其确定度 μ = exp(-(x - Ex)^2 / (2 En'^2)) 估计 (Ex, En, He)
+
+    每个云滴还原 En' = |x - Ex| / sqrt(-2 ln μ)，En、He 为 En' 的均值与标准差。确定度超过
+    max_certainty 的云滴离 Ex 太近，还原误差被放大，不参与 En、He 的估计。
+    """
+    data = np.asarray(data, dtype=float)
+    certainties = np.asarray(certainties, dtype=float)
+    ex = np.mean(data, axis=axis, keepdims=True)
+    valid = (certainties > 0) & (certainties < max_certainty)
+    spread = np.sqrt(-2 * np.log(np.where(valid, certainties, 0.5)))
+    en_prime = np.where(valid, np.abs(data - ex) / spread, 0.0)
+    count = np.sum(valid, axis=axis, keepdims=True)
+    en = np.sum(en_prime, axis=axis, keepdims=True) / np.maximum(count, 1)
+    ss = np.sum(np.where(valid, (en_prime - en) ** 2, 0.0), axis=axis)
+    he = np.sqrt(ss / np.maximum(np.squeeze(count, axis=axis) - 1, 1))
+    return np.squeeze(ex, axis=axis), np.squeeze(en, axis=axis), he
+
+
+def column_blocks(num_rows, num_cols, block_bytes=BLOCK_BYTES):
+    """把 (num_rows, num_cols) 的 float64 矩阵按列切块，返回 [(起始列, 结束列)]"""
+    block = max(1, block_bytes // (8 * max(num_rows, 1)))
+    return [(start, min(start + block, num_cols)) for start in range(0, num_cols, block)]
+
+
+def comprehensive_cloud_params(exs, ens, hes, weights):
+    """沿最后一维向量化合成综合云，权重自动归一化，返回 (Ex, En, He)"""
+    weights = np.asarray(weights, dtype=float)
+    weights = weights / np.sum(weights, axis=-1, keepdims=True)
+    ex_comp = np.sum(weights * exs, axis=-1)
+    en_comp = np.sqrt(np.sum(weights * (ens**2 + (exs - ex_comp[..., None])**2), axis=-1))
+    he_comp = np.sqrt(np.sum(weights * hes**2, axis=-1))
+    return ex_comp, en_comp, he_comp
+
+
+def grade_levels(scores):
+    """向量化评定等级，返回与 scores 形状相同的等级名称数组"""
+    return np.array(GRADE_LEVELS)[np.searchsorted(GRADE_THRESHOLDS, scores, side='right')]
+
+
+def grade_level(score):
+    """单个评分值的评价等级"""
+    return GRADE_LEVELS[int(np.searchsorted(GRADE_THRESHOLDS, score, side='right'))]
+
+
+@timed("逆向云计算")
+def calculate_indicator_clouds(expert_scores, weights, expert_weights=None):
+    """计算指标评价云，expert_weights 为各专家的权重（见 consensus），缺省时专家等权"""
+    expert_scores = np.asarray(expert_scores, dtype=float)
+    exs, ens, hes = (np.empty(expert_scores.shape[1]) for _ in range(3))
+    # 按指标计算，大矩阵分块以限制临时数组的内存
+    for start, stop in column_blocks(*expert_scores.shape):
+        exs[start:stop], ens[start:stop], hes[start:stop] = reverse_cloud_params(
+            expert_scores[:, start:stop], axis=0, sample_weights=expert_weights)
+    return [
+        {
+            '指标': f'指标{i+1}',
+            'Ex': exs[i],
+            'En': ens[i],
+            'He': hes[i],
+            '权重': weights[i] if i < len(weights) else 0
+        }
+        for i in range(len(exs))
+    ]
+
+
+@timed("综合云合成")
+def calculate_comprehensive_cloud(indicator_clouds, weights=None):
+    """计算综合评价云，weights（如客观赋权结果，见 objective_weights）给定时代替各指标云的权重"""
+    # 提取参数和权重
+    exs = np.array([cloud['Ex'] for cloud in indicator_clouds])
+    ens = np.array([cloud['En'] for cloud in indicator_clouds])
+    hes = np.array([cloud['He'] for cloud in indicator_clouds])
+    if weights is None:
+        weights = np.array([cloud['权重'] for cloud in indicator_clouds])
+    elif len(weights) != len(indicator_clouds):
+        raise ValueError(f"权重数量（{len(weights)}）与指标数量（{len(indicator_clouds)}）不一致")
+
+    ex_comp, en_comp, he_comp = comprehensive_cloud_params(exs, ens, hes, weights)
+    return float(ex_comp), float(en_comp), float(he_comp)
@@ -0,0 +1,155 @@
+"""多维正态云：N维云滴生成、联合隶属度、逆向估计与二维密度统计
+
+每一维有独立的 (Ex, En, He)：En'_d ~ N(En_d, He_d^2)，x_d ~ N(Ex_d, En'_d^2)，各维独立采样。
+联合隶属度与一维相同按期望曲线计算：μ = exp(-Σ_d (x_d - Ex_d)^2 / (2 En_d^2))。
+采样复用一维的批量生成（cloud_drops_batch、置乱Halton序列），大量云滴按块生成并累积统计量，
+内存占用与云滴数量无关。
+"""
+import numpy as np
+
+from cloud_model import (
+    SAMPLING_QMC,
+    SAMPLING_RANDOM,
+    cloud_drops_batch,
+    norm_ppf,
+    reverse_cloud_params,
+    scrambled_halton,
+)
+from profiling import timed
+
+# 准蒙特卡洛采样每维使用两个Halton基（En' 与 x），支持的最大维数为质数个数的一半
+HALTON_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+# 按块生成时每块的云滴数量
+ND_CHUNK_SIZE = 500_000
+
+# 二维密度图默认的分箱数与范围（Ex ± DENSITY_SPAN × (En + 3He)），以及叠加的隶属度等值线
+DENSITY_BINS = 120
+DENSITY_SPAN = 3.0
+CONTOUR_LEVELS = (0.25, 0.5, 0.75)
+
+
+def _params(ex, en, he):
+    ex, en, he = np.broadcast_arrays(*(np.atleast_1d(np.asarray(p, dtype=float)) for p in (ex, en, he)))
+    if ex.ndim != 1:
+        raise ValueError("Ex、En、He 须为标量或一维数组（每维一个值）")
+    return ex, en, he
+
+
+def generate_nd_cloud_drops(ex, en, he, num_drops=1000, method=SAMPLING_RANDOM, seed=None, offset=0):
+    """生成N维云滴，返回 (云滴 (num_drops, 维数), 联合隶属度 (num_drops,))
+
+    method 与 offset 的含义同 generate_cloud_drops；准蒙特卡洛采样对第 d 维使用第 2d、2d+1 个质数基。
+    """
+    ex, en, he = _params(ex, en, he)
+    num_drops, dims = int(num_drops), len(ex)
+
+    if method == SAMPLING_QMC:
+        if 2 * dims > len(HALTON_PRIMES):
+            raise ValueError(f"准蒙特卡洛采样最多支持 {len(HALTON_PRIMES) // 2} 维")
+        z = norm_ppf(scrambled_halton(num_drops, bases=HALTON_PRIMES[:2 * dims], rng=seed, start=offset))
+        en_prime = en + he * z[:, 0::2]
+        drops = ex + np.abs(en_prime) * z[:, 1::2]
+    else:
+        drops = cloud_drops_batch(ex, en, he, num_drops, seed=seed)[0].T
+
+    return drops, nd_memberships(drops, ex, en)
+
+
+def nd_memberships(drops, ex, en):
+    """联合隶属度：各维期望曲线隶属度之积"""
+    z = (np.asarray(drops, dtype=float) - ex) / en
+    return np.exp(-0.5 * np.einsum('...d,...d->...', z, z))
+
+
+def reverse_nd_cloud_params(drops):
+    """N维逆向云：对每一列独立做逆向云估计，drops 为 (..., 云滴, 维数)，返回各为 (..., 维数) 的 (Ex, En, He)"""
+    return reverse_cloud_params(drops, axis=-2)
+
+
+def density_ranges(ex, en, he, span=DENSITY_SPAN):
+    """各维的显示范围 [(低, 高)]，覆盖绝大部分云滴"""
+    ex, en, he = _params(ex, en, he)
+    half = span * (en + 3 * he)
+    return list(zip(ex - half, ex + half))
+
+
+def membership_contour(ex, en, level, num_points=200):
+    """前两维联合隶属度等于 level 的等值线（椭圆），返回 (x, y)"""
+    radius = np.sqrt(-2 * np.log(level))
+    theta = np.linspace(0, 2 * np.pi, num_points)
+    return ex[0] + en[0] * radius * np.cos(theta), ex[1] + en[1] * radius * np.sin(theta)
+
+
+def histogram_2d(x, y, bins, x_range, y_range):
+    """二维直方图计数 (bins, bins)，第一维对应 y；范围外的云滴不计入。比 np.histogram2d 快，适合大量云滴"""
+    x_index = np.floor((x - x_range[0]) / (x_range[1] - x_range[0]) * bins).astype(np.int64)
+    y_index = np.floor((y - y_range[0]) / (y_range[1] - y_range[0]) * bins).astype(np.int64)
+    inside = (x_index >= 0) & (x_index < bins) & (y_index >= 0) & (y_index < bins)
+    flat = y_index[inside] * bins + x_index[inside]
+    return np.bincount(flat, minlength=bins * bins).reshape(bins, bins)
+
+
+def _chunk_seeds(num_drops, chunk_size, method, seed):
+    """各块的 (起始位置, 数量, 种子)：伪随机采样每块一个子种子，准蒙特卡洛各块共用种子、按起始位置续接"""
+    starts = range(0, num_drops, chunk_size)
+    if method == SAMPLING_QMC:
+        seeds = [seed] * len(starts)
+    else:
+        seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    return [(start, min(chunk_size, num_drops - start), s) for start, s in zip(starts, seeds)]
+
+
+@timed("多维云统计")
+def summarize_nd_cloud(ex, en, he, num_drops, method=SAMPLING_RANDOM, seed=None, bins=DENSITY_BINS,
+                       ranges=None, sample_size=2000, chunk_size=ND_CHUNK_SIZE, progress=None):
+    """按块生成N维云滴并统计，不保留全部云滴
+
+    返回 {'逆向估计': (Ex, En, He) 各为 (维数,) 数组, '平均隶属度', '样本': 前 sample_size 个云滴,
+    '密度': {(i, j): 第 i、j 维的二维直方图}（i < j，每对维度一个）, '范围': 各维的显示范围}。逆向估计分两遍生成相同的云滴，
+    第一遍求均值，第二遍求一阶绝对中心矩与方差，与一次性计算的结果一致。
+    """
+    ex, en, he = _params(ex, en, he)
+    num_drops = int(num_drops)
+    if num_drops < 2:
+        raise ValueError("云滴数量至少为2")
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    chunks = _chunk_seeds(num_drops, chunk_size, method, seed)
+    ranges = ranges or density_ranges(ex, en, he)
+    pairs = [(i, j) for i in range(len(ex)) for j in range(i + 1, len(ex))]
+
+    total = np.zeros(len(ex))
+    membership_total = 0.0
+    density = {pair: np.zeros((bins, bins), dtype=np.int64) for pair in pairs}
+    sample = None
+    for i, (start, count, chunk_seed) in enumerate(chunks):
+        drops, memberships = generate_nd_cloud_drops(ex, en, he, count, method, chunk_seed, offset=start)
+        total += drops.sum(axis=0)
+        membership_total += memberships.sum()
+        for i_dim, j_dim in pairs:
+            density[i_dim, j_dim] += histogram_2d(drops[:, i_dim], drops[:, j_dim], bins, ranges[i_dim], ranges[j_dim])
+        if sample is None:
+            sample = (drops[:sample_size].copy(), memberships[:sample_size].copy())
+        if progress:
+            progress(0.5 * (i + 1) / len(chunks))
+    mean = total / num_drops
+
+    abs_total = np.zeros(len(ex))
+    square_total = np.zeros(len(ex))
+    for i, (start, count, chunk_seed) in enumerate(chunks):
+        deviation = generate_nd_cloud_drops(ex, en, he, count, method, chunk_seed, offset=start)[0] - mean
+        abs_total += np.abs(deviation).sum(axis=0)
+        square_total += np.einsum('nd,nd->d', deviation, deviation)
+        if progress:
+            progress(0.5 + 0.5 * (i + 1) / len(chunks))
+
+    en_hat = np.sqrt(np.pi / 2) * abs_total / num_drops
+    he_hat = np.sqrt(np.abs(square_total / (num_drops - 1) - en_hat**2))
+    return {
+        '逆向估计': (mean, en_hat, he_hat),
+        '平均隶属度': membership_total / num_drops,
+        '样本': sample,
+        '密度': density,
+        '范围': ranges,
+    }
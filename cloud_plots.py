@@ -0,0 +1,324 @@
+"""云模型绘图：云滴散点图、直方图、云模型图及标准云对比图
+
+matplotlib 在第一次调用 pyplot() 时导入，中文字体只查找一次并缓存。
+"""
+import functools
+
+import numpy as np
+
+from cloud_model import generate_cloud_drops, standard_cloud_drops, theory_curve
+from governor import scale_drop_counts
+from profiling import timed
+from startup import pandas
+
+# 中文字体候选，按优先级排列
+CJK_FONT_CANDIDATES = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS', 'Noto Sans CJK SC',
+                       'Source Han Sans SC', 'WenQuanYi Micro Hei']
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_cjk_font():
+    """返回本机已安装的第一个中文字体名称，没有时返回 None"""
+    from matplotlib import font_manager
+
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    return next((name for name in CJK_FONT_CANDIDATES if name in installed), None)
+
+
+@functools.lru_cache(maxsize=None)
+def pyplot():
+    """导入 matplotlib.pyplot 并设置中文字体，只在第一次调用时执行"""
+    import matplotlib.pyplot as plt
+
+    # 设置matplotlib支持中文：只列出已安装的字体，避免每次绘图逐个回退查找
+    font = resolve_cjk_font()
+    plt.rcParams['font.sans-serif'] = ([font] if font else []) + ['DejaVu Sans']
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt
+
+
+@timed("绘图:plot_scatter")
+def plot_scatter(cloud_drops, memberships, title="云滴散点图", xlabel="云滴值", ylabel="隶属度"):
+    """绘制散点图"""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    scatter = ax.scatter(cloud_drops, memberships, alpha=0.6, c=memberships, cmap='viridis')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3)
+    plt.colorbar(scatter, ax=ax, label='隶属度')
+    return fig
+
+
+@timed("绘图:plot_histogram")
+def plot_histogram(cloud_drops, memberships, title="云滴分布直方图", xlabel="云滴值", ylabel="频数"):
+    """绘制直方图"""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    n, bins, patches = ax.hist(cloud_drops, bins=50, alpha=0.7, edgecolor='black')
+
+    # 根据隶属度着色
+    bin_centers = (bins[:-1] + bins[1:]) / 2
+    for i, (patch, center) in enumerate(zip(patches, bin_centers)):
+        # 找到最接近的云滴点来确定颜色
+        closest_idx = np.argmin(np.abs(cloud_drops - center))
+        color_intensity = memberships[closest_idx]
+        patch.set_facecolor(plt.cm.viridis(color_intensity))
+
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+@timed("绘图:plot_histogram_counts")
+def plot_histogram_counts(counts, edges, ex, en, title="云滴分布直方图", xlabel="云滴值", ylabel="频数"):
+    """根据已分组的频数绘制直方图，用于外存中的大规模云滴"""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    bin_centers = (edges[:-1] + edges[1:]) / 2
+
+    # 隶属度由云滴值唯一确定，按分组中心着色
+    color_intensity = np.exp(-0.5 * ((bin_centers - ex) / en) ** 2)
+    ax.bar(bin_centers, counts, width=np.diff(edges), alpha=0.7, edgecolor='black',
+           color=plt.cm.viridis(color_intensity))
+
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+@timed("绘图:plot_density")
+def plot_density(counts, edges, ex, en, title="云滴密度图", xlabel="云滴值", ylabel="隶属度"):
+    """按分组频数绘制云滴密度图，绘制开销与云滴数量无关"""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    bin_centers = (edges[:-1] + edges[1:]) / 2
+
+    # 隶属度由云滴值唯一确定，云滴均落在理论曲线上，按分组频数着色
+    y = np.exp(-0.5 * ((bin_centers - ex) / en) ** 2)
+    density = ax.scatter(bin_centers, y, c=counts, cmap='viridis', s=30)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3)
+    plt.colorbar(density, ax=ax, label='云滴数')
+    return fig
+
+
+@timed("绘图:plot_cloud_2d_density")
+def plot_cloud_2d_density(density, ranges, ex, en, title="二维云密度图", xlabel="维度1", ylabel="维度2"):
+    """按二维直方图绘制二维云的密度，叠加联合隶属度等值线，绘制开销与云滴数量无关"""
+    from cloud_nd import CONTOUR_LEVELS, membership_contour
+
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(10, 8))
+    (x0, x1), (y0, y1) = ranges
+    image = ax.imshow(np.ma.masked_equal(density, 0), origin='lower', extent=(x0, x1, y0, y1),
+                      aspect='auto', cmap='viridis', interpolation='nearest')
+    for level in CONTOUR_LEVELS:
+        ax.plot(*membership_contour(ex, en, level), color='white', linewidth=1, linestyle='--', alpha=0.8)
+    ax.plot(ex[0], ex[1], marker='+', color='red', markersize=14, markeredgewidth=2,
+            label=f'Ex = ({ex[0]:.2f}, {ex[1]:.2f})')
+
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(f"{title}（虚线：隶属度 {' / '.join(map(str, CONTOUR_LEVELS))}）")
+    ax.legend(loc='upper right')
+    plt.colorbar(image, ax=ax, label='云滴数')
+    plt.tight_layout()
+    return fig
+
+
+@timed("绘图:plot_cloud_visualization")
+def plot_cloud_visualization(ex, en, he, cloud_drops, memberships, title="云模型可视化", xlabel="云滴值", ylabel="隶属度"):
+    """绘制云模型可视化图"""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    # 绘制实际云滴
+    ax.scatter(cloud_drops, memberships, alpha=0.6, c='blue', s=20, label='实际云滴')
+
+    # 绘制理论云模型曲线
+    x_theory = np.linspace(cloud_drops.min(), cloud_drops.max(), 1000)
+    y_theory = np.exp(-0.5 * ((x_theory - ex) / en) ** 2)
+    ax.plot(x_theory, y_theory, 'r-', linewidth=2, label='理论云模型')
+
+    # 标记特征点
+    ax.axvline(x=ex, color='green', linestyle='--', alpha=0.7, label=f'Ex = {ex:.2f}')
+    ax.axvline(x=ex-en, color='orange', linestyle='--', alpha=0.7, label=f'Ex-En = {ex-en:.2f}')
+    ax.axvline(x=ex+en, color='orange', linestyle='--', alpha=0.7, label=f'Ex+En = {ex+en:.2f}')
+
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    ax.grid(True, alpha=0.3)
+    plt.tight_layout()
+    return fig
+
+
+@timed("绘图:plot_combined_visualization")
+def plot_combined_visualization(ex, en, he, cloud_drops, memberships, title="组合可视化图", xlabel="云滴值", ylabel="隶属度/频数"):
+    """绘制组合图"""
+    plt = pyplot()
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
+
+    # 上图：散点图
+    scatter = ax1.scatter(cloud_drops, memberships, alpha=0.6, c=memberships, cmap='viridis')
+    ax1.set_ylabel('隶属度')
+    ax1.set_title(f'{title} - 散点图')
+    ax1.grid(True, alpha=0.3)
+    plt.colorbar(scatter, ax=ax1)
+
+    # 下图：直方图
+    n, bins, patches = ax2.hist(cloud_drops, bins=50, alpha=0.7, edgecolor='black')
+    bin_centers = (bins[:-1] + bins[1:]) / 2
+    for i, (patch, center) in enumerate(zip(patches, bin_centers)):
+        closest_idx = np.argmin(np.abs(cloud_drops - center))
+        color_intensity = memberships[closest_idx]
+        patch.set_facecolor(plt.cm.viridis(color_intensity))
+
+    ax2.set_xlabel(xlabel)
+    ax2.set_ylabel('频数')
+    ax2.set_title(f'{title} - 直方图')
+    ax2.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    return fig
+
+
+def default_standard_data():
+    """默认的评价标准云配置表（五级评语，最后一行为综合评价云的绘图样式）"""
+    pd = pandas()
+
+    return pd.DataFrame({
+        '云名称': ['劣', '差', '一般', '良', '优', '综合评价云'],
+        'Ex': [12.5, 37.5, 62.5, 82.5, 95.0, np.nan],
+        'En': [4.17, 4.17, 4.17, 2.5, 1.67, np.nan],
+        'He': [0.5, 0.5, 0.5, 0.5, 0.5, np.nan],
+        '云滴数量': [1200, 1200, 1200, 1200, 1200, 1200],
+        '颜色': ['red', 'blue', 'yellow', 'gray', 'orange', 'green'],
+        '绘图符号': ['o', '*', '*', '*', 'o', 's']
+    })
+
+
+def standard_cloud_rows(standard_data):
+    """提取标准云配置中的有效行"""
+    pd = pandas()
+
+    rows = []
+    for _, row in standard_data.iterrows():
+        ex, en, he = row['Ex'], row['En'], row['He']
+
+        # 检查数据有效性，如果Ex、En、He任一为空或无效，则跳过该行
+        if pd.isna(ex) or pd.isna(en) or pd.isna(he) or ex == 0 or en == 0:
+            continue
+
+        # 处理云滴数量，防止NaN值
+        try:
+            num_drops = int(row['云滴数量']) if pd.notna(row['云滴数量']) else 1200
+        except (ValueError, TypeError):
+            num_drops = 1200  # 默认值
+
+        rows.append({
+            'Ex': ex,
+            'En': en,
+            'He': he,
+            '云滴数量': num_drops,
+            '颜色': row['颜色'] if pd.notna(row['颜色']) else 'blue',
+            '绘图符号': row['绘图符号'] if pd.notna(row['绘图符号']) else 'o',
+            '云名称': row['云名称'] if pd.notna(row['云名称']) else '未命名',
+        })
+    return rows
+
+
+@timed("绘图:plot_standard_clouds")
+def plot_standard_clouds(standard_data, title="评价标准云图", xlabel="评分值", ylabel="隶属度", max_points=None):
+    """绘制评价标准云图，云滴总数超过 max_points 时按比例抽样"""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    rows = standard_cloud_rows(standard_data)
+    drop_counts = scale_drop_counts([row['云滴数量'] for row in rows], max_points)
+    for row, num_drops in zip(rows, drop_counts):
+        ex, en, he = row['Ex'], row['En'], row['He']
+        color, marker, name = row['颜色'], row['绘图符号'], row['云名称']
+
+        # 生成云滴（跨会话共享缓存），按预算取前缀
+        drops, memberships = standard_cloud_drops(ex, en, he, row['云滴数量'])
+
+        # 绘制散点
+        ax.scatter(drops[:num_drops], memberships[:num_drops], alpha=0.6, c=color, marker=marker, s=20, label=name)
+
+        # 绘制理论曲线
+        x_theory, y_theory = theory_curve(ex, en, drops.min(), drops.max())
+        ax.plot(x_theory, y_theory, color=color, linewidth=2, alpha=0.8)
+
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    return fig
+
+
+@timed("绘图:plot_comprehensive_with_standards")
+def plot_comprehensive_with_standards(comprehensive_cloud, standard_data, num_drops=1000, title="综合评价云与标准云对比图", xlabel="评分值", ylabel="隶属度", max_points=None):
+    """绘制综合评价云与标准评价云对比图，云滴总数超过 max_points 时按比例抽样"""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(14, 10))
+
+    rows = standard_cloud_rows(standard_data)
+    *std_drop_counts, num_drops = scale_drop_counts([row['云滴数量'] for row in rows] + [num_drops], max_points)
+
+    # 绘制标准评价云
+    for row, std_num_drops in zip(rows, std_drop_counts):
+        ex, en, he = row['Ex'], row['En'], row['He']
+        color, marker, name = row['颜色'], row['绘图符号'], row['云名称']
+
+        # 生成标准云滴（跨会话共享缓存），按预算取前缀
+        drops, memberships = standard_cloud_drops(ex, en, he, row['云滴数量'])
+
+        # 绘制标准云散点
+        ax.scatter(drops[:std_num_drops], memberships[:std_num_drops], alpha=0.4, c=color, marker=marker, s=15, label=f'标准-{name}')
+
+        # 绘制标准云理论曲线
+        x_theory, y_theory = theory_curve(ex, en, 0, 100)
+        ax.plot(x_theory, y_theory, color=color, linewidth=1.5, alpha=0.6, linestyle='--')
+
+    # 绘制综合评价云
+    comp_ex = comprehensive_cloud['Ex']
+    comp_en = comprehensive_cloud['En']
+    comp_he = comprehensive_cloud['He']
+
+    # 生成综合评价云滴
+    comp_drops, comp_memberships = generate_cloud_drops(comp_ex, comp_en, comp_he, num_drops)
+
+    # 绘制综合评价云散点（突出显示）
+    ax.scatter(comp_drops, comp_memberships, alpha=0.8, c='black', marker='D', s=30, label='综合评价云', edgecolors='white', linewidth=0.5)
+
+    # 绘制综合评价云理论曲线（突出显示）
+    x_theory_comp = np.linspace(0, 100, 200)
+    y_theory_comp = np.exp(-0.5 * ((x_theory_comp - comp_ex) / comp_en) ** 2)
+    ax.plot(x_theory_comp, y_theory_comp, color='black', linewidth=3, alpha=0.9, label='综合评价云理论曲线')
+
+    # 标记综合评价云的特征点
+    ax.axvline(x=comp_ex, color='red', linestyle='-', alpha=0.8, linewidth=2, label=f'综合Ex = {comp_ex:.2f}')
+    ax.axvline(x=comp_ex-comp_en, color='orange', linestyle=':', alpha=0.7, linewidth=1.5)
+    ax.axvline(x=comp_ex+comp_en, color='orange', linestyle=':', alpha=0.7, linewidth=1.5)
+
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    ax.grid(True, alpha=0.3)
+    ax.set_xlim(0, 100)
+    ax.set_ylim(0, 1.1)
+
+    plt.tight_layout()
+    return fig
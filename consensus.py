@@ -0,0 +1,82 @@
+"""专家共识：识别打分明显偏离群体的专家，在逆向云计算前剔除或降低其权重
+
+每位专家在每个指标上的稳健z分数为 |打分 - 中位数| / (1.4826 × MAD)，专家的偏离度为各指标
+z 分数的均方根。正常专家的偏离度在1附近，随意打分或方向打反的专家偏离度明显更大。
+计算按列分块一次遍历打分矩阵，临时内存与 BLOCK_BYTES 相当，可处理 10^5 专家 × 10^3 指标。
+"""
+import numpy as np
+
+from cloud_model import column_blocks
+from profiling import timed
+
+# 处理离群专家的方式
+CONSENSUS_DROP = "drop"
+CONSENSUS_DOWNWEIGHT = "downweight"
+
+# 偏离度超过该值的专家视为离群
+CONSENSUS_THRESHOLD = 3.0
+# 少于该人数时无法可靠估计群体共识，不做处理
+MIN_CONSENSUS_EXPERTS = 5
+# 剔除后至少保留的专家人数，少于该人数时无法估计方差，改为全部等权
+MIN_KEPT_EXPERTS = 2
+
+# MAD 与平均绝对偏差换算为正态标准差的系数
+_MAD_SCALE = 1.4826
+_MEAN_ABS_SCALE = np.sqrt(np.pi / 2)
+
+
+@timed("专家偏离度")
+def expert_deviation(expert_scores):
+    """各专家相对群体共识的偏离度（稳健z分数的均方根），返回长度为专家数的数组"""
+    scores = np.asarray(expert_scores, dtype=float)
+    num_experts, num_indicators = scores.shape
+    sum_squares = np.zeros(num_experts)
+    for start, stop in column_blocks(num_experts, num_indicators):
+        # 转置为 指标×专家 的连续数组，中位数沿连续内存计算更快
+        block = np.ascontiguousarray(scores[:, start:stop].T)
+        deviation = np.abs(block - np.median(block, axis=1, keepdims=True))
+        scale = _MAD_SCALE * np.median(deviation, axis=1, keepdims=True)
+        # 多数专家打分相同时 MAD 为0，改用平均绝对偏差；全体相同的指标不计入偏离
+        scale = np.where(scale > 0, scale, _MEAN_ABS_SCALE * deviation.mean(axis=1, keepdims=True))
+        z = np.divide(deviation, scale, out=np.zeros_like(deviation), where=scale > 0)
+        sum_squares += np.einsum('ij,ij->j', z, z)
+    return np.sqrt(sum_squares / num_indicators)
+
+
+def consensus_weights(deviation, threshold=CONSENSUS_THRESHOLD, mode=CONSENSUS_DROP):
+    """由偏离度得到专家权重：剔除时离群专家权重为0，降权时按 (threshold / 偏离度)^2 衰减
+
+    剔除后保留的专家少于 MIN_KEPT_EXPERTS 人时全部等权。
+    """
+    deviation = np.asarray(deviation, dtype=float)
+    if mode == CONSENSUS_DROP:
+        kept = deviation <= threshold
+        if np.count_nonzero(kept) < MIN_KEPT_EXPERTS:
+            return np.ones(len(deviation))
+        return kept.astype(float)
+    if mode == CONSENSUS_DOWNWEIGHT:
+        return np.minimum(1.0, (threshold / np.maximum(deviation, 1e-12)) ** 2)
+    raise ValueError(f"未知的处理方式：{mode}")
+
+
+def expert_consensus(expert_scores, threshold=CONSENSUS_THRESHOLD, mode=CONSENSUS_DROP):
+    """计算专家权重，返回 {'偏离度', '专家权重', '受影响专家', '已回退'}
+
+    受影响专家为 [{'专家', '偏离度', '权重'}]，按偏离度从大到小排列。专家少于
+    MIN_CONSENSUS_EXPERTS 人时全部等权；剔除后保留不足 MIN_KEPT_EXPERTS 人时也全部等权，已回退为 True。
+    """
+    scores = np.asarray(expert_scores, dtype=float)
+    if scores.shape[0] < MIN_CONSENSUS_EXPERTS:
+        return {'偏离度': np.zeros(scores.shape[0]), '专家权重': np.ones(scores.shape[0]), '受影响专家': [],
+                '已回退': False}
+
+    deviation = expert_deviation(scores)
+    weights = consensus_weights(deviation, threshold, mode)
+    affected = np.flatnonzero(weights < 1)
+    affected = affected[np.argsort(-deviation[affected])]
+    return {
+        '偏离度': deviation,
+        '专家权重': weights,
+        '受影响专家': [{'专家': f'专家{i+1}', '偏离度': float(deviation[i]), '权重': float(weights[i])} for i in affected],
+        '已回退': mode == CONSENSUS_DROP and np.count_nonzero(deviation <= threshold) < MIN_KEPT_EXPERTS,
+    }
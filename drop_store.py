@@ -0,0 +1,232 @@
+"""云滴外存：按块生成并写入内存映射的 .npy 文件，统计、预览与导出均按块流式处理"""
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+from cloud_model import SAMPLING_QMC, SAMPLING_RANDOM, calculate_memberships, generate_cloud_drops
+from startup import pandas
+
+# 每块云滴数量
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# 汇总统计中的分位数与直方图分组数
+SUMMARY_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+SUMMARY_BINS = 50
+# 计算分位数时使用的细分组数
+_QUANTILE_BINS = 4096
+# 密度图分组数，需整除 _QUANTILE_BINS
+_DENSITY_BINS = 256
+
+
+def _remove(directory, reservations):
+    shutil.rmtree(directory, True)
+    for reservation in reservations:
+        reservation.release()
+
+
+class DropStore:
+    """内存映射的云滴存储，会话中只保存该句柄
+
+    数据位于临时目录下的 drops.npy 和 memberships.npy，句柄被回收或调用 delete() 时删除。
+    紧凑模式下云滴以 float32 保存且不保存隶属度，隶属度由 (Ex, En) 按需计算。
+    汇总统计在生成时计算一次，之后读取为 O(1)。
+    """
+
+    def __init__(self, directory, ex, en, he, num_drops, chunk_size=DEFAULT_CHUNK_SIZE, compact=False):
+        self.directory = directory
+        self.ex = ex
+        self.en = en
+        self.he = he
+        self.num_drops = int(num_drops)
+        self.chunk_size = int(chunk_size)
+        self.compact = compact
+        self.summary = None
+        self._reservations = []
+        self._finalizer = weakref.finalize(self, _remove, directory, self._reservations)
+
+    @property
+    def drops_path(self):
+        return os.path.join(self.directory, "drops.npy")
+
+    @property
+    def memberships_path(self):
+        return os.path.join(self.directory, "memberships.npy")
+
+    @staticmethod
+    def required_bytes(num_drops, compact=False):
+        """生成 num_drops 个云滴需要的磁盘空间：float64 云滴与隶属度各8字节，紧凑模式只保存 float32 云滴"""
+        return int(num_drops) * (4 if compact else 16)
+
+    @classmethod
+    def generate(cls, ex, en, he, num_drops, method=SAMPLING_RANDOM, seed=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, root=None, compact=False, progress=None):
+        """按块生成云滴并写入磁盘，内存占用与块大小成正比
+
+        progress 为可选回调，每写完一块以完成比例调用；回调抛出的异常会中止生成并删除已写入的数据。
+        """
+        directory = tempfile.mkdtemp(prefix="cloud_drops_", dir=root)
+        store = cls(directory, ex, en, he, num_drops, chunk_size, compact)
+        try:
+            store._write(method, seed, progress)
+        except BaseException:
+            store.delete()
+            raise
+        return store
+
+    def _write(self, method, seed, progress):
+        """生成并写入全部云滴，同时计算汇总统计"""
+        ex, en, he = self.ex, self.en, self.he
+
+        # 各块共用同一个种子：低差异序列按位置续接，伪随机序列按块派生
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+
+        drop_dtype = np.float32 if self.compact else np.float64
+        drops = np.lib.format.open_memmap(self.drops_path, mode="w+", dtype=drop_dtype, shape=(self.num_drops,))
+        memberships = None
+        if not self.compact:
+            memberships = np.lib.format.open_memmap(self.memberships_path, mode="w+", dtype=np.float64, shape=(self.num_drops,))
+
+        # 以Ex为偏移量累加，避免大数相减的精度损失
+        total = 0.0
+        total_sq = 0.0
+        total_membership = 0.0
+        low, high = np.inf, -np.inf
+
+        for i, start in enumerate(range(0, self.num_drops, self.chunk_size)):
+            stop = min(start + self.chunk_size, self.num_drops)
+            chunk_seed = seed if method == SAMPLING_QMC else [seed, i]
+            chunk_drops, chunk_memberships = generate_cloud_drops(
+                ex, en, he, stop - start, method=method, seed=chunk_seed, offset=start
+            )
+            drops[start:stop] = chunk_drops
+            if memberships is not None:
+                memberships[start:stop] = chunk_memberships
+            else:
+                # 统计量按实际保存的精度计算
+                chunk_drops = drops[start:stop].astype(np.float64)
+                chunk_memberships = calculate_memberships(chunk_drops, ex, en)
+
+            deviation = chunk_drops - ex
+            total += np.sum(deviation)
+            total_sq += np.sum(deviation**2)
+            total_membership += np.sum(chunk_memberships)
+            low = min(low, chunk_drops.min())
+            high = max(high, chunk_drops.max())
+            if progress is not None:
+                progress(stop / self.num_drops)
+
+        drops.flush()
+        del drops
+        if memberships is not None:
+            memberships.flush()
+            del memberships
+
+        n = self.num_drops
+        mean_deviation = total / n
+        self.summary = {
+            '云滴数量': n,
+            '平均值': ex + mean_deviation,
+            '标准差': np.sqrt(max(total_sq / n - mean_deviation**2, 0.0)),
+            '平均隶属度': total_membership / n,
+            '最小值': low,
+            '最大值': high,
+        }
+        self.summary.update(self._summarize_distribution(low, high))
+
+    def _summarize_distribution(self, low, high):
+        """一次遍历计算显示用直方图和基于细分组插值的分位数"""
+        edges = np.linspace(low, high, SUMMARY_BINS + 1)
+        fine_edges = np.linspace(low, high, _QUANTILE_BINS + 1)
+        counts = np.zeros(SUMMARY_BINS, dtype=np.int64)
+        fine_counts = np.zeros(_QUANTILE_BINS, dtype=np.int64)
+        for drops, _ in self.iter_chunks(with_memberships=False):
+            counts += np.histogram(drops, bins=edges)[0]
+            fine_counts += np.histogram(drops, bins=fine_edges)[0]
+
+        cumulative = np.concatenate([[0], np.cumsum(fine_counts)])
+        quantiles = np.interp(np.array(SUMMARY_QUANTILES) * self.num_drops, cumulative, fine_edges)
+        return {
+            '分位数': dict(zip(SUMMARY_QUANTILES, quantiles)),
+            '直方图': (counts, edges),
+            # 合并为256组，供密度图使用
+            '细分直方图': (fine_counts.reshape(_DENSITY_BINS, -1).sum(axis=1), fine_edges[::_QUANTILE_BINS // _DENSITY_BINS]),
+        }
+
+    def __len__(self):
+        return self.num_drops
+
+    def _open(self):
+        drops = np.load(self.drops_path, mmap_mode="r")
+        if self.compact:
+            return drops, None
+        return drops, np.load(self.memberships_path, mmap_mode="r")
+
+    def _read(self, drops, memberships, start, stop):
+        """读取一段云滴，紧凑模式下重新计算隶属度"""
+        chunk_drops = np.asarray(drops[start:stop], dtype=np.float64)
+        if memberships is None:
+            return chunk_drops, calculate_memberships(chunk_drops, self.ex, self.en)
+        return chunk_drops, np.array(memberships[start:stop])
+
+    def iter_chunks(self, with_memberships=True):
+        """按块依次返回 (云滴, 隶属度)，with_memberships 为 False 时隶属度为 None"""
+        drops, memberships = self._open()
+        for start in range(0, self.num_drops, self.chunk_size):
+            stop = min(start + self.chunk_size, self.num_drops)
+            if with_memberships:
+                yield self._read(drops, memberships, start, stop)
+            else:
+                yield drops[start:stop], None
+
+    def head(self, n=100):
+        """前n个云滴，用于预览和绘图（云滴独立同分布，前n个即为代表性样本）"""
+        drops, memberships = self._open()
+        return self._read(drops, memberships, 0, min(n, self.num_drops))
+
+    def stats(self):
+        """数量、平均值、标准差、平均隶属度、极值、分位数与直方图（生成时已计算）"""
+        return self.summary
+
+    def histogram(self, bins=SUMMARY_BINS):
+        """直方图，返回 (频数, 分组边界)；默认分组数直接使用生成时的结果"""
+        if bins == SUMMARY_BINS:
+            return self.summary['直方图']
+
+        edges = np.linspace(self.summary['最小值'], self.summary['最大值'], bins + 1)
+        counts = np.zeros(bins, dtype=np.int64)
+        for drops, _ in self.iter_chunks(with_memberships=False):
+            counts += np.histogram(drops, bins=edges)[0]
+        return counts, edges
+
+    def nbytes(self):
+        """磁盘上云滴数据的字节数"""
+        paths = [self.drops_path] if self.compact else [self.drops_path, self.memberships_path]
+        return sum(os.path.getsize(path) for path in paths)
+
+    def write_csv(self, path=None, max_drops=None):
+        """按块导出CSV（max_drops 限制导出前多少个云滴），返回文件路径"""
+        pd = pandas()
+
+        if path is None:
+            path = os.path.join(self.directory, "cloud_drops.csv")
+        remaining = self.num_drops if max_drops is None else min(int(max_drops), self.num_drops)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for i, (drops, memberships) in enumerate(self.iter_chunks()):
+                if remaining <= 0:
+                    break
+                pd.DataFrame({'云滴值': drops[:remaining], '隶属度': memberships[:remaining]}).to_csv(
+                    f, index=False, header=(i == 0))
+                remaining -= len(drops)
+        return path
+
+    def hold(self, reservation):
+        """资源占用（如磁盘预算）随存储一起释放：调用 delete() 或句柄被回收时归还"""
+        self._reservations.append(reservation)
+
+    def delete(self):
+        """删除磁盘上的云滴数据并归还持有的资源占用"""
+        self._finalizer()
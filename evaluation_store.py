@@ -0,0 +1,200 @@
+"""评价库：把每次综合评价保存到本机 SQLite 数据库，按项目、日期、等级建立索引
+
+每条记录保存输入哈希（专家打分与权重）、指标评价云、综合评价云与等级。相同项目中
+输入完全相同的评价只保存一次，再次评价时直接命中缓存。每次操作使用独立连接并开启 WAL，
+Streamlit 的多个会话线程可以同时读写。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from cloud_model import grade_level
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EVALUATION_DB_PATH = os.environ.get("CLOUD_EVALUATION_DB", os.path.join(_BASE_DIR, "data", "evaluations.db"))
+
+# 逆向云或综合云算法变化时递增，使旧的缓存结果失效
+ALGORITHM_VERSION = 1
+
+DEFAULT_PROJECT = "默认项目"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    num_experts INTEGER NOT NULL,
+    num_indicators INTEGER NOT NULL,
+    ex REAL NOT NULL,
+    en REAL NOT NULL,
+    he REAL NOT NULL,
+    grade TEXT NOT NULL,
+    weights TEXT NOT NULL,
+    indicator_clouds TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_evaluations_project_hash ON evaluations (project, input_hash);
+CREATE INDEX IF NOT EXISTS idx_evaluations_project_date ON evaluations (project, created_at);
+CREATE INDEX IF NOT EXISTS idx_evaluations_date ON evaluations (created_at);
+CREATE INDEX IF NOT EXISTS idx_evaluations_grade_date ON evaluations (grade, created_at);
+CREATE INDEX IF NOT EXISTS idx_evaluations_hash ON evaluations (input_hash);
+"""
+
+# 列表查询返回的列（不含指标评价云明细）
+_SUMMARY_COLUMNS = "id, project, created_at, input_hash, num_experts, num_indicators, ex, en, he, grade"
+
+
+def inputs_hash(expert_scores, weights, options=None):
+    """专家打分与权重的哈希，数值按 float64 比较；options 为影响结果的其他设置（如专家共识过滤）"""
+    scores = np.ascontiguousarray(expert_scores, dtype=np.float64)
+    weights = np.ascontiguousarray(weights, dtype=np.float64)
+    prefix = f"v{ALGORITHM_VERSION}:{scores.shape}:{weights.shape}:"
+    if options:
+        prefix += json.dumps(options, sort_keys=True) + ":"
+    digest = hashlib.sha256(prefix.encode())
+    digest.update(scores.tobytes())
+    digest.update(weights.tobytes())
+    return digest.hexdigest()
+
+
+def _summary(row):
+    return {
+        '编号': row['id'],
+        '项目': row['project'],
+        '时间': row['created_at'],
+        'Ex': row['ex'],
+        'En': row['en'],
+        'He': row['he'],
+        '等级': row['grade'],
+        '专家数': row['num_experts'],
+        '指标数': row['num_indicators'],
+        '输入哈希': row['input_hash'],
+    }
+
+
+def _record(row):
+    record = _summary(row)
+    record['权重'] = json.loads(row['weights'])
+    record['指标云'] = json.loads(row['indicator_clouds'])
+    return record
+
+
+class EvaluationStore:
+    """本机评价库"""
+
+    def __init__(self, path=EVALUATION_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")  # WAL 模式下断电只可能丢失最近的事务，不会损坏数据库
+            with conn:  # 事务：正常退出时提交，异常时回滚
+                yield conn
+
+    def save(self, project, input_hash, num_experts, indicator_clouds, comprehensive_cloud, created_at=None):
+        """保存一次评价，同一项目中相同输入已存在时不重复保存；返回 (编号, 是否新保存)
+
+        云参数含 NaN 或无穷时抛出 ValueError。
+        """
+        ex, en, he = (float(comprehensive_cloud[key]) for key in ('Ex', 'En', 'He'))
+        clouds = [
+            {'指标': cloud['指标'], 'Ex': float(cloud['Ex']), 'En': float(cloud['En']),
+             'He': float(cloud['He']), '权重': float(cloud['权重'])}
+            for cloud in indicator_clouds
+        ]
+        values = [ex, en, he] + [cloud[key] for cloud in clouds for key in ('Ex', 'En', 'He', '权重')]
+        if not np.isfinite(values).all():
+            raise ValueError("评价云参数含有无效数值（NaN 或无穷），未保存到评价库")
+        created_at = (created_at or datetime.now()).isoformat(timespec="seconds")
+        with self._connect() as conn:
+            # 只忽略同一项目的重复输入，其他约束错误照常抛出
+            cursor = conn.execute(
+                "INSERT INTO evaluations (project, created_at, input_hash, num_experts, num_indicators,"
+                " ex, en, he, grade, weights, indicator_clouds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (project, input_hash) DO NOTHING",
+                (project, created_at, input_hash, int(num_experts), len(clouds), ex, en, he, grade_level(ex),
+                 json.dumps([cloud['权重'] for cloud in clouds]), json.dumps(clouds, ensure_ascii=False)),
+            )
+            if cursor.rowcount:
+                return cursor.lastrowid, True
+            row = conn.execute("SELECT id FROM evaluations WHERE project = ? AND input_hash = ?",
+                               (project, input_hash)).fetchone()
+            return row['id'], False
+
+    def find(self, input_hash, project=None):
+        """按输入哈希查找评价，优先返回同一项目的记录，其次任意项目中最近的一条"""
+        with self._connect() as conn:
+            row = None
+            if project is not None:
+                row = conn.execute("SELECT * FROM evaluations WHERE project = ? AND input_hash = ?",
+                                   (project, input_hash)).fetchone()
+            if row is None:
+                row = conn.execute("SELECT * FROM evaluations WHERE input_hash = ? ORDER BY created_at DESC LIMIT 1",
+                                   (input_hash,)).fetchone()
+        return _record(row) if row is not None else None
+
+    def get(self, evaluation_ids):
+        """按编号取完整记录（含指标评价云），按给定顺序返回"""
+        evaluation_ids = [int(i) for i in evaluation_ids]
+        if not evaluation_ids:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM evaluations WHERE id IN ({','.join('?' * len(evaluation_ids))})",
+                                evaluation_ids).fetchall()
+        records = {row['id']: _record(row) for row in rows}
+        return [records[i] for i in evaluation_ids if i in records]
+
+    def list(self, project=None, grades=None, since=None, until=None, limit=5000):
+        """按项目、等级与日期范围（date，含两端）筛选，按时间倒序返回摘要"""
+        conditions, params = [], []
+        if project is not None:
+            conditions.append("project = ?")
+            params.append(project)
+        if grades:
+            conditions.append(f"grade IN ({','.join('?' * len(grades))})")
+            params.extend(grades)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append((until + timedelta(days=1)).isoformat())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {_SUMMARY_COLUMNS} FROM evaluations {where}"
+                                " ORDER BY created_at DESC, id DESC LIMIT ?", (*params, limit)).fetchall()
+        return [_summary(row) for row in rows]
+
+    def projects(self):
+        """各项目的评价数量：{项目: 数量}"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT project, COUNT(*) AS n FROM evaluations GROUP BY project ORDER BY project").fetchall()
+        return {row['project']: row['n'] for row in rows}
+
+    def delete(self, evaluation_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM evaluations WHERE id = ?", (int(evaluation_id),))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=EVALUATION_DB_PATH):
+    """进程内共享的评价库，每个路径只初始化一次"""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = EvaluationStore(path)
+        return _stores[path]
@@ -0,0 +1,203 @@
+"""资源管控：按资源类别执行每会话与全局预算
+
+- 绘图：开销为 云滴数 × 渲染尺寸系数（图面像素数 / REFERENCE_PIXELS），超出剩余预算时按比例降级（抽样或密度图）；
+- 后台任务：正向云生成、多维云生成与报告渲染，开销为需要计算的云滴数（多维云乘以维数），任务期间占用；
+- 磁盘：云滴外存文件的字节数，随云滴存储的生命周期占用；
+- 服务接口：HTTP服务单个请求涉及的数值个数，按客户端地址计为会话。
+
+绘图剩余预算不足 MIN_GRANT 时拒绝，其余资源不降级、超出即拒绝，从而在高峰期平稳降级而不是让服务器过载。
+"""
+import threading
+from contextlib import contextmanager
+
+# 资源类别
+PLOT = "绘图"
+WORK = "后台任务"
+DISK = "磁盘"
+SERVICE = "服务接口"
+
+# 全局与每会话同时绘制的云滴数量上限（按基准尺寸计）
+GLOBAL_POINT_BUDGET = 2_000_000
+SESSION_POINT_BUDGET = 200_000
+# 各资源的 (全局预算, 每会话预算)
+BUDGETS = {
+    PLOT: (GLOBAL_POINT_BUDGET, SESSION_POINT_BUDGET),
+    WORK: (200_000_000, 100_000_000),
+    DISK: (8 * 2**30, 1 * 2**30),
+    SERVICE: (20_000_000, 2_000_000),
+}
+# 绘图开销的基准图面像素数：st.pyplot 以 200 dpi 输出的 10×6 英寸静态图
+REFERENCE_PIXELS = 2000 * 1200
+# 低于该数量的绘图授权没有意义，直接拒绝
+MIN_GRANT = 1_000
+
+
+def scale_drop_counts(counts, max_points, min_count=50):
+    """总数超过 max_points 时按比例缩减各云的云滴数量
+
+    每个云至少保留 min_count 个（预算不够时改为平分），下限抬高的部分从其余云中扣回，缩减后总数不超过 max_points。
+    """
+    counts = list(counts)
+    if max_points is None or sum(counts) <= max_points:
+        return counts
+    floor = min(min_count, max_points // len(counts))
+    floored = set()
+    ratio = 0.0
+    while len(floored) < len(counts):
+        rest = [i for i in range(len(counts)) if i not in floored]
+        budget = max_points - sum(min(counts[i], floor) for i in floored)
+        ratio = budget / sum(counts[i] for i in rest)
+        newly = {i for i in rest if counts[i] * ratio < floor}
+        if not newly:
+            break
+        floored |= newly
+    return [min(count, floor) if i in floored else int(count * ratio) for i, count in enumerate(counts)]
+
+
+def format_amount(resource, amount):
+    """资源数量的显示文本"""
+    if resource == DISK:
+        return f"{amount / 2**20:,.0f} MB"
+    return f"{int(amount):,} 个{'数值' if resource == SERVICE else '云滴'}"
+
+
+class ServerBusy(Exception):
+    """服务器负载已满或超出会话限额，请求被拒绝"""
+
+
+class Reservation:
+    """一次获得的资源占用，release() 归还（可重复调用），也可作为上下文管理器使用"""
+
+    def __init__(self, governor, resource, session_id, amount):
+        self.governor = governor
+        self.resource = resource
+        self.session_id = session_id
+        self.amount = amount
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.governor._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class Grant(Reservation):
+    """一次绘图请求获得的授权：points 为可绘制的云滴数，amount 为按渲染尺寸折算后的开销"""
+
+    def __init__(self, governor, session_id, requested, points, amount):
+        super().__init__(governor, PLOT, session_id, amount)
+        self.requested = requested
+        self.points = points
+
+    @property
+    def downgraded(self):
+        return self.points < self.requested
+
+
+class ResourceGovernor:
+    """进程内共享的资源管控器"""
+
+    def __init__(self, budgets=None):
+        self.budgets = dict(BUDGETS, **(budgets or {}))
+        self._lock = threading.Lock()
+        self._global_in_use = {resource: 0 for resource in self.budgets}
+        self._session_in_use = {resource: {} for resource in self.budgets}
+        self._admitted = 0
+        self._downgraded = 0
+        self._rejected = 0
+
+    @staticmethod
+    def estimate_cost(drop_counts, scale=1.0):
+        """估算绘图开销：各云云滴数量之和 × 渲染尺寸系数"""
+        return int(sum(drop_counts) * scale)
+
+    def _acquire(self, resource, session_id, requested, minimum):
+        """占用 min(requested, 剩余预算)，不足 minimum 时拒绝，返回实际占用量"""
+        global_budget, session_budget = self.budgets[resource]
+        with self._lock:
+            session_used = self._session_in_use[resource].get(session_id, 0)
+            session_left = session_budget - session_used
+            global_left = global_budget - self._global_in_use[resource]
+            amount = min(requested, session_left, global_left)
+            if amount < minimum:
+                self._rejected += 1
+                if minimum > session_left:
+                    raise ServerBusy(f"{resource}超出每个会话 {format_amount(resource, session_budget)} 的限额"
+                                     f"（需要 {format_amount(resource, requested)}，"
+                                     f"已占用 {format_amount(resource, session_used)}）")
+                raise ServerBusy("服务器繁忙，请稍后重试")
+
+            self._global_in_use[resource] += amount
+            self._session_in_use[resource][session_id] = session_used + amount
+            self._admitted += 1
+            if amount < requested:
+                self._downgraded += 1
+        return amount
+
+    def _release(self, reservation):
+        with self._lock:
+            self._global_in_use[reservation.resource] -= reservation.amount
+            sessions = self._session_in_use[reservation.resource]
+            remaining = sessions.get(reservation.session_id, 0) - reservation.amount
+            if remaining > 0:
+                sessions[reservation.session_id] = remaining
+            else:
+                sessions.pop(reservation.session_id, None)
+
+    @contextmanager
+    def admit(self, session_id, requested, scale=1.0):
+        """申请绘制 requested 个云滴，scale 为渲染尺寸系数；返回可能被降级的 Grant，退出时归还预算"""
+        cost = max(1, self.estimate_cost([requested], scale))
+        amount = self._acquire(PLOT, session_id, cost, min(max(1, int(MIN_GRANT * scale)), cost))
+        points = requested if amount >= cost else int(amount / scale)
+        grant = Grant(self, session_id, requested, points, amount)
+        try:
+            yield grant
+        finally:
+            grant.release()
+
+    def reserve(self, resource, session_id, amount):
+        """占用 amount 单位的资源，不降级，超出会话限额或全局预算时抛出 ServerBusy；返回 Reservation"""
+        amount = int(amount)
+        return Reservation(self, resource, session_id, self._acquire(resource, session_id, amount, amount))
+
+    def load(self):
+        """当前负载：负载率取各资源中最高的一项"""
+        with self._lock:
+            resources = {
+                resource: {
+                    '占用': self._global_in_use[resource],
+                    '预算': self.budgets[resource][0],
+                    '负载率': self._global_in_use[resource] / self.budgets[resource][0],
+                    '活跃会话': len(self._session_in_use[resource]),
+                }
+                for resource in self.budgets
+            }
+            sessions = set().union(*self._session_in_use.values())
+            return {
+                '负载率': max(item['负载率'] for item in resources.values()),
+                '活跃会话': len(sessions),
+                '已接受': self._admitted,
+                '已降级': self._downgraded,
+                '已拒绝': self._rejected,
+                '资源': resources,
+            }
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """进程内唯一的资源管控器，所有会话共享预算"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = ResourceGovernor()
+        return _governor
@@ -0,0 +1,132 @@
+"""后台任务：在线程池中执行耗时计算，支持进度汇报、取消、去重和每会话并发限制
+
+任务函数需接受关键字参数 progress，按块调用 progress(0~1) 汇报进度；任务被取消后
+下一次调用 progress 会抛出 JobCancelled，由任务函数自行清理后向上传递。
+"""
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# 线程池大小与每个会话同时进行的任务数上限
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+MAX_JOBS_PER_SESSION = 2
+
+# 任务状态
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+class JobLimitExceeded(Exception):
+    """会话的并发任务数已达上限"""
+
+
+class Job:
+    """后台任务句柄，可保存在 session_state 中供后续重跑查询"""
+
+    def __init__(self, key, session_id, description=""):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.session_id = session_id
+        self.description = description
+        self.status = PENDING
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in (PENDING, RUNNING)
+
+    def report(self, progress):
+        """汇报进度（0~1），任务已被取消时抛出 JobCancelled"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        self.progress = min(max(float(progress), 0.0), 1.0)
+
+    def cancel(self):
+        """请求取消任务，任务在下一次汇报进度时停止"""
+        self._cancel_event.set()
+
+    def wait(self, timeout=None):
+        """等待任务结束，返回是否已结束"""
+        return self._done_event.wait(timeout)
+
+
+class JobManager:
+    """进程内共享的任务管理器"""
+
+    def __init__(self, max_workers=MAX_WORKERS, max_jobs_per_session=MAX_JOBS_PER_SESSION):
+        self.max_jobs_per_session = max_jobs_per_session
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cloud-job")
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Job
+
+    def submit(self, session_id, key, fn, *args, description="", **kwargs):
+        """提交任务；相同 key 的任务仍在进行时直接返回该任务"""
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None:
+                return job
+
+            active = sum(1 for j in self._in_flight.values() if j.session_id == session_id)
+            if active >= self.max_jobs_per_session:
+                raise JobLimitExceeded(f"每个会话最多同时进行 {self.max_jobs_per_session} 个任务")
+
+            job = Job(key, session_id, description)
+            self._in_flight[key] = job
+            self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            if job._cancel_event.is_set():
+                raise JobCancelled()
+            job.status = RUNNING
+            result = fn(*args, progress=job.report, **kwargs)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            job.error = e
+            self._finish(job, FAILED)
+        else:
+            job.result = result
+            job.progress = 1.0
+            self._finish(job, DONE)
+
+    def _finish(self, job, status):
+        with self._lock:
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+        job.status = status
+        job._done_event.set()
+
+    def active_jobs(self, session_id=None):
+        """进行中的任务，可按会话过滤"""
+        with self._lock:
+            jobs = list(self._in_flight.values())
+        if session_id is None:
+            return jobs
+        return [job for job in jobs if job.session_id == session_id]
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """进程内唯一的任务管理器，所有会话共享线程池"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
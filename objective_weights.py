@@ -0,0 +1,112 @@
+"""客观赋权：由专家打分矩阵直接计算指标权重（熵权法、CRITIC、变异系数法）
+
+各函数接受 (专家, 指标) 矩阵或批量 (..., 专家, 指标) 数组，沿专家维向量化计算，返回
+(..., 指标) 的归一化权重。所有指标都没有区分度（如全体专家打分相同）时退化为等权重。
+大矩阵按 BLOCK_BYTES 分块，临时内存与打分矩阵大小无关。
+"""
+import numpy as np
+
+from cloud_model import column_blocks
+
+WEIGHT_ENTROPY = "entropy"
+WEIGHT_CRITIC = "critic"
+WEIGHT_CV = "cv"
+
+
+def _normalize(values):
+    """沿最后一维归一化，和为0时取等权重"""
+    total = values.sum(axis=-1, keepdims=True)
+    equal = np.full_like(values, 1 / values.shape[-1])
+    return np.divide(values, total, out=equal, where=total > 0)
+
+
+def _by_columns(fn, scores):
+    """对各指标独立的统计量按列分块计算，结果沿最后一维拼接"""
+    num_cols = scores.shape[-1]
+    num_rows = scores.size // max(num_cols, 1)
+    return np.concatenate([fn(scores[..., start:stop]) for start, stop in column_blocks(num_rows, num_cols)], axis=-1)
+
+
+def _scores(expert_scores):
+    scores = np.asarray(expert_scores, dtype=float)
+    if scores.ndim < 2 or scores.shape[-2] < 2:
+        raise ValueError("客观赋权至少需要2位专家的打分矩阵")
+    return scores
+
+
+def _entropy_divergence(scores):
+    """各指标的差异系数 1 - 信息熵，打分经极差标准化"""
+    low = scores.min(axis=-2, keepdims=True)
+    spread = scores.max(axis=-2, keepdims=True) - low
+    y = np.divide(scores - low, spread, out=np.zeros_like(scores), where=spread > 0)
+    total = y.sum(axis=-2, keepdims=True)
+    p = np.divide(y, total, out=np.zeros_like(y), where=total > 0)
+    entropy = -np.sum(p * np.log(np.where(p > 0, p, 1)), axis=-2) / np.log(scores.shape[-2])
+    return np.where(total[..., 0, :] > 0, 1 - entropy, 0.0)
+
+
+def entropy_weights(expert_scores):
+    """熵权法：专家意见越分散（信息熵越小）的指标权重越大"""
+    return _normalize(_by_columns(_entropy_divergence, _scores(expert_scores)))
+
+
+def _coefficient_of_variation(scores):
+    mean = np.abs(scores.mean(axis=-2))
+    std = scores.std(axis=-2, ddof=1)
+    return np.divide(std, mean, out=np.zeros_like(std), where=mean > 0)
+
+
+def cv_weights(expert_scores):
+    """变异系数法：权重与各指标打分的变异系数（标准差/均值）成正比"""
+    return _normalize(_by_columns(_coefficient_of_variation, _scores(expert_scores)))
+
+
+def critic_weights(expert_scores):
+    """CRITIC：对比强度（极差标准化后的标准差）× 与其他指标的冲突性 Σ(1 - 相关系数)"""
+    scores = _scores(expert_scores)
+    num_experts, num_indicators = scores.shape[-2:]
+    mean = scores.mean(axis=-2, keepdims=True)
+    spread = scores.max(axis=-2) - scores.min(axis=-2)
+
+    # 协方差按专家分块累加，避免生成与打分矩阵同样大的中心化副本
+    cov = np.zeros(scores.shape[:-2] + (num_indicators, num_indicators))
+    rows = scores.size // num_experts
+    for start, stop in column_blocks(rows, num_experts):
+        centered = scores[..., start:stop, :] - mean
+        cov += np.swapaxes(centered, -1, -2) @ centered
+    cov /= num_experts - 1
+
+    std = np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+    outer = std[..., :, None] * std[..., None, :]
+    corr = np.divide(cov, outer, out=np.zeros_like(cov), where=outer > 0)
+    conflict = np.sum(1 - corr, axis=-1)
+    contrast = np.divide(std, spread, out=np.zeros_like(std), where=spread > 0)
+    return _normalize(contrast * conflict)
+
+
+OBJECTIVE_WEIGHT_METHODS = {
+    WEIGHT_ENTROPY: entropy_weights,
+    WEIGHT_CRITIC: critic_weights,
+    WEIGHT_CV: cv_weights,
+}
+
+
+def objective_weights(expert_scores, method):
+    """按方法名计算客观权重，expert_scores 可以是批量 (..., 专家, 指标) 数组"""
+    if method not in OBJECTIVE_WEIGHT_METHODS:
+        raise ValueError(f"未知的客观赋权方法：{method}")
+    return OBJECTIVE_WEIGHT_METHODS[method](expert_scores)
+
+
+def batch_objective_weights(matrices, method):
+    """对多个打分矩阵计算客观权重：形状相同的矩阵堆叠成一次批量计算，按输入顺序返回"""
+    matrices = [np.asarray(matrix, dtype=float) for matrix in matrices]
+    groups = {}
+    for i, matrix in enumerate(matrices):
+        groups.setdefault(matrix.shape, []).append(i)
+    results = [None] * len(matrices)
+    for indices in groups.values():
+        weights = objective_weights(np.stack([matrices[i] for i in indices]), method)
+        for i, w in zip(indices, weights):
+            results[i] = w
+    return results
@@ -0,0 +1,176 @@
+"""性能分析：按阶段记录每次重跑的耗时与内存，可选 cProfile，结果写入结构化日志
+
+每个会话的脚本在各自线程中运行，分析器保存在线程局部变量中；未开启时 timed 装饰器
+只多一次属性查找。内存统计使用 tracemalloc，按进程统计，并发会话会相互影响。
+"""
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 阶段耗时日志（每次重跑一行JSON）与 cProfile 输出目录
+TIMING_LOG_PATH = os.environ.get("CLOUD_TIMING_LOG", os.path.join(_BASE_DIR, "logs", "timings.jsonl"))
+PROFILE_DIR = os.environ.get("CLOUD_PROFILE_DIR", os.path.join(_BASE_DIR, "profiles"))
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+class RerunProfiler:
+    """记录一次重跑中各阶段的耗时与峰值内存"""
+
+    def __init__(self, label="", session_id=None, track_memory=False, use_cprofile=False):
+        self.label = label
+        self.session_id = session_id
+        self.track_memory = track_memory
+        self.use_cprofile = use_cprofile
+        self.records = []
+        self.total_seconds = None
+        self.profile_path = None
+        self._profile = None
+        self._started = None
+        self._depth = 0
+        self._memory_stack = []  # [起始占用, 子阶段峰值]
+        self._started_tracemalloc = False
+
+    def start(self):
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if self.use_cprofile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._started = time.perf_counter()
+
+    def finish(self):
+        self.total_seconds = time.perf_counter() - self._started
+        if self._profile is not None:
+            self._profile.disable()
+            self.profile_path = self._dump_profile()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name):
+        """计时一个阶段，可嵌套"""
+        depth = self._depth
+        self._depth += 1
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._memory_stack:
+                self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak - self._memory_stack[-1][0])
+            tracemalloc.reset_peak()
+            self._memory_stack.append([current, 0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak_bytes = None
+            if self.track_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                base, child_peak = self._memory_stack.pop()
+                peak_bytes = max(child_peak, peak - base)
+                if self._memory_stack:
+                    parent = self._memory_stack[-1]
+                    parent[1] = max(parent[1], base + peak_bytes - parent[0])
+                tracemalloc.reset_peak()
+            self._depth -= 1
+            self.records.append({'阶段': name, '层级': depth, '耗时': seconds, '峰值内存': peak_bytes})
+
+    def summary(self):
+        """按阶段汇总：调用次数、总耗时、最大峰值内存"""
+        outermost = {}
+        for record in self.records:
+            outermost[record['阶段']] = min(outermost.get(record['阶段'], record['层级']), record['层级'])
+
+        stages = {}
+        for record in self.records:
+            item = stages.setdefault(record['阶段'], {'阶段': record['阶段'], '调用次数': 0, '耗时': 0.0, '峰值内存': None})
+            item['调用次数'] += 1
+            # 嵌套的同名阶段只计最外层耗时
+            if record['层级'] == outermost[record['阶段']]:
+                item['耗时'] += record['耗时']
+            if record['峰值内存'] is not None:
+                item['峰值内存'] = max(item['峰值内存'] or 0, record['峰值内存'])
+        return sorted(stages.values(), key=lambda item: item['耗时'], reverse=True)
+
+    def _dump_profile(self):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        path = os.path.join(PROFILE_DIR, f"rerun_{self.session_id or 'unknown'}_{timestamp}.prof")
+        self._profile.dump_stats(path)
+        return path
+
+    def profile_report(self, limit=20):
+        """cProfile 按累计耗时排序的前 limit 项"""
+        if self._profile is None:
+            return ""
+        stream = io.StringIO()
+        pstats.Stats(self._profile, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def write_log(self, path=TIMING_LOG_PATH):
+        """以JSON行追加写入本次重跑的阶段耗时"""
+        entry = {
+            'timestamp': datetime.now().isoformat(timespec="milliseconds"),
+            'session_id': self.session_id,
+            'label': self.label,
+            'total_s': self.total_seconds,
+            'stages': [
+                {'stage': item['阶段'], 'calls': item['调用次数'], 'seconds': item['耗时'], 'peak_bytes': item['峰值内存']}
+                for item in self.summary()
+            ],
+            'profile': self.profile_path,
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+@contextmanager
+def profile_rerun(label="", session_id=None, track_memory=False, use_cprofile=False, log_path=TIMING_LOG_PATH):
+    """在当前线程开启分析器，结束时写入日志"""
+    profiler = RerunProfiler(label, session_id, track_memory, use_cprofile)
+    _local.profiler = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        _local.profiler = None
+        profiler.finish()
+        if log_path:
+            profiler.write_log(log_path)
+
+
+@contextmanager
+def stage(name):
+    """在当前线程的分析器中计时一个阶段，未开启分析时不做任何事"""
+    profiler = getattr(_local, "profiler", None)
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+def timed(name):
+    """装饰器：将函数调用记录为一个阶段"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = getattr(_local, "profiler", None)
+            if profiler is None:
+                return fn(*args, **kwargs)
+            with profiler.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
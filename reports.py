@@ -0,0 +1,249 @@
+"""评价报告：把一次或多次评价导出为 DOCX 文档或图片ZIP
+
+每次评价包含指标评价云表、综合评价云参数与等级、综合评价云与标准云对比图。对比图总是在
+spawn 进程池中用 Agg 后端并行渲染（pyplot 不是线程安全的，不在调用方的线程中绘图），数百个项目的
+报告可在几分钟内完成。报告直接写入文件，不在内存中保存整个文件。也可以在命令行中直接从评价库生成报告：
+
+    python reports.py --project 默认项目 --format docx --output 报告.docx
+"""
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import tempfile
+import weakref
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+REPORT_DOCX = "docx"
+REPORT_ZIP = "zip"
+
+# 对比图的分辨率与综合评价云云滴数量
+REPORT_DPI = 80
+REPORT_NUM_DROPS = 1000
+# 渲染进程数上限
+REPORT_MAX_WORKERS = 8
+
+# 绘图进程中的标准云配置，进程启动时设置一次
+_standard_data = None
+
+
+def _init_worker(standard_data):
+    global _standard_data
+    import matplotlib
+    matplotlib.use("Agg")
+    _standard_data = standard_data
+
+
+def _render_chart(evaluation, dpi=REPORT_DPI):
+    """在绘图进程中渲染一次评价的综合评价云与标准云对比图，返回PNG字节"""
+    from cloud_plots import plot_comprehensive_with_standards, pyplot
+
+    fig = plot_comprehensive_with_standards(
+        evaluation, _standard_data, REPORT_NUM_DROPS,
+        title=f"{evaluation['项目']} #{evaluation['编号']} 综合评价云与标准云对比图",
+    )
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    pyplot().close(fig)
+    return buffer.getvalue()
+
+
+def render_charts(evaluations, standard_data, workers=None, progress=None):
+    """在进程池中渲染各次评价的对比图，按输入顺序返回PNG字节列表；progress(0~1) 汇报进度
+
+    progress 抛出异常（如任务被取消）时取消尚未开始的渲染，不等待进程池退出即向上传递。
+    """
+    images = [None] * len(evaluations)
+    workers = min(workers or os.cpu_count() or 1, REPORT_MAX_WORKERS, max(len(evaluations), 1))
+    # spawn 启动的子进程不继承 Streamlit 服务器的线程与锁
+    context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(standard_data,))
+    futures = {}
+    try:
+        futures = {executor.submit(_render_chart, _chart_fields(evaluation)): i
+                   for i, evaluation in enumerate(evaluations)}
+        for done, future in enumerate(as_completed(futures), 1):
+            images[futures[future]] = future.result()
+            if progress:
+                progress(done / len(evaluations))
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    return images
+
+
+def _chart_fields(evaluation):
+    """对比图需要的字段，避免把指标评价云明细传给绘图进程"""
+    return {key: evaluation[key] for key in ('编号', '项目', 'Ex', 'En', 'He')}
+
+
+def _title(evaluation):
+    return f"{evaluation['项目']}  #{evaluation['编号']}"
+
+
+def build_docx(evaluations, images, output, title="云模型综合评价报告"):
+    """生成 DOCX 报告写入 output（路径或二进制文件）：汇总表，然后每次评价一节（参数、等级、指标评价云表、对比图）"""
+    from docx import Document
+    from docx.shared import Inches
+
+    document = Document()
+    document.add_heading(title, level=0)
+    document.add_paragraph(f"生成时间：{datetime.now():%Y-%m-%d %H:%M}，共 {len(evaluations)} 次评价")
+
+    summary_columns = ['编号', '项目', '时间', 'Ex', 'En', 'He', '等级']
+    _add_table(document, summary_columns, [[_cell(evaluation[column]) for column in summary_columns]
+                                          for evaluation in evaluations])
+
+    for evaluation, image in zip(evaluations, images):
+        document.add_page_break()
+        document.add_heading(_title(evaluation), level=1)
+        document.add_paragraph(
+            f"评价时间：{evaluation['时间']}    专家数：{evaluation['专家数']}    指标数：{evaluation['指标数']}"
+        )
+        document.add_paragraph(
+            f"综合评价云：Ex = {evaluation['Ex']:.4f}，En = {evaluation['En']:.4f}，He = {evaluation['He']:.4f}"
+            f"    评价等级：{evaluation['等级']}"
+        )
+        document.add_heading("指标评价云", level=2)
+        cloud_columns = ['指标', 'Ex', 'En', 'He', '权重']
+        _add_table(document, cloud_columns, [[_cell(cloud[column]) for column in cloud_columns]
+                                            for cloud in evaluation['指标云']])
+        document.add_heading("综合评价云与标准云对比图", level=2)
+        document.add_picture(io.BytesIO(image), width=Inches(6.3))
+
+    document.save(output)
+
+
+def _cell(value):
+    return f"{value:.4f}" if isinstance(value, float) else str(value)
+
+
+def _add_table(document, columns, rows):
+    table = document.add_table(rows=len(rows) + 1, cols=len(columns))
+    table.style = "Table Grid"
+    for cell, column in zip(table.rows[0].cells, columns):
+        cell.text = column
+    for table_row, row in zip(table.rows[1:], rows):
+        for cell, value in zip(table_row.cells, row):
+            cell.text = value
+    return table
+
+
+def build_zip(evaluations, images, output):
+    """生成ZIP写入 output（路径或二进制文件）：汇总.csv，以及每次评价一个目录（指标评价云.csv、标准对比图.png）"""
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        summary_columns = ['编号', '项目', '时间', 'Ex', 'En', 'He', '等级', '专家数', '指标数']
+        archive.writestr("汇总.csv", _csv(summary_columns, evaluations))
+        for evaluation, image in zip(evaluations, images):
+            folder = f"{evaluation['编号']}_{_safe_name(evaluation['项目'])}"
+            archive.writestr(f"{folder}/指标评价云.csv", _csv(['指标', 'Ex', 'En', 'He', '权重'], evaluation['指标云']))
+            # PNG 已经压缩，不再重复压缩
+            archive.writestr(f"{folder}/标准对比图.png", image, compress_type=zipfile.ZIP_STORED)
+
+
+def _csv(columns, rows):
+    text = io.StringIO()
+    writer = csv.DictWriter(text, columns, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(rows)
+    return "\ufeff" + text.getvalue()  # 带BOM，Excel 可以直接打开中文CSV
+
+
+def _safe_name(name):
+    return "".join("_" if c in '\\/:*?"<>|' else c for c in str(name)).strip() or "未命名"
+
+
+def build_report(evaluations, standard_data, output, fmt=REPORT_DOCX, workers=None, progress=None):
+    """渲染对比图并生成报告，写入 output（路径或二进制文件）；evaluations 为评价库的完整记录（含指标云）"""
+    if not evaluations:
+        raise ValueError("没有可生成报告的评价")
+    if fmt not in (REPORT_DOCX, REPORT_ZIP):
+        raise ValueError(f"未知的报告格式：{fmt}")
+
+    # 渲染占进度的 90%，其余为组装文件
+    images = render_charts(evaluations, standard_data, workers, progress=progress and (lambda p: progress(0.9 * p)))
+    if fmt == REPORT_DOCX:
+        build_docx(evaluations, images, output)
+    else:
+        build_zip(evaluations, images, output)
+    if progress:
+        progress(1.0)
+
+
+def _remove_file(path, reservations):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    for reservation in reservations:
+        reservation.release()
+
+
+class ReportFile:
+    """临时目录中的报告文件，会话中只保存该句柄；句柄被回收或调用 delete() 时删除文件"""
+
+    def __init__(self, path, file_name, fmt):
+        self.path = path
+        self.file_name = file_name
+        self.fmt = fmt
+        self._reservations = []
+        self._finalizer = weakref.finalize(self, _remove_file, path, self._reservations)
+
+    @classmethod
+    def build(cls, evaluations, standard_data, file_name, fmt=REPORT_DOCX, root=None, workers=None, progress=None):
+        """生成报告到临时文件，失败或被取消时删除文件"""
+        fd, path = tempfile.mkstemp(prefix="cloud-report-", suffix=f".{fmt}", dir=root)
+        os.close(fd)
+        report_file = cls(path, file_name, fmt)
+        try:
+            build_report(evaluations, standard_data, path, fmt, workers, progress)
+        except BaseException:
+            report_file.delete()
+            raise
+        return report_file
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def open(self):
+        return open(self.path, "rb")
+
+    def hold(self, reservation):
+        """资源占用（如磁盘预算）随报告文件一起释放"""
+        self._reservations.append(reservation)
+
+    def delete(self):
+        """删除报告文件并归还持有的资源占用"""
+        self._finalizer()
+
+
+def main():
+    from cloud_plots import default_standard_data
+    from evaluation_store import EVALUATION_DB_PATH, EvaluationStore
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=EVALUATION_DB_PATH, help="评价库路径")
+    parser.add_argument("--project", help="只导出该项目，缺省为全部项目")
+    parser.add_argument("--limit", type=int, default=5000, help="最多导出的评价数")
+    parser.add_argument("--format", choices=[REPORT_DOCX, REPORT_ZIP], default=REPORT_DOCX)
+    parser.add_argument("--workers", type=int, help="渲染进程数，缺省为CPU核数")
+    parser.add_argument("--output", help="输出文件，缺省为 评价报告_<时间>.<格式>")
+    args = parser.parse_args()
+
+    store = EvaluationStore(args.db)
+    summaries = store.list(args.project, limit=args.limit)
+    evaluations = store.get([summary['编号'] for summary in summaries])
+    output = args.output or f"评价报告_{datetime.now():%Y%m%d_%H%M%S}.{args.format}"
+    build_report(evaluations, default_standard_data(), output, args.format, args.workers)
+    print(f"{len(evaluations)} 次评价 -> {output}（{os.path.getsize(output) / 2**20:.1f} MiB）")
+
+
+if __name__ == "__main__":
+    main()
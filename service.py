@@ -0,0 +1,407 @@
+"""云模型评价HTTP服务：正向云、逆向云、综合云合成与等级评定的JSON/Arrow接口
+
+并发请求在事件循环中按 BATCH_DELAY 聚合为微批，形状相同的请求堆叠成一次向量化计算，
+在线程池中执行，不阻塞事件循环。默认只监听本机地址：
+
+    python service.py --port 8600
+    curl -X POST localhost:8600/reverse -d '{"scores": [[85, 78], [82, 85], [88, 82]]}'
+
+接口（请求体均为JSON）：
+    POST /forward        {"ex", "en", "he", "num_drops": 1000, "method": "random", "seed": null}
+    POST /reverse        {"scores": [[专家1...], ...], "weights": [...]}，权重缺省为等权重，
+                         也可以是客观赋权方法 "entropy"、"critic" 或 "cv"
+    POST /comprehensive  {"clouds": [{"Ex", "En", "He", "权重"}, ...]}
+    POST /grade          {"scores": [评分值, ...]}
+    GET  /health         微批统计与资源负载
+
+结果默认为JSON，请求头 Accept: application/vnd.apache.arrow.stream 或参数 ?format=arrow
+时返回Arrow IPC流；参数无效时返回400和 {"error": 说明}。各请求按涉及的数值个数计入资源管控的服务接口预算
+（按客户端地址区分会话），超出时返回503。
+"""
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tornado.web
+
+from cloud_model import (
+    SAMPLING_QMC,
+    SAMPLING_RANDOM,
+    comprehensive_cloud_params,
+    generate_cloud_drops,
+    grade_levels,
+    reverse_cloud_params,
+)
+from governor import SERVICE, ServerBusy, get_governor
+from objective_weights import OBJECTIVE_WEIGHT_METHODS, objective_weights
+
+# 聚合等待时间（秒）与单批最大请求数
+BATCH_DELAY = 0.002
+MAX_BATCH_SIZE = 512
+# 计算线程数
+SERVICE_WORKERS = min(4, os.cpu_count() or 1)
+# 单次正向云请求的云滴数量上限，更大规模请使用应用中的外存生成
+MAX_FORWARD_DROPS = 1_000_000
+
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+
+
+class MicroBatcher:
+    """把短时间内到达的请求聚合为微批，同一分组键的请求一次处理
+
+    process(items) 接收同组请求的列表，返回等长的结果列表，在线程池中执行。
+    整批处理出错时逐个重试，出错的请求各自得到异常，同批其它请求不受影响。
+    """
+
+    def __init__(self, process, executor, max_batch=MAX_BATCH_SIZE, delay=BATCH_DELAY):
+        self.process = process
+        self.executor = executor
+        self.max_batch = max_batch
+        self.delay = delay
+        self.requests = 0
+        self.batches = 0
+        self._pending = {}  # 分组键 -> [(请求, future)]
+        self._timer = None
+
+    def submit(self, key, item):
+        """加入微批，返回结果的 future"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, future))
+        self.requests += 1
+        if len(pending) >= self.max_batch:
+            self._run(key)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.delay, self._flush)
+        return future
+
+    def stats(self):
+        return {
+            '请求数': self.requests,
+            '批次数': self.batches,
+            '平均批大小': self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def _flush(self):
+        self._timer = None
+        for key in list(self._pending):
+            self._run(key)
+
+    def _run(self, key):
+        batch = self._pending.pop(key)
+        self.batches += 1
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+        task = asyncio.get_running_loop().run_in_executor(self.executor, self._process, items)
+        task.add_done_callback(lambda done: self._resolve(done, futures))
+
+    def _process(self, items):
+        """处理一批请求，返回 [(结果, 异常)]；整批出错时逐个重试"""
+        try:
+            return [(result, None) for result in self.process(items)]
+        except Exception as e:
+            if len(items) == 1:
+                return [(None, e)]
+        outcomes = []
+        for item in items:
+            try:
+                outcomes.append((self.process([item])[0], None))
+            except Exception as e:
+                outcomes.append((None, e))
+        return outcomes
+
+    @staticmethod
+    def _resolve(task, futures):
+        error = task.exception()
+        outcomes = [(None, error)] * len(futures) if error else task.result()
+        for future, (result, item_error) in zip(futures, outcomes):
+            if future.cancelled():
+                continue
+            if item_error:
+                future.set_exception(item_error)
+            else:
+                future.set_result(result)
+
+
+def process_reverse(items):
+    """批量逆向云：items 为形状相同的 (打分矩阵, 权重)，权重同为客观赋权方法名时对整批一次赋权"""
+    scores = np.stack([scores for scores, _ in items])
+    method = items[0][1]
+    if isinstance(method, str):
+        weights = objective_weights(scores, method)
+    else:
+        weights = np.stack([weights for _, weights in items])
+    exs, ens, hes = reverse_cloud_params(scores, axis=1)
+    comp_ex, comp_en, comp_he = comprehensive_cloud_params(exs, ens, hes, weights)
+    levels = grade_levels(comp_ex)
+    return [
+        (exs[i], ens[i], hes[i], weights[i], (comp_ex[i], comp_en[i], comp_he[i]), levels[i])
+        for i in range(len(items))
+    ]
+
+
+def process_comprehensive(items):
+    """批量综合云合成：items 为指标数相同的 (Ex, En, He, 权重) 矩阵"""
+    params = np.stack(items)
+    comp_ex, comp_en, comp_he = comprehensive_cloud_params(params[:, 0], params[:, 1], params[:, 2], params[:, 3])
+    levels = grade_levels(comp_ex)
+    return [(comp_ex[i], comp_en[i], comp_he[i], levels[i]) for i in range(len(items))]
+
+
+def process_grade(items):
+    """批量等级评定：各请求的评分值拼接后一次评定再拆分"""
+    levels = grade_levels(np.concatenate(items))
+    return np.split(levels, np.cumsum([len(item) for item in items])[:-1])
+
+
+def _number(payload, name, default=None):
+    value = payload.get(name, default)
+    if value is None:
+        raise ValueError(f"缺少参数 {name}")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} 必须是数值")
+    if not np.isfinite(value):
+        raise ValueError(f"{name} 必须是有限数值")
+    return value
+
+
+def _array(payload, name, ndim):
+    if name not in payload:
+        raise ValueError(f"缺少参数 {name}")
+    try:
+        array = np.asarray(payload[name], dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} 必须是{'数值矩阵' if ndim == 2 else '数值列表'}")
+    if ndim == 1 and array.ndim == 0:
+        array = array.reshape(1)
+    if array.ndim != ndim or array.size == 0:
+        raise ValueError(f"{name} 必须是非空的{'数值矩阵（每行一个专家）' if ndim == 2 else '数值列表'}")
+    if not np.isfinite(array).all():
+        raise ValueError(f"{name} 包含无效数值")
+    return array
+
+
+def _weights(payload, num_indicators):
+    if payload.get("weights") is None:
+        return np.full(num_indicators, 1 / num_indicators)
+    if isinstance(payload["weights"], str):
+        if payload["weights"] not in OBJECTIVE_WEIGHT_METHODS:
+            raise ValueError(f"weights 为字符串时须是客观赋权方法之一：{', '.join(OBJECTIVE_WEIGHT_METHODS)}")
+        return payload["weights"]
+    weights = _array(payload, "weights", 1)
+    if len(weights) != num_indicators:
+        raise ValueError(f"权重数量（{len(weights)}）与指标数量（{num_indicators}）不一致")
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("权重必须非负且之和大于0")
+    return weights
+
+
+class CloudService:
+    """服务状态：计算线程池、各接口的微批器与资源管控器"""
+
+    def __init__(self, max_batch=MAX_BATCH_SIZE, delay=BATCH_DELAY, workers=SERVICE_WORKERS, governor=None):
+        self.governor = governor or get_governor()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cloud-service")
+        self.batchers = {
+            'reverse': MicroBatcher(process_reverse, self.executor, max_batch, delay),
+            'comprehensive': MicroBatcher(process_comprehensive, self.executor, max_batch, delay),
+            'grade': MicroBatcher(process_grade, self.executor, max_batch, delay),
+        }
+
+    def stats(self):
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def json_body(self):
+        try:
+            payload = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise tornado.web.HTTPError(400, "%s", "请求体不是有效的JSON")
+        if not isinstance(payload, dict):
+            raise tornado.web.HTTPError(400, "%s", "请求体必须是JSON对象")
+        return payload
+
+    def wants_arrow(self):
+        return self.get_argument("format", None) == "arrow" or ARROW_MIME in self.request.headers.get("Accept", "")
+
+    def respond(self, payload, columns):
+        """按请求的格式返回结果，columns 为Arrow格式时的表格列"""
+        if not self.wants_arrow():
+            self.set_header("Content-Type", "application/json; charset=UTF-8")
+            self.finish(json.dumps(payload, ensure_ascii=False))
+            return
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise tornado.web.HTTPError(406, "%s", "服务器未安装 pyarrow，无法返回Arrow格式")
+        table = pa.table(columns)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        self.set_header("Content-Type", ARROW_MIME)
+        self.finish(sink.getvalue().to_pybytes())
+
+    def write_error(self, status_code, **kwargs):
+        error = kwargs.get("exc_info", (None, None, None))[1]
+        if isinstance(error, tornado.web.HTTPError) and error.log_message:
+            message = error.log_message % error.args
+        else:
+            message = self._reason
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.finish(json.dumps({'error': message}, ensure_ascii=False))
+
+    def reserve(self, amount):
+        """按客户端地址在服务接口预算内占用 amount 个数值，超出时返回503"""
+        try:
+            return self.service.governor.reserve(SERVICE, self.request.remote_ip, amount)
+        except ServerBusy as e:
+            raise tornado.web.HTTPError(503, "%s", str(e))
+
+    def parse(self, parser, payload):
+        """调用参数解析函数，ValueError 转为400"""
+        try:
+            return parser(payload)
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, "%s", str(e))
+
+
+def _parse_forward(payload):
+    method = payload.get("method", SAMPLING_RANDOM)
+    if method not in (SAMPLING_RANDOM, SAMPLING_QMC):
+        raise ValueError(f"method 必须是 {SAMPLING_RANDOM} 或 {SAMPLING_QMC}")
+    num_drops = int(_number(payload, "num_drops", 1000))
+    if not 1 <= num_drops <= MAX_FORWARD_DROPS:
+        raise ValueError(f"num_drops 必须在 1 到 {MAX_FORWARD_DROPS} 之间")
+    seed = payload.get("seed")
+    # bool 是 int 的子类，true/false 不能当作种子
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        raise ValueError("seed 必须是非负整数")
+    ex, en, he = _number(payload, "ex"), _number(payload, "en"), _number(payload, "he")
+    if en <= 0 or he < 0:
+        raise ValueError("en 必须大于0，he 不能为负")
+    return ex, en, he, num_drops, method, seed
+
+
+def _parse_reverse(payload):
+    scores = _array(payload, "scores", 2)
+    if scores.shape[0] < 2:
+        raise ValueError("至少需要2位专家的打分")
+    return scores, _weights(payload, scores.shape[1])
+
+
+def _parse_comprehensive(payload):
+    clouds = payload.get("clouds")
+    if not isinstance(clouds, list) or not clouds:
+        raise ValueError("clouds 必须是非空的指标云列表")
+    try:
+        params = np.array([[cloud['Ex'], cloud['En'], cloud['He'], cloud.get('权重', 1.0)] for cloud in clouds],
+                          dtype=float).T
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError("每个指标云须包含数值 Ex、En、He，可选 权重")
+    if not np.isfinite(params).all():
+        raise ValueError("clouds 包含无效数值")
+    if (params[3] < 0).any() or params[3].sum() <= 0:
+        raise ValueError("权重必须非负且之和大于0")
+    return params
+
+
+class ForwardHandler(BaseHandler):
+    async def post(self):
+        ex, en, he, num_drops, method, seed = self.parse(_parse_forward, self.json_body())
+        # 单个请求已是向量化计算且规模较大，不参与微批；云滴值与隶属度各 num_drops 个数值
+        with self.reserve(2 * num_drops):
+            drops, memberships = await asyncio.get_running_loop().run_in_executor(
+                self.service.executor, lambda: generate_cloud_drops(ex, en, he, num_drops, method=method, seed=seed))
+        self.respond(
+            {'Ex': ex, 'En': en, 'He': he, '云滴值': drops.tolist(), '隶属度': memberships.tolist()},
+            {'云滴值': drops, '隶属度': memberships},
+        )
+
+
+class ReverseHandler(BaseHandler):
+    async def post(self):
+        scores, weights = self.parse(_parse_reverse, self.json_body())
+        # 客观赋权方法名计入批次键，同一批次的权重要么都是数组、要么是同一种方法
+        key = (scores.shape, weights if isinstance(weights, str) else None)
+        with self.reserve(scores.size):
+            exs, ens, hes, weights, comp, level = await self.service.batchers['reverse'].submit(key, (scores, weights))
+        names = [f'指标{i+1}' for i in range(len(exs))]
+        self.respond(
+            {
+                '指标云': [
+                    {'指标': name, 'Ex': float(ex), 'En': float(en), 'He': float(he), '权重': float(w)}
+                    for name, ex, en, he, w in zip(names, exs, ens, hes, weights)
+                ],
+                '综合云': {'Ex': float(comp[0]), 'En': float(comp[1]), 'He': float(comp[2]), '等级': str(level)},
+            },
+            {'指标': names, 'Ex': exs, 'En': ens, 'He': hes, '权重': weights},
+        )
+
+
+class ComprehensiveHandler(BaseHandler):
+    async def post(self):
+        params = self.parse(_parse_comprehensive, self.json_body())
+        with self.reserve(params.size):
+            ex, en, he, level = await self.service.batchers['comprehensive'].submit(params.shape, params)
+        result = {'Ex': float(ex), 'En': float(en), 'He': float(he), '等级': str(level)}
+        self.respond(result, {name: [value] for name, value in result.items()})
+
+
+class GradeHandler(BaseHandler):
+    async def post(self):
+        scores = self.parse(lambda payload: _array(payload, "scores", 1), self.json_body())
+        with self.reserve(scores.size):
+            levels = await self.service.batchers['grade'].submit(None, scores)
+        self.respond({'等级': levels.tolist()}, {'评分值': scores, '等级': levels.tolist()})
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.respond({'status': "ok", '微批': self.service.stats(), '负载': self.service.governor.load()},
+                     {'status': ["ok"]})
+
+
+def make_app(service=None):
+    """创建 tornado 应用，便于在测试或基准中直接监听本机端口"""
+    service = service or CloudService()
+    args = dict(service=service)
+    return tornado.web.Application([
+        (r"/forward", ForwardHandler, args),
+        (r"/reverse", ReverseHandler, args),
+        (r"/comprehensive", ComprehensiveHandler, args),
+        (r"/grade", GradeHandler, args),
+        (r"/health", HealthHandler, args),
+    ])
+
+
+async def serve(host, port, service):
+    make_app(service).listen(port, address=host)
+    print(f"云模型评价服务已启动：http://{host}:{port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址，默认只监听本机")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--batch-delay-ms", type=float, default=BATCH_DELAY * 1000, help="微批聚合等待时间（毫秒）")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE, help="单批最大请求数，1 表示不聚合")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="计算线程数")
+    args = parser.parse_args()
+
+    service = CloudService(args.max_batch, args.batch_delay_ms / 1000, args.workers)
+    asyncio.run(serve(args.host, args.port, service))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""冷启动计时：记录进程启动后应用模块导入与首次渲染的耗时
+
+pandas、matplotlib 的导入约占冷启动的一大半，而首屏（逆向云发生器的输入区）并不需要它们，
+因此各模块通过 pandas() 与 cloud_plots.pyplot() 在第一次用到时才导入。
+耗时以进程启动为起点（读取 /proc），无法读取时退回到本模块首次导入的时间。
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from profiling import TIMING_LOG_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def _process_age():
+    """进程已运行的秒数（Linux），无法读取时返回 None"""
+    try:
+        with open("/proc/self/stat") as f:
+            # 进程名可能含空格，从最后一个 ')' 之后按字段切分；starttime 是第22个字段
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+# 本进程启动的时间（perf_counter 时钟）
+PROCESS_START = time.perf_counter() - (_process_age() or 0.0)
+
+_marks = {}
+_marks_lock = threading.Lock()
+
+
+def mark(name):
+    """记录从进程启动到当前的耗时，同名标记只记录第一次；返回该标记的秒数"""
+    with _marks_lock:
+        if name not in _marks:
+            _marks[name] = time.perf_counter() - PROCESS_START
+        return _marks[name]
+
+
+def pandas():
+    """导入 pandas，只在用到表格的函数中调用"""
+    import pandas as pd
+
+    return pd
+
+
+def marks():
+    """已记录的启动标记：{名称: 秒数}"""
+    with _marks_lock:
+        return dict(_marks)
+
+
+def record_first_paint(path=TIMING_LOG_PATH):
+    """记录本进程首次渲染完成；只有第一次调用会写日志，返回全部启动标记"""
+    with _marks_lock:
+        first = '首次渲染' not in _marks
+        if first:
+            _marks['首次渲染'] = time.perf_counter() - PROCESS_START
+        result = dict(_marks)
+    if first:
+        heavy = [name for name in ('pandas', 'matplotlib.pyplot') if name in sys.modules]
+        logger.info("冷启动：%s，已加载 %s", ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in result.items()), heavy)
+        if path:
+            entry = {
+                'timestamp': datetime.now().isoformat(timespec="milliseconds"),
+                'label': "冷启动",
+                'marks_s': result,
+                'heavy_modules_loaded': heavy,
+            }
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return result
@@ -0,0 +1,92 @@
+"""专家共识过滤测试
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import consensus  # noqa: E402
+from cloud_model import calculate_indicator_clouds, column_blocks  # noqa: E402
+from consensus import (  # noqa: E402
+    CONSENSUS_DOWNWEIGHT,
+    CONSENSUS_DROP,
+    MIN_CONSENSUS_EXPERTS,
+    MIN_KEPT_EXPERTS,
+    consensus_weights,
+    expert_consensus,
+    expert_deviation,
+)
+
+# 偏离度阈值取界面最小值1.5时，剔除模式只会保留1位专家
+SCATTERED_SCORES = [[62, 86, 99], [24, 56, 14], [10, 67, 4], [71, 82, 16], [68, 39, 89]]
+
+
+def naive_deviation(scores):
+    """逐位专家、逐个指标计算稳健z分数的均方根"""
+    scores = np.asarray(scores, dtype=float)
+    num_experts, num_indicators = scores.shape
+    result = []
+    for expert in range(num_experts):
+        total = 0.0
+        for indicator in range(num_indicators):
+            column = scores[:, indicator]
+            deviation = np.abs(column - np.median(column))
+            scale = 1.4826 * np.median(deviation)
+            if scale == 0:
+                scale = np.sqrt(np.pi / 2) * deviation.mean()
+            if scale > 0:
+                total += (deviation[expert] / scale) ** 2
+        result.append(np.sqrt(total / num_indicators))
+    return np.array(result)
+
+
+class ConsensusTest(unittest.TestCase):
+    def test_deviation_matches_naive_loop(self):
+        rng = np.random.default_rng(1)
+        scores = rng.normal(80, 5, size=(9, 7)).round()
+        scores[:, 2] = 85  # 全体相同的指标
+        scores[:6, 3] = 70  # 多数相同、MAD 为0的指标
+        expected = naive_deviation(scores)
+        np.testing.assert_allclose(expert_deviation(scores), expected)
+        with mock.patch.object(consensus, "column_blocks", lambda rows, cols: column_blocks(rows, cols, block_bytes=1)):
+            np.testing.assert_allclose(expert_deviation(scores), expected)
+
+    def test_drop_keeps_at_least_two_experts(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            scores = rng.integers(0, 101, size=(int(rng.integers(MIN_CONSENSUS_EXPERTS, 12)), 3))
+            for threshold in (1.5, 2.0, 3.0):
+                weights = expert_consensus(scores, threshold, CONSENSUS_DROP)['专家权重']
+                self.assertGreaterEqual(np.count_nonzero(weights), MIN_KEPT_EXPERTS)
+
+    def test_degenerate_drop_falls_back_to_equal_weights(self):
+        result = expert_consensus(SCATTERED_SCORES, 1.5, CONSENSUS_DROP)
+        self.assertTrue(result['已回退'])
+        np.testing.assert_array_equal(result['专家权重'], np.ones(5))
+
+        clouds = calculate_indicator_clouds(np.array(SCATTERED_SCORES, dtype=float), np.ones(3), result['专家权重'])
+        for cloud in clouds:
+            self.assertTrue(all(np.isfinite(cloud[name]) for name in ('Ex', 'En', 'He')))
+
+    def test_outlier_is_dropped(self):
+        scores = [[80, 82, 85], [81, 83, 84], [79, 80, 86], [82, 81, 85], [80, 84, 83], [10, 5, 99]]
+        result = expert_consensus(scores, 3.0, CONSENSUS_DROP)
+        self.assertFalse(result['已回退'])
+        np.testing.assert_array_equal(result['专家权重'], [1, 1, 1, 1, 1, 0])
+        self.assertEqual([item['专家'] for item in result['受影响专家']], ['专家6'])
+
+    def test_downweight(self):
+        weights = consensus_weights([0.5, 3.0, 6.0], threshold=3.0, mode=CONSENSUS_DOWNWEIGHT)
+        np.testing.assert_allclose(weights, [1.0, 1.0, 0.25])
+
+    def test_too_few_experts_are_not_filtered(self):
+        result = expert_consensus([[80, 82], [81, 83], [10, 5]], 1.5, CONSENSUS_DROP)
+        np.testing.assert_array_equal(result['专家权重'], np.ones(3))
+        self.assertEqual(result['受影响专家'], [])
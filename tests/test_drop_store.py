@@ -0,0 +1,91 @@
+"""云滴外存与多维云分块统计测试
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cloud_model import SAMPLING_QMC, SAMPLING_RANDOM, generate_cloud_drops, reverse_cloud_params  # noqa: E402
+from cloud_nd import generate_nd_cloud_drops, reverse_nd_cloud_params, summarize_nd_cloud  # noqa: E402
+from drop_store import SUMMARY_QUANTILES, DropStore  # noqa: E402
+from governor import DISK, ResourceGovernor  # noqa: E402
+
+EX, EN, HE = 80.0, 3.0, 0.5
+
+
+class DropStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def generate(self, num_drops=25_000, chunk_size=4_000, **kwargs):
+        store = DropStore.generate(EX, EN, HE, num_drops, seed=7, chunk_size=chunk_size,
+                                   root=self.directory.name, **kwargs)
+        self.addCleanup(store.delete)
+        return store
+
+    def all_drops(self, store):
+        return np.concatenate([drops for drops, _ in store.iter_chunks()])
+
+    def test_summary_matches_reverse_cloud_params(self):
+        store = self.generate()
+        drops = self.all_drops(store)
+        summary = store.stats()
+        n = len(drops)
+        ex, en, he = reverse_cloud_params(drops)
+        self.assertAlmostEqual(summary['平均值'], ex, places=9)
+        # 分块累计的总体方差换算为无偏方差后，与逆向云的 En、He 满足 |s² - En²| = He²
+        variance = summary['标准差']**2 * n / (n - 1)
+        self.assertAlmostEqual(variance, np.var(drops, ddof=1), places=8)
+        self.assertAlmostEqual(abs(variance - en**2), he**2, places=8)
+        self.assertEqual((summary['最小值'], summary['最大值']), (drops.min(), drops.max()))
+
+        counts, edges = store.histogram()
+        np.testing.assert_array_equal(counts, np.histogram(drops, bins=edges)[0])
+        # 分位数由细分直方图插值，误差不超过一个细分组宽
+        width = (drops.max() - drops.min()) / 4096
+        for q, value in summary['分位数'].items():
+            self.assertLessEqual(abs(value - np.quantile(drops, q)), 2 * width, q)
+        self.assertEqual(sorted(summary['分位数']), sorted(SUMMARY_QUANTILES))
+
+    def test_chunked_qmc_matches_one_shot(self):
+        store = self.generate(method=SAMPLING_QMC)
+        drops, memberships = generate_cloud_drops(EX, EN, HE, 25_000, method=SAMPLING_QMC, seed=7)
+        np.testing.assert_allclose(self.all_drops(store), drops)
+        np.testing.assert_allclose(np.concatenate([m for _, m in store.iter_chunks()]), memberships)
+
+    def test_compact_store(self):
+        store = self.generate(compact=True)
+        self.assertEqual(store.nbytes(), DropStore.required_bytes(25_000, compact=True) + 128)  # 128 字节为 .npy 文件头
+        drops, memberships = store.head(100)
+        np.testing.assert_allclose(memberships, np.exp(-(drops - EX)**2 / (2 * EN**2)))
+
+    def test_delete_releases_held_reservation(self):
+        governor = ResourceGovernor({DISK: (10**9, 10**9)})
+        store = self.generate(method=SAMPLING_RANDOM)
+        store.hold(governor.reserve(DISK, "a", store.nbytes()))
+        self.assertEqual(governor.load()['资源'][DISK]['占用'], store.nbytes())
+        directory = store.directory
+        store.delete()
+        self.assertFalse(os.path.exists(directory))
+        self.assertEqual(governor.load()['资源'][DISK]['占用'], 0)
+
+
+class NdSummaryTest(unittest.TestCase):
+    def test_chunked_summary_matches_one_shot(self):
+        ex, en, he = [50.0, 70.0, 90.0], [4.0, 2.0, 1.0], [0.4, 0.2, 0.1]
+        summary = summarize_nd_cloud(ex, en, he, 30_000, method=SAMPLING_QMC, seed=3, chunk_size=7_000)
+        drops, memberships = generate_nd_cloud_drops(ex, en, he, 30_000, SAMPLING_QMC, 3)
+        for estimate, expected in zip(summary['逆向估计'], reverse_nd_cloud_params(drops)):
+            np.testing.assert_allclose(estimate, expected, rtol=1e-9)
+        self.assertAlmostEqual(summary['平均隶属度'], memberships.mean())
+        self.assertEqual(sorted(summary['密度']), [(0, 1), (0, 2), (1, 2)])
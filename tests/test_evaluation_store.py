@@ -0,0 +1,55 @@
+"""评价库测试
+
+    python -m pytest tests
+"""
+import math
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from evaluation_store import EvaluationStore, inputs_hash  # noqa: E402
+
+INDICATOR_CLOUDS = [
+    {'指标': '指标1', 'Ex': 83.5, 'En': 3.1, 'He': 0.4, '权重': 0.6},
+    {'指标': '指标2', 'Ex': 81.2, 'En': 2.7, 'He': 0.3, '权重': 0.4},
+]
+COMPREHENSIVE_CLOUD = {'Ex': 82.6, 'En': 2.9, 'He': 0.35}
+
+
+class EvaluationStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = EvaluationStore(os.path.join(self.directory.name, "evaluations.db"))
+        self.input_hash = inputs_hash([[85, 78], [82, 85]], [0.6, 0.4])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_duplicate_input_is_saved_once(self):
+        evaluation_id, created = self.store.save("项目A", self.input_hash, 2, INDICATOR_CLOUDS, COMPREHENSIVE_CLOUD)
+        self.assertTrue(created)
+        self.assertEqual(self.store.save("项目A", self.input_hash, 2, INDICATOR_CLOUDS, COMPREHENSIVE_CLOUD),
+                         (evaluation_id, False))
+        # 其他项目中的相同输入另存一条
+        other_id, created = self.store.save("项目B", self.input_hash, 2, INDICATOR_CLOUDS, COMPREHENSIVE_CLOUD)
+        self.assertTrue(created)
+        self.assertNotEqual(other_id, evaluation_id)
+        self.assertEqual(self.store.projects(), {"项目A": 1, "项目B": 1})
+
+        record = self.store.find(self.input_hash, "项目A")
+        self.assertEqual(record['编号'], evaluation_id)
+        self.assertEqual(record['等级'], '良')
+        self.assertEqual(record['指标云'], INDICATOR_CLOUDS)
+
+    def test_invalid_values_are_rejected(self):
+        for comprehensive, clouds in (
+            (dict(COMPREHENSIVE_CLOUD, He=math.nan), INDICATOR_CLOUDS),
+            (COMPREHENSIVE_CLOUD, [dict(INDICATOR_CLOUDS[0], En=math.inf), INDICATOR_CLOUDS[1]]),
+        ):
+            with self.assertRaises(ValueError):
+                self.store.save("项目A", self.input_hash, 2, clouds, comprehensive)
+        self.assertEqual(self.store.projects(), {})
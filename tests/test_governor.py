@@ -0,0 +1,97 @@
+"""资源管控测试
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from governor import DISK, MIN_GRANT, PLOT, WORK, ResourceGovernor, ServerBusy, scale_drop_counts  # noqa: E402
+
+
+class ScaleDropCountsTest(unittest.TestCase):
+    def test_within_budget_is_unchanged(self):
+        self.assertEqual(scale_drop_counts([100, 200], 300), [100, 200])
+        self.assertEqual(scale_drop_counts([100, 200], None), [100, 200])
+
+    def test_proportional_scaling(self):
+        self.assertEqual(scale_drop_counts([1000, 3000], 2000), [500, 1500])
+
+    def test_floor_is_taken_from_other_clouds(self):
+        counts = scale_drop_counts([60, 10_000, 10_000], 1000)
+        self.assertEqual(counts[0], 50)
+        self.assertLessEqual(sum(counts), 1000)
+        self.assertEqual(counts[1], counts[2])
+
+    def test_total_never_exceeds_budget(self):
+        for counts, max_points in (([10] * 30, 100), ([1, 5000, 5000], 120), ([50] * 10 + [100_000], 600)):
+            scaled = scale_drop_counts(counts, max_points)
+            self.assertLessEqual(sum(scaled), max_points)
+            self.assertTrue(all(0 <= s <= c for s, c in zip(scaled, counts)))
+
+
+class ResourceGovernorTest(unittest.TestCase):
+    def setUp(self):
+        self.governor = ResourceGovernor({PLOT: (10_000, 4_000), WORK: (1_000, 600), DISK: (100, 100)})
+
+    def in_use(self, resource):
+        return self.governor.load()['资源'][resource]['占用']
+
+    def test_admit_within_budget(self):
+        with self.governor.admit("a", 3_000) as grant:
+            self.assertEqual(grant.points, 3_000)
+            self.assertFalse(grant.downgraded)
+            self.assertEqual(self.in_use(PLOT), 3_000)
+        self.assertEqual(self.in_use(PLOT), 0)
+
+    def test_admit_downgrades_to_session_budget(self):
+        with self.governor.admit("a", 3_000):
+            with self.governor.admit("a", 3_000) as grant:
+                self.assertTrue(grant.downgraded)
+                self.assertEqual(grant.points, 1_000)
+            # 其他会话不受该会话限额影响
+            with self.governor.admit("b", 3_000) as grant:
+                self.assertFalse(grant.downgraded)
+
+    def test_admit_scales_cost_by_render_size(self):
+        with self.governor.admit("a", 3_000, scale=2.0) as grant:
+            self.assertEqual(grant.amount, 4_000)
+            self.assertEqual(grant.points, 2_000)
+
+    def test_admit_rejects_below_min_grant(self):
+        with self.governor.admit("a", 4_000 - MIN_GRANT + 1):
+            with self.assertRaises(ServerBusy):
+                with self.governor.admit("a", 5_000):
+                    pass
+        self.assertEqual(self.governor.load()['已拒绝'], 1)
+
+    def test_admit_rejects_when_global_budget_is_used(self):
+        with self.governor.admit("a", 4_000), self.governor.admit("b", 4_000), self.governor.admit("c", 1_500):
+            with self.assertRaisesRegex(ServerBusy, "繁忙"):
+                with self.governor.admit("d", 4_000):
+                    pass
+        self.assertEqual(self.in_use(PLOT), 0)
+
+    def test_reserve_does_not_downgrade(self):
+        first = self.governor.reserve(WORK, "a", 500)
+        with self.assertRaisesRegex(ServerBusy, "限额"):
+            self.governor.reserve(WORK, "a", 200)
+        with self.assertRaisesRegex(ServerBusy, "繁忙"):
+            self.governor.reserve(WORK, "b", 600)
+        self.assertEqual(self.in_use(WORK), 500)
+
+        first.release()
+        first.release()  # 重复释放不会多归还
+        self.assertEqual(self.in_use(WORK), 0)
+        with self.governor.reserve(WORK, "b", 600):
+            self.assertEqual(self.governor.load()['资源'][WORK]['活跃会话'], 1)
+        self.assertEqual(self.in_use(WORK), 0)
+
+    def test_load_reports_highest_resource(self):
+        with self.governor.reserve(DISK, "a", 50), self.governor.reserve(WORK, "a", 100):
+            load = self.governor.load()
+            self.assertAlmostEqual(load['负载率'], 0.5)
+            self.assertEqual(load['活跃会话'], 1)
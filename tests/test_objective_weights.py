@@ -0,0 +1,76 @@
+"""客观赋权测试：小矩阵手算结果、分块与批量计算
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import objective_weights  # noqa: E402
+from cloud_model import column_blocks  # noqa: E402
+from objective_weights import (  # noqa: E402
+    OBJECTIVE_WEIGHT_METHODS,
+    batch_objective_weights,
+    critic_weights,
+    cv_weights,
+    entropy_weights,
+)
+
+# 3位专家 × 3个指标，各列为 [1, 2, 3]、[2, 2, 5]、[3, 1, 2]
+SCORES = [[1, 2, 3], [2, 2, 1], [3, 5, 2]]
+
+
+def normalized(values):
+    values = np.array(values, dtype=float)
+    return values / values.sum()
+
+
+def tiny_blocks(num_rows, num_cols):
+    """每块只含一列（或一位专家），检验分块累计与一次计算一致"""
+    return column_blocks(num_rows, num_cols, block_bytes=1)
+
+
+class ObjectiveWeightsTest(unittest.TestCase):
+    def test_entropy(self):
+        # 第1、3列极差标准化后的比重为 {0, 1/3, 2/3}，第2列为 {0, 0, 1}（熵为0）
+        entropy = -(np.log(1 / 3) / 3 + 2 / 3 * np.log(2 / 3)) / np.log(3)
+        np.testing.assert_allclose(entropy_weights(SCORES), normalized([1 - entropy, 1, 1 - entropy]))
+
+    def test_cv(self):
+        # 均值 2、3、2，标准差 1、√3、1
+        np.testing.assert_allclose(cv_weights(SCORES), normalized([1 / 2, np.sqrt(3) / 3, 1 / 2]))
+
+    def test_critic(self):
+        # 对比强度 = 标准差 / 极差；相关系数 r12 = √3/2，r13 = -1/2，r23 = 0
+        contrast = [1 / 2, np.sqrt(3) / 3, 1 / 2]
+        r12, r13, r23 = np.sqrt(3) / 2, -0.5, 0.0
+        conflict = [(1 - r12) + (1 - r13), (1 - r12) + (1 - r23), (1 - r13) + (1 - r23)]
+        np.testing.assert_allclose(critic_weights(SCORES), normalized(np.multiply(contrast, conflict)))
+
+    def test_identical_scores_fall_back_to_equal_weights(self):
+        scores = np.full((4, 3), 80.0)
+        for method, fn in OBJECTIVE_WEIGHT_METHODS.items():
+            np.testing.assert_allclose(fn(scores), np.full(3, 1 / 3), err_msg=method)
+
+    def test_too_few_experts(self):
+        with self.assertRaises(ValueError):
+            entropy_weights([[1, 2, 3]])
+
+    def test_blocked_and_batched_match_single(self):
+        rng = np.random.default_rng(0)
+        matrices = [rng.uniform(40, 100, size=shape) for shape in ((12, 5), (12, 5), (8, 3), (12, 5))]
+        for method, fn in OBJECTIVE_WEIGHT_METHODS.items():
+            expected = [fn(matrix) for matrix in matrices]
+            with mock.patch.object(objective_weights, "column_blocks", tiny_blocks):
+                blocked = [fn(matrix) for matrix in matrices]
+            for result, reference in zip(blocked, expected):
+                np.testing.assert_allclose(result, reference, err_msg=method)
+            for result, reference in zip(batch_objective_weights(matrices, method), expected):
+                np.testing.assert_allclose(result, reference, err_msg=method)
+                self.assertAlmostEqual(result.sum(), 1.0)
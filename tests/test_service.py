@@ -0,0 +1,112 @@
+"""评价HTTP服务接口测试：在本机端口上启动服务并发送请求
+
+    python -m pytest tests
+"""
+import asyncio
+import json
+import os
+import sys
+
+import numpy as np
+from tornado.testing import AsyncHTTPTestCase, gen_test
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cloud_model import calculate_indicator_clouds  # noqa: E402
+from governor import SERVICE, ResourceGovernor  # noqa: E402
+from service import CloudService, make_app, process_reverse  # noqa: E402
+
+SCORES = [[85, 78, 92], [82, 85, 88], [88, 82, 90], [79, 80, 86]]
+
+
+def process_reverse_rejecting_negative(items):
+    """同 process_reverse，但打分含负数的请求使整批出错，模拟单个请求导致的计算异常"""
+    if any((scores < 0).any() for scores, _ in items):
+        raise ValueError("打分不能为负")
+    return process_reverse(items)
+
+
+class ServiceTest(AsyncHTTPTestCase):
+    def get_app(self):
+        # 聚合等待时间足够长，使并发请求进入同一微批
+        self.service = CloudService(delay=0.05, workers=2,
+                                    governor=ResourceGovernor({SERVICE: (1_000_000, 100_000)}))
+        return make_app(self.service)
+
+    def tearDown(self):
+        super().tearDown()
+        self.service.executor.shutdown()
+
+    def post(self, path, payload):
+        response = self.fetch(path, method="POST", body=json.dumps(payload))
+        return response.code, json.loads(response.body)
+
+    async def post_async(self, path, payload):
+        response = await self.http_client.fetch(self.get_url(path), method="POST", body=json.dumps(payload),
+                                                raise_error=False)
+        return response.code, json.loads(response.body)
+
+    def test_reverse_matches_indicator_clouds(self):
+        code, result = self.post("/reverse", {"scores": SCORES})
+        self.assertEqual(code, 200)
+        expected = calculate_indicator_clouds(np.array(SCORES, dtype=float), np.ones(3))
+        for cloud, reference in zip(result['指标云'], expected):
+            for name in ('Ex', 'En', 'He'):
+                self.assertAlmostEqual(cloud[name], reference[name])
+        self.assertIn(result['综合云']['等级'], ('劣', '差', '一般', '良', '优'))
+
+    def test_forward(self):
+        code, result = self.post("/forward", {"ex": 50, "en": 8, "he": 0.5, "num_drops": 500, "seed": 1})
+        self.assertEqual(code, 200)
+        self.assertEqual(len(result['云滴值']), 500)
+        self.assertTrue(all(0 < m <= 1 for m in result['隶属度']))
+
+    def test_comprehensive_and_grade(self):
+        clouds = [{"Ex": 80, "En": 3, "He": 0.5, "权重": 0.6}, {"Ex": 90, "En": 2, "He": 0.3, "权重": 0.4}]
+        code, result = self.post("/comprehensive", {"clouds": clouds})
+        self.assertEqual(code, 200)
+        self.assertAlmostEqual(result['Ex'], 84.0)
+
+        code, result = self.post("/grade", {"scores": [10, 30, 60, 80, 95]})
+        self.assertEqual(code, 200)
+        self.assertEqual(result['等级'], ['劣', '差', '一般', '良', '优'])
+
+    def test_invalid_request_returns_400(self):
+        code, result = self.post("/reverse", {"scores": [[85, 78]]})
+        self.assertEqual(code, 400)
+        self.assertIn("至少需要2位专家", result['error'])
+
+        code, result = self.post("/forward", {"ex": 50, "en": -1, "he": 0.5})
+        self.assertEqual(code, 400)
+
+    def test_invalid_seed_returns_400(self):
+        for seed in (True, False, -1, 1.5, "1"):
+            code, result = self.post("/forward", {"ex": 50, "en": 8, "he": 0.5, "seed": seed})
+            self.assertEqual(code, 400, seed)
+            self.assertIn("seed", result['error'])
+
+    def test_over_budget_returns_503(self):
+        code, result = self.post("/forward", {"ex": 50, "en": 8, "he": 0.5, "num_drops": 100_000})
+        self.assertEqual(code, 503)
+        self.assertIn("限额", result['error'])
+
+    @gen_test
+    async def test_failing_item_does_not_fail_batch(self):
+        self.service.batchers['reverse'].process = process_reverse_rejecting_negative
+        bad = [[85, 78, 92], [82, -1, 88], [88, 82, 90], [79, 80, 86]]
+        responses = await asyncio.gather(
+            self.post_async("/reverse", {"scores": SCORES}),
+            self.post_async("/reverse", {"scores": bad}),
+            self.post_async("/reverse", {"scores": SCORES[::-1]}),
+        )
+        self.assertEqual(self.service.batchers['reverse'].batches, 1)
+        self.assertEqual([code for code, _ in responses], [200, 500, 200])
+        self.assertEqual(responses[0][1]['综合云'], responses[2][1]['综合云'])
+
+    def test_health(self):
+        response = self.fetch("/health")
+        self.assertEqual(response.code, 200)
+        result = json.loads(response.body)
+        self.assertEqual(result['status'], "ok")
+        self.assertIn('服务接口', result['负载']['资源'])